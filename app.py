@@ -1,38 +1,46 @@
 import os
 import json
+import time
 import pickle
 import pandas as pd
 import numpy as np
-import geopandas as gpd
-from shapely.affinity import scale as scale_geom, translate as translate_geom
 from dash import Dash, dcc, html, Input, Output, State, ctx
-from matplotlib.colors import Normalize, LinearSegmentedColormap
 import plotly.graph_objects as go 
-from copy import deepcopy
 
 
 # === Import from shared and layout whatever ===
-from shared import viz_df,causes_dict, injuries_dict, get_bike_coverage_plotly,network_mode_panel, translated, COLOR_GRADIENT_MAP, COLOR_INJURY, COLOR_EDGE, COLOR_TEXT,COLOR_TEXT_2, COLOR_INJURY_TEXT, norm, rgba_to_plotly_color
-from layout import layout, fig, empty_plot
+from shared import CLIENTSIDE_PANEL, viz_df, community_stats, crash_cube, crash_window, crash_fields, panel_crash_data, default_scores, score_params, score_set, score_fields, panel_score_data, hotspots, hotspot_label, hotspot_detail, panel_hotspot_data, segments, segment_risk, BIN_COLORS, get_crash_heatmap, get_segment_geometry, get_bike_coverage_plotly, get_inset_traces, network_mode_panel, prompt_panel, COLOR_INJURY, COLOR_EDGE, COLOR_TEXT,COLOR_TEXT_2, COLOR_INJURY_TEXT
+from response_cache import response_cache, CACHE_WARM
+from network_common import LANE_DASH
+from layout import layout, fig, empty_plot, N_COMMUNITY_SHAPES, N_BASE_SHAPES, N_BASE_ANNOTATIONS, N_BASE_TRACES, LEGEND_SHAPE_START, BIN_TRACES, INSET_XAXIS, INSET_YAXIS, INSET_SHAPE, INSET_ANNOTATION, TEXT_TRACE, RANGE_ANNOTATION, TILE_H, TILE_MAXY, BAR_LAYER, bin_trace_paths, WEIGHT_SLIDERS, CARTOGRAM_STYLE, IFRAME_STYLE
 
 
 # === Dash App init ===
-from dash import Dash, html, dcc, Output, Input, State, ctx
+from dash import Dash, html, dcc, Output, Input, State, ctx, Patch, ClientsideFunction, no_update
+from dash.exceptions import PreventUpdate
+from flask import request
+from static_assets import asset_path, is_hashed_asset
+from boot_timer import mark
+from metrics import METRICS_ENABLED, install_metrics, metrics
+from profiling import install_profiling
 import plotly.graph_objects as go
-from copy import deepcopy
 import numpy as np
 
 
+# gzip/brotli for callback, layout and asset responses (flask-compress, via dash[compress])
+COMPRESS = os.environ.get("BIKEABILITY_COMPRESS", "1") == "1"
+
 # === Preview ===
 app = Dash(
     __name__,
     assets_folder='assets',
+    compress=COMPRESS,
     meta_tags=[
-        {"property": "og:image", "content": "/assets/preview.png"},
+        {"property": "og:image", "content": f"/assets/{asset_path('preview.png')}"},
         {"property": "og:title", "content": "Chicago Bike Crash Dashboard"},
         {"property": "og:description", "content": "Explore bike crash patterns and infrastructure equity in Chicago."},
         {"property": "og:type", "content": "website"},
-        {"property": "og:image", "content": "https://chicago-bike-dashboard.onrender.com/assets/preview.png"},
+        {"property": "og:image", "content": f"https://chicago-bike-dashboard.onrender.com/assets/{asset_path('preview.png')}"},
         {"name": "viewport", "content": "width=device-width, initial-scale=1"},
     ]
 )
@@ -44,7 +52,35 @@ app.config.suppress_callback_exceptions = True
 
 
 app.title = "Chicago Bikeability Map"
-app._favicon = "bike.png"
+app._favicon = asset_path("bike.png")
+
+
+# === HTTP caching ===
+BOOT_TIME = int(time.time())
+# GET responses that only change on redeploy (the index page carries a per-request id)
+VALIDATED_PATHS = {app.config.routes_pathname_prefix + p for p in ('_dash-layout', '_dash-dependencies')}
+
+
+@server.after_request
+def cache_headers(response):
+    if request.method != 'GET' or response.status_code != 200:
+        return response
+    if is_hashed_asset(request.path):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000  # 1 year
+        response.cache_control.immutable = True
+    elif request.path in VALIDATED_PATHS:
+        # compression (registered earlier, so it runs after this) suffixes the ETag per encoding
+        response.last_modified = BOOT_TIME
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+
+if METRICS_ENABLED:
+    install_metrics(app, response_cache)
+install_profiling(app)
 # === Layout ===
 app.layout = layout
 
@@ -52,106 +88,57 @@ app.layout = layout
 
 # === APP.py ===
 
-@app.callback(
-    Output('cartogram', 'style'),
-    Output('network-iframe', 'style'),
-    Output('exit-network-btn', 'style'),
-    Output('view-mode', 'data'),
-    Input('show-network-btn', 'n_clicks'),
-    Input('exit-network-btn', 'n_clicks'),
-    prevent_initial_call=True
-)
-def toggle_network_view(show_clicks, exit_clicks):
-    triggered_id = ctx.triggered_id
-
+def resolve_selection(triggered_id, clickData, dropdown_value, current):
+    """The one place a user action becomes the canonical selection key:
+    a community name, 'bin_0'..'bin_4', 'network' or None. (resolveSelection in
+    assets/info_panel.js does the same in the browser for the client-side panel.)"""
     if triggered_id == 'show-network-btn':
-        return (
-            {'display': 'none'},  # hide Graph
-            {'display': 'block',
-             'width': '880px',
-             'height': '1030px',
-             'overflow': 'hidden', 
-             'border': 'none',
-             'backgroundColor': '#4A4A4A',
-             'borderRadius': '8px',
-             'boxShadow': '0 2px 6px rgba(0,0,0,0.1)'},  # show iframe
-            {'display': 'inline-block'},
-            'network'
-        )
-
-    # on exit
-    return (
-        {'display': 'block',
-        'width': '100%',
-        'height': '100%',
-        'border': 'none',
-        'backgroundColor': '#4A4A4A',
-        'borderRadius': '8px',
-        'boxShadow': '0 2px 6px rgba(0,0,0,0.1)'},  # show Graph
-        {'display': 'none'},  # hide iframe
-        {'display': 'none'},
-        'community'
-    )
-
-from dash.exceptions import PreventUpdate
-
-@app.callback(
-    Output('carea-dropdown', 'value'),
-    Input('cartogram', 'clickData'),
-    Input('view-mode', 'data'),
-    State('carea-dropdown', 'value')
-)
-def handle_dropdown(clickData, mode, current_value):
-    triggered_id = ctx.triggered_id
-
-    # Option 1: Clear dropdown if switching to network mode
-    if triggered_id == 'view-mode' and mode == 'network':
+        return 'network'
+    if triggered_id == 'exit-network-btn':
         return None
-
-    # Option 2: Autofill from map clicks in community mode
-    if triggered_id == 'cartogram' and mode == 'community' and clickData:
-        return clickData['points'][0]['customdata']
-
-    raise PreventUpdate
+    if current == 'network':
+        return current  # cartogram is hidden; the dropdown doesn't leave network mode
+    key = current
+    if triggered_id == 'cartogram' and clickData:
+        key = clickData['points'][0]['customdata']
+    elif triggered_id == 'carea-dropdown':
+        key = dropdown_value or None
+    if key and key not in community_stats and not key.startswith('bin_'):
+        return None
+    return key
 
 
+def info_panel(key, crash_range=None, scoring=None):
+    if key == 'network':
+        return response_cache.get(('info', 'network'), lambda: network_mode_panel)
+    carea_name = key if key in community_stats else None
+    window = crash_window(crash_range) if carea_name else None
+    scores = score_set(scoring) if carea_name else None
+    # date range and weights only join the key when they differ from the defaults
+    cache_key = ('info', carea_name)
+    if window is not None:
+        cache_key += (tuple(crash_range),)
+    if scores is not None:
+        cache_key += (tuple(scoring['weights']), scoring['mix'])
+    return response_cache.get(cache_key, lambda: build_info_panel(carea_name, window, scores))
 
-@app.callback(
-    Output('info-panel', 'children'),
-    Input('cartogram', 'clickData'),
-    Input('carea-dropdown', 'value'),
-    Input('view-mode', 'data')
-)
-def update_info(clickData, dropdown_value, mode):
-    if mode == 'network':
-        return network_mode_panel
-    triggered = ctx.triggered_id
-    carea_name = None
-    selected_bin = None
-
-    if triggered == 'cartogram' and clickData:
-        cd = clickData['points'][0]['customdata']
-        if cd.startswith('bin_'):
-            selected_bin = int(cd.split('_')[1])
-        else:
-            carea_name = cd
-    elif triggered == 'carea-dropdown' and dropdown_value:
-        carea_name = dropdown_value
 
+def build_info_panel(carea_name, window=None, scores=None):
     if not carea_name:
-        return html.Div([
-            html.P("Click a community area or select from the dropdown."),
-        ], style={'paddingBottom': '200px'})
-
-    row = viz_df[viz_df['CArea'] == carea_name].iloc[0]
-    causes = causes_dict.get(carea_name, [])
-    injuries = injuries_dict.get(carea_name, {})
+        return prompt_panel
+
+    row = community_stats.row(carea_name)
+    crash = crash_fields(carea_name, window)
+    score = score_fields(carea_name, scores)
+    causes = crash['causes']
+    injuries = crash['injuries']
+    spots = panel_hotspot_data(carea_name)
     injury_order = ['FATAL', 'INCAPACITATING INJURY', 'NONINCAPACITATING INJURY', 'REPORTED, NOT EVIDENT', 'NO INDICATION OF INJURY']
     panel_html = html.Div([
                 html.H3(carea_name.title()),
 
                 html.P(f"Population: ~{int(round(row['population'], -3))}"),
-                html.P(f"🤕 Reported Crashes: {row['total_crashes']}"),
+                html.P(f"🤕 Reported Crashes: {crash['total_crashes']}"),
 
                 html.P("Top Causes:", style={'marginLeft': '0px'}),
                 html.Ul([
@@ -169,12 +156,19 @@ def update_info(clickData, dropdown_value, mode):
                     ])
                     for k in injury_order if k in injuries
                 ]),
-                html.P(f"🩸 Severe Injuries: {row['severe_crashes']} ({int(row['severe_rate'] * 100)}%)"),
+                html.P(f"🩸 Severe Injuries: {crash['severe_crashes']} ({int(crash['severe_rate'] * 100)}%)"),
+                *([
+                    html.P("📍 Crash Hotspots:", style={'marginLeft': '0px'}),
+                    html.Ul([
+                        html.Li([html.Span(label, style={'color': '#BBBBBB'}), f" {detail}"])
+                        for label, detail in spots
+                    ]),
+                ] if spots else []),
 
 
                 html.Hr(style={'margin': '12px 0'}),
 
-                html.P(f"🚲 Bikeability: {row['bike_rank']+1}/5"),
+                html.P(f"🚲 Bikeability: {score['bike_rank']+1}/5"),
                 html.P(f"Roads: ~{int(row['road_length'])} mi"),
                 html.P("Bike Lanes:", style={'marginLeft': '0px'}),
                 
@@ -261,7 +255,7 @@ def update_info(clickData, dropdown_value, mode):
                     'marginLeft': '20px'
                 }),
 
-                html.P(f"🛠️ Infrastructure Score: {round(row['infrastructure_score'], 2)}", style={'marginLeft': '0px'}),
+                html.P(f"🛠️ Infrastructure Score: {round(score['infrastructure_score'], 2)}", style={'marginLeft': '0px'}),
 
 
                 html.P(f"🌐 Network Score: {round(row['network_score'], 2)}", style={'marginLeft': '0px'}),
@@ -292,93 +286,433 @@ def update_info(clickData, dropdown_value, mode):
                 
     
     return panel_html 
-@app.callback(
-    Output('cartogram', 'figure'),
-    [Input('cartogram', 'clickData'),
-     Input('carea-dropdown', 'value')],
-     State('view-mode', 'data')
-)
-def update_figure(clickData, dropdown_value, mode):
-    if mode != 'community':
-        return fig
 
-    triggered_id = ctx.triggered_id
-    custom_data = None
 
-    if triggered_id == 'cartogram' and clickData:
-        custom_data = clickData['points'][0]['customdata']
-    elif triggered_id == 'carea-dropdown' and dropdown_value:
-        custom_data = dropdown_value
-    else:
-        return fig
+def _shape_opacities(overlay, ranks):
+    # opacity of every base shape under an overlay; only bin filters dim shapes
+    opacities = np.ones(N_BASE_SHAPES)
+    if overlay and overlay['key'].startswith('bin_'):
+        selected_bin = int(overlay['key'].split('_')[1])
+        in_bin = ranks == selected_bin
+        if N_COMMUNITY_SHAPES:
+            opacities[:N_COMMUNITY_SHAPES] = np.repeat(np.where(in_bin, 1.0, 0.3), 3)
+        legend = np.full(N_BASE_SHAPES - LEGEND_SHAPE_START, 0.25)
+        legend[4 - selected_bin] = 1.0  # legend runs bin_4 (top) .. bin_0
+        opacities[LEGEND_SHAPE_START:] = legend
+    return opacities
+
+
+def _trace_opacities(overlay):
+    # opacity of the per-bin traces of the batched cartogram (empty in shapes mode)
+    bins = np.array([b for _, b in BIN_TRACES], dtype=int)
+    if overlay and overlay['key'].startswith('bin_'):
+        return np.where(bins == int(overlay['key'].split('_')[1]), 1.0, 0.3)
+    return np.ones(len(bins))
+
+
+def hotspot_trace(carea_name):
+    # the community's ranked crash hotspots as numbered markers, sized by crash count
+    spots = hotspots.get(carea_name, [])
+    hover = [
+        f"#{rank} {hotspot_label(h)}<br>{hotspot_detail(h)}"
+        + (f"<br>Top cause: {h['top_cause'].title()}" if h['top_cause'] else "")
+        for rank, h in enumerate(spots, 1)
+    ]
+    return dict(
+        type='scatter', mode='markers+text',
+        x=[h['lon'] for h in spots], y=[h['lat'] for h in spots],
+        text=[str(rank) for rank in range(1, len(spots) + 1)],
+        textfont=dict(color=COLOR_INJURY_TEXT, size=9),
+        marker=dict(size=[round(12 + 2 * float(np.sqrt(h['crashes'])), 1) for h in spots], color=COLOR_INJURY,
+                    opacity=0.6, line=dict(color=COLOR_EDGE, width=1)),
+        hovertext=hover, hovertemplate='%{hovertext}<extra></extra>',
+    )
 
-    updated_fig = deepcopy(fig)
 
-    if str(custom_data).startswith('bin_'):
-        selected_bin = int(custom_data.split('_')[1])
-        for i, (_, row) in enumerate(viz_df.iterrows()):
-            is_match = int(row['bike_rank']) == selected_bin
-            opacity_val = 1.0 if is_match else 0.3
-            base_idx = i * 3
-            for j in range(3):
-                updated_fig['layout']['shapes'][base_idx + j]['opacity'] = opacity_val
+RISK_COLORS = ['#F0E442', '#E69F00', '#D55E00']  # segment_risk levels 1..3, low to high
+
+
+def lane_risk_traces(carea_name):
+    # the community's lanes with crashes redrawn over the grey lanes, one trace per risk
+    # level and lane type (keeping the type's dash), plus one hover marker per segment at
+    # its middle vertex, so each label is sent once rather than once per vertex
+    if not segment_risk:
+        return []
+    lanes = segment_risk['lanes']
+    geometry = get_segment_geometry('lonlat')
+    risk = np.asarray(lanes['risk'])
+    lane_type = segments['DISPLAYROU_CLEAN'].to_numpy()
+    local = (segments['CArea'] == carea_name).to_numpy()
+    traces = []
+    marker_x, marker_y, marker_color, labels = [], [], [], []
+    for level, color in enumerate(RISK_COLORS, 1):
+        for k in LANE_DASH:
+            xs, ys = [], []
+            for i in np.flatnonzero(local & (risk == level) & (lane_type == k)):
+                for part in geometry.parts(i):
+                    xs.extend(np.round(part[:, 0], 6).tolist() + [None])
+                    ys.extend(np.round(part[:, 1], 6).tolist() + [None])
+                coords = geometry.segment_coords(i)
+                middle = coords[len(coords) // 2]
+                marker_x.append(round(float(middle[0]), 6))
+                marker_y.append(round(float(middle[1]), 6))
+                marker_color.append(color)
+                labels.append(f"{k.title()} lane: {lanes['crashes'][i]} crashes ({lanes['crashes_per_mile'][i]}/mi), "
+                              f"{lanes['severe'][i]} severe")
+            if xs:
+                traces.append(dict(type='scatter', mode='lines', x=xs, y=ys,
+                                   line=dict(color=color, width=2, dash=LANE_DASH[k]), hoverinfo='skip'))
+    if labels:
+        traces.append(dict(type='scatter', mode='markers', x=marker_x, y=marker_y, text=labels,
+                           marker=dict(color=marker_color, size=5), hovertemplate='%{text}<extra></extra>'))
+    return traces
+
+
+def build_inset_traces(carea_name):
+    traces = get_inset_traces(carea_name) + lane_risk_traces(carea_name)
+    if hotspots.get(carea_name):
+        traces = traces + [hotspot_trace(carea_name)]
+    return [
+        dict(trace, xaxis='x2', yaxis='y2', showlegend=False)
+        for trace in traces
+    ]
 
-        total_shapes = len(updated_fig['layout']['shapes'])
-        for i in range(5):
-            shape_idx = total_shapes - 5 + i
-            is_match = (4 - i) == selected_bin
-            updated_fig['layout']['shapes'][shape_idx]['opacity'] = 1.0 if is_match else 0.25
 
-        return updated_fig
+def inset_traces(carea_name):
+    return response_cache.get(('inset', carea_name), lambda: build_inset_traces(carea_name))
 
-    # Add inset network plot for carea
-    carea_name = custom_data
-    network_fig = get_bike_coverage_plotly(carea_name)
 
-    updated_fig.update_layout(
-        xaxis2=dict(domain=[0.73, 0.96], anchor='y2', visible=False),
-        yaxis2=dict(domain=[0.73, 0.96], anchor='x2', visible=False)
-    )
+def build_inset_extent(carea_name):
+    # lon/lat bounds of a community's inset traces: the inset's autorange view
+    traces = inset_traces(carea_name)
+    xs = np.array([v for trace in traces for v in (trace.get('x') or []) if v is not None], dtype=float)
+    ys = np.array([v for trace in traces for v in (trace.get('y') or []) if v is not None], dtype=float)
+    return float(xs.min()), float(xs.max()), float(ys.min()), float(ys.max())
+
+
+def inset_extent(carea_name):
+    return response_cache.get(('inset-extent', carea_name), lambda: build_inset_extent(carea_name))
+
+
+def build_heatmap_trace(view):
+    return dict(get_crash_heatmap().trace(*view), xaxis='x2', yaxis='y2', showlegend=False)
+
+
+def heatmap_trace(carea_name, view=None):
+    """Crash heatmap for the inset, rasterized for `view` (x0, x1, y0, y1) or the whole inset."""
+    if view is None:
+        return response_cache.get(('heatmap', carea_name), lambda: build_heatmap_trace(inset_extent(carea_name)))
+    return build_heatmap_trace(view)
 
-    updated_fig.add_shape(
-        type="path",
-        path=(
-            "M 0.72 0.745 "
-            "Q 0.72 0.72 0.745 0.72 "
-            "L 0.945 0.72 "
-            "Q 0.97 0.72 0.97 0.745 "
-            "L 0.97 0.945 "
-            "Q 0.97 0.97 0.945 0.97 "
-            "L 0.745 0.97 "
-            "Q 0.72 0.97 0.72 0.945 Z"
-        ),
-        fillcolor='#606060',
-        line=dict(color='lightgray', width=1),
-        layer='below',
-        xref='paper',
-        yref='paper'
-    )
 
-    updated_fig.add_annotation(
-        x=0.9,  # Center of your custom box horizontally
-        y=0.715,  # Slightly below the hover box
-        xref="paper",
-        yref="paper",
-        text="Hover to see cause",
-        showarrow=False,
-        font=dict(size=9, color= COLOR_TEXT_2),
-        align="center",
+def inset_view(relayout, carea_name):
+    """The inset view a cartogram relayout asks for: (x0, x1, y0, y1), 'reset' for a
+    double-click back to autorange, or None when the relayout doesn't touch the inset."""
+    if not relayout or carea_name not in community_stats:
+        return None
+    if relayout.get('xaxis2.autorange') or relayout.get('yaxis2.autorange'):
+        return 'reset'
+    if not any(k.startswith(('xaxis2.range', 'yaxis2.range')) for k in relayout):
+        return None
+    # a one-axis zoom leaves the other axis on the community bounds
+    extent = inset_extent(carea_name)
+    x0 = relayout.get('xaxis2.range[0]', extent[0])
+    x1 = relayout.get('xaxis2.range[1]', extent[1])
+    y0 = relayout.get('yaxis2.range[0]', extent[2])
+    y1 = relayout.get('yaxis2.range[1]', extent[3])
+    return min(x0, x1), max(x0, x1), min(y0, y1), max(y0, y1)
+
+
+def overlay_patch(prev, key, ranks=None, heatmap=False):
+    """Patch taking the cartogram from overlay `prev` to selection `key` (None = base figure),
+    with tiles binned by bike ranks `ranks` (default: the default weights) and, if `heatmap`,
+    the crash heatmap under the community inset.
+
+    Returns the Patch and the new overlay record {'key', 'traces', 'heatmap'}."""
+    ranks = default_scores.ranks if ranks is None else ranks
+    patch = Patch()
+    overlay = {'key': key, 'traces': 0, 'heatmap': False} if key else None
+
+    # drop the previous community inset
+    if prev and not prev['key'].startswith('bin_'):
+        for i in reversed(range(N_BASE_TRACES, N_BASE_TRACES + prev['traces'])):
+            del patch['data'][i]
+        del patch['layout']['shapes'][N_BASE_SHAPES]
+        del patch['layout']['annotations'][N_BASE_ANNOTATIONS]
+        del patch['layout']['xaxis2']
+        del patch['layout']['yaxis2']
+
+    # only send the shape opacities that change
+    before, after = _shape_opacities(prev, ranks), _shape_opacities(overlay, ranks)
+    for i in np.flatnonzero(before != after):
+        patch['layout']['shapes'][int(i)]['opacity'] = float(after[i])
+    before, after = _trace_opacities(prev), _trace_opacities(overlay)
+    for i in np.flatnonzero(before != after):
+        patch['data'][BIN_TRACES[i][0]]['opacity'] = float(after[i])
+
+    # Add inset network plot for carea
+    if overlay and not key.startswith('bin_'):
+        traces = inset_traces(key)
+        if heatmap:
+            traces = [heatmap_trace(key)] + traces  # first, so roads and lanes draw over it
+            overlay['heatmap'] = True
+        patch['layout']['xaxis2'] = INSET_XAXIS
+        patch['layout']['yaxis2'] = INSET_YAXIS
+        patch['layout']['shapes'].append(INSET_SHAPE)
+        patch['layout']['annotations'].append(INSET_ANNOTATION)
+        patch['data'].extend(traces)
+        overlay['traces'] = len(traces)
+
+    return patch, overlay
+
+
+def heatmap_patch(overlay, heatmap, view=None):
+    """Patch adding, re-rasterizing (for inset view `view`) or removing the heatmap trace
+    of the community inset in `overlay`. Returns the Patch (None if there is no inset)
+    and the new overlay record."""
+    if not overlay or overlay['key'].startswith('bin_'):
+        return None, overlay
+    patch = Patch()
+    overlay = dict(overlay)
+    had = overlay.get('heatmap', False)
+    if heatmap:
+        trace = heatmap_trace(overlay['key'], None if view == 'reset' else view)
+        if had:
+            patch['data'][N_BASE_TRACES] = trace
+        else:
+            patch['data'].insert(N_BASE_TRACES, trace)
+            overlay['traces'] += 1
+    elif had:
+        del patch['data'][N_BASE_TRACES]
+        overlay['traces'] -= 1
+    overlay['heatmap'] = heatmap
+    return patch, overlay
+
+
+def _crash_rates(crash_range):
+    # (crash count, severe rate) per community over a date range
+    window = crash_window(crash_range)
+    if window is None:
+        return community_stats.column('total_crashes'), community_stats.column('severe_rate')
+    return window.total, window.rate
+
+
+def crash_patch(patch, crash_range, ranks):
+    """Adds the crash encodings for a date range to `patch`: injury bar heights, crash
+    counts and % severe on every tile, and the range label on the reference square."""
+    total, rate = _crash_rates(crash_range)
+    if crash_window(crash_range) is None:
+        label = fig.layout.annotations[RANGE_ANNOTATION].text
+    else:
+        first, last = crash_range
+        label = f"Reported {crash_cube.month_label(first)} – {crash_cube.month_label(last)}"
+
+    if TEXT_TRACE is None:
+        bar_y0 = TILE_MAXY - TILE_H * rate
+        for i in range(len(community_stats)):
+            patch['layout']['shapes'][3 * i + 1]['y0'] = float(bar_y0[i])
+            patch['layout']['annotations'][3 * i]['text'] = str(total[i])
+            patch['layout']['annotations'][3 * i + 1]['text'] = f"{int(rate[i] * 100)}%"
+    else:
+        for index, _, y in bin_trace_paths(ranks, rate, layers=[BAR_LAYER]):
+            patch['data'][index]['y'] = y
+        patch['data'][TEXT_TRACE]['text'] = (
+            [str(t) for t in total] + [f"{int(r * 100)}%" for r in rate] + list(community_stats.column('abbrev'))
+        )
+    patch['layout']['annotations'][RANGE_ANNOTATION]['text'] = label
+    return patch
+
+
+def score_patch(patch, overlay, before, after, crash_range):
+    """Adds a re-scoring to `patch`: moves the communities whose bike rank changed from
+    ranks `before` to `after` into their new bin (tile and badge colors, bin filter dimming)."""
+    moved = np.flatnonzero(before != after)
+    if TEXT_TRACE is None:
+        for i in moved:
+            fill = BIN_COLORS[int(after[i])]
+            patch['layout']['shapes'][3 * int(i)]['fillcolor'] = fill
+            patch['layout']['shapes'][3 * int(i) + 2]['fillcolor'] = fill
+        old, new = _shape_opacities(overlay, before), _shape_opacities(overlay, after)
+        for i in np.flatnonzero(old != new):
+            patch['layout']['shapes'][int(i)]['opacity'] = float(new[i])
+    else:
+        # batched: every bin trace that gained or lost a community gets new paths
+        bins = sorted(set(before[moved]) | set(after[moved]))
+        _, rate = _crash_rates(crash_range)
+        for index, x, y in bin_trace_paths(after, rate, bins=bins):
+            patch['data'][index]['x'] = x
+            patch['data'][index]['y'] = y
+    return patch
+
+
+def panel_data_patch(crash_range, scores):
+    # client-side panel: swap every community's crash and score fields for the date
+    # range and weights
+    window = crash_window(crash_range)
+    patch = Patch()
+    for name in community_stats.names:
+        patch['communities'][name].update({**panel_crash_data(name, window), **panel_score_data(name, scores)})
+    return patch
+
+
+# One server callback per user action: every trigger resolves to the selection key and
+# all outputs are derived from it here, so no output feeds another server callback.
+# With the client-side panel the browser resolves the key itself (resolve_selection
+# below) and shows the panel, dropdown and view at once; the server callback then only
+# sends what the browser doesn't have: the cartogram patch and the re-scored panel data.
+selection_outputs = dict(
+    figure=Output('cartogram', 'figure'),
+    overlay=Output('cartogram-overlay', 'data'),
+    scoring=Output('scoring', 'data'),
+)
+if not CLIENTSIDE_PANEL:
+    selection_inputs = dict(
+        clickData=Input('cartogram', 'clickData'),
+        dropdown_value=Input('carea-dropdown', 'value'),
+        show_clicks=Input('show-network-btn', 'n_clicks'),
+        exit_clicks=Input('exit-network-btn', 'n_clicks'),
     )
-    
+    selection_outputs.update(
+        selection=Output('selection', 'data'),
+        dropdown=Output('carea-dropdown', 'value'),
+        cartogram_style=Output('cartogram', 'style'),
+        iframe_style=Output('network-iframe', 'style'),
+        exit_style=Output('exit-network-btn', 'style'),
+        info=Output('info-panel', 'children'),
+    )
+    selection_state = dict(current=State('selection', 'data'))
+else:
+    selection_inputs = dict(selection=Input('selection', 'data'))
+    selection_outputs['panel_data'] = Output('panel-data', 'data')
+    selection_state = {}
 
-    for trace in network_fig['data']:
-        trace['xaxis'] = 'x2'
-        trace['yaxis'] = 'y2'
-        trace['showlegend'] = False
-        updated_fig.add_trace(trace)
 
-    return updated_fig
+@app.callback(
+    output=selection_outputs,
+    inputs=dict(
+        **selection_inputs,
+        crash_range=Input('crash-range', 'value'),
+        weights=[Input(slider_id, 'value') for _, slider_id in WEIGHT_SLIDERS],
+        mix=Input('score-mix', 'value'),
+        heatmap=Input('crash-heatmap', 'value'),
+        relayout=Input('inset-view', 'data'),
+    ),
+    state=dict(**selection_state, overlay=State('cartogram-overlay', 'data'), scoring=State('scoring', 'data')),
+    prevent_initial_call=True
+)
+def update_selection(crash_range, weights, mix, heatmap, relayout, overlay, scoring, clickData=None,
+                     dropdown_value=None, show_clicks=None, exit_clicks=None, current=None, selection=None):
+    # inset zooms arrive through the inset-view store, filtered in the browser (inset_relayout)
+    zoomed = ctx.triggered_id == 'inset-view'
+    if CLIENTSIDE_PANEL:
+        # already resolved and shown by the browser; only the figure can lag behind it
+        key = current = selection
+    else:
+        key = resolve_selection(ctx.triggered_id, clickData, dropdown_value, current)
+    range_changed = ctx.triggered_id == 'crash-range'
+    params = score_params(weights, mix)
+    scores_changed = params != scoring
+    heatmap = bool(heatmap)
+    view = inset_view(relayout, key) if zoomed and heatmap else None
+    heatmap_changed = ctx.triggered_id == 'crash-heatmap' or view is not None
+    if zoomed and view is None:
+        raise PreventUpdate  # nothing drawn depends on this relayout
+    view_changed = range_changed or scores_changed or heatmap_changed
+    figure_key = None if key == 'network' else key
+    figure_changed = (overlay or {}).get('key') != figure_key
+    if METRICS_ENABLED and not view_changed:
+        metrics.observe_selection(key)
+    if key == current and not figure_changed and not view_changed:
+        raise PreventUpdate
+
+    out = {name: no_update for name in selection_outputs}
+    if 'selection' in out and key != current:
+        out['selection'] = key
+    scores = score_set(params)
+    ranks = (scores or default_scores).ranks
+
+    # cartogram: only the delta from the overlay already on the client, plus the crash
+    # encodings when the date range moved, the re-binned tiles when the weights did and
+    # the inset heatmap when it was toggled or the inset zoomed
+    patch = None
+    if figure_changed:
+        patch, out['overlay'] = overlay_patch(overlay, figure_key, ranks, heatmap)
+    elif heatmap_changed:
+        patch, out['overlay'] = heatmap_patch(overlay, heatmap, view)
+    if range_changed:
+        patch = crash_patch(patch or Patch(), crash_range, ranks)
+    if scores_changed:
+        before = (score_set(scoring) or default_scores).ranks
+        patch = score_patch(patch or Patch(), {'key': figure_key} if figure_key else None, before, ranks, crash_range)
+        out['scoring'] = params
+    if patch is not None:
+        out['figure'] = patch
+
+    # dropdown mirrors the selected community; writing it does not re-trigger this callback
+    dropdown = key if key in community_stats else None
+    if 'dropdown' in out and ctx.triggered_id != 'carea-dropdown' and dropdown != dropdown_value:
+        out['dropdown'] = dropdown
+
+    if 'exit_style' in out and (key == 'network') != (current == 'network'):
+        network = key == 'network'
+        out['cartogram_style'] = {'display': 'none'} if network else CARTOGRAM_STYLE
+        out['iframe_style'] = IFRAME_STYLE if network else {'display': 'none'}
+        out['exit_style'] = {'display': 'inline-block'} if network else {'display': 'none'}
+
+    if 'info' in out and (key != current or range_changed or scores_changed):
+        out['info'] = info_panel(key, crash_range, params)
+    if 'panel_data' in out and (range_changed or scores_changed):
+        out['panel_data'] = panel_data_patch(crash_range, scores)
+    return out
+
+
+# cartogram relayouts (autosize, pan, zoom) stay in the browser unless they zoom the
+# inset while the heatmap is drawn; those go to update_selection through inset-view
+app.clientside_callback(
+    ClientsideFunction(namespace='bikeability', function_name='inset_relayout'),
+    Output('inset-view', 'data'),
+    Input('cartogram', 'relayoutData'),
+    State('crash-heatmap', 'value'),
+    State('cartogram-overlay', 'data'),
+    prevent_initial_call=True
+)
+
+
+if CLIENTSIDE_PANEL:
+    # the browser turns clicks, the dropdown and the network buttons into the selection
+    # key (and mirrors it to the dropdown and the view styles) without a round trip ...
+    app.clientside_callback(
+        ClientsideFunction(namespace='bikeability', function_name='resolve_selection'),
+        Output('selection', 'data'),
+        Output('carea-dropdown', 'value'),
+        Output('cartogram', 'style'),
+        Output('network-iframe', 'style'),
+        Output('exit-network-btn', 'style'),
+        Input('cartogram', 'clickData'),
+        Input('carea-dropdown', 'value'),
+        Input('show-network-btn', 'n_clicks'),
+        Input('exit-network-btn', 'n_clicks'),
+        State('selection', 'data'),
+        State('panel-data', 'data'),
+        prevent_initial_call=True
+    )
+    # ... and renders the panel from the panel-data store (whose crash and score fields
+    # update_selection patches when the date range or the weights move)
+    app.clientside_callback(
+        ClientsideFunction(namespace='bikeability', function_name='render_info'),
+        Output('info-panel', 'children'),
+        Input('selection', 'data'),
+        Input('panel-data', 'data'),
+        prevent_initial_call=True
+    )
+
 
+if CACHE_WARM:
+    # fill every selection key at boot so steady-state callbacks are dict lookups
+    response_cache.warm([('info', 'network')], lambda key: network_mode_panel)
+    response_cache.warm([('info', name) for name in [None] + community_stats.names], lambda key: build_info_panel(key[1]))
+    response_cache.warm([('inset', name) for name in community_stats.names], lambda key: build_inset_traces(key[1]))
+    mark('cache warm')
 
 
 import os
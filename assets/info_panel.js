@@ -0,0 +1,153 @@
+// Client-side info panel (enabled with BIKEABILITY_CLIENTSIDE_PANEL=1).
+// Mirrors resolve_selection and info_panel in app.py: turns clicks, the dropdown and
+// the network buttons into the `selection` store and renders it from the `panel-data`
+// store (loaded once; only its crash and score fields change, with the date range and
+// weights) instead of asking the server on every selection.
+
+(function () {
+    function el(type, children, props) {
+        return {
+            namespace: 'dash_html_components',
+            type: type,
+            props: Object.assign({children: children === undefined ? null : children}, props || {})
+        };
+    }
+
+    var LABEL = {color: '#BBBBBB'};
+    var LEFT = {marginLeft: '0px'};
+    var HR = {margin: '12px 0'};
+    var LINK = {color: 'lightgray', textDecoration: 'none'};
+
+    function swatch(borderImage) {
+        var style = {
+            display: 'inline-block',
+            width: '30px',
+            height: '8px',
+            borderTop: '2px solid lightgray'
+        };
+        if (borderImage) {
+            style.borderImage = borderImage;
+        } else {
+            style.marginTop = '0px';
+        }
+        style.marginRight = '8px';
+        style.transform = 'translateY(+3.5px)';
+        return el('Div', null, {style: style});
+    }
+
+    // same order and dash patterns as the server panel
+    var LANES = [
+        ['PROTECTED_MI', 'Protected:', null],
+        ['NEIGHBORHOOD_MI', 'Neighborhood:', 'repeating-linear-gradient(to right, lightgray 0 6px, transparent 6px 8px, lightgray 8px 10px, transparent 10px 12px) 100% 1'],
+        ['BUFFERED_MI', 'Buffered:', 'repeating-linear-gradient(to right, lightgray 0 8px, transparent 8px 10px) 100% 1'],
+        ['BIKE_MI', 'Bike:', 'repeating-linear-gradient(to right, lightgray 0 5px, transparent 5px 6px) 100% 1'],
+        ['SHARED_MI', 'Shared:', 'repeating-linear-gradient(to right, lightgray 0 2px, transparent 2px 5px) 100% 1']
+    ];
+
+    function link(text, href) {
+        return el('A', text, {href: href, target: '_blank', rel: 'noopener noreferrer', style: LINK});
+    }
+
+    function communityPanel(c) {
+        var lanes = LANES.filter(function (l) { return l[0] in c.lanes; }).map(function (l) {
+            return el('Li', [swatch(l[2]), el('Span', l[1], {style: LABEL}), ' ' + c.lanes[l[0]] + ' mi']);
+        });
+        var hotspots = c.hotspots.length ? [
+            el('P', '📍 Crash Hotspots:', {style: LEFT}),
+            el('Ul', c.hotspots.map(function (h) {
+                return el('Li', [el('Span', h[0], {style: LABEL}), ' ' + h[1]]);
+            }))
+        ] : [];
+        return el('Div', [
+            el('H3', c.title),
+            el('P', 'Population: ~' + c.population),
+            el('P', '🤕 Reported Crashes: ' + c.total_crashes),
+            el('P', 'Top Causes:', {style: LEFT}),
+            el('Ul', c.causes.map(function (cause) { return el('Li', cause, {style: LABEL}); })),
+            el('P', 'Injury Breakdown:', {style: LEFT}),
+            el('Ul', c.injuries.map(function (inj) {
+                return el('Li', [el('Span', inj[0], {style: LABEL}), ' ' + inj[1]]);
+            })),
+            el('P', '🩸 Severe Injuries: ' + c.severe)
+        ].concat(hotspots, [
+            el('Hr', null, {style: HR}),
+            el('P', '🚲 Bikeability: ' + c.bike_rank + '/5'),
+            el('P', 'Roads: ~' + c.road_length + ' mi'),
+            el('P', 'Bike Lanes:', {style: LEFT}),
+            el('Ul', lanes, {style: {listStyleType: 'none', paddingLeft: '0', marginLeft: '20px'}}),
+            el('P', '🛠️ Infrastructure Score: ' + c.infrastructure_score, {style: LEFT}),
+            el('P', '🌐 Network Score: ' + c.network_score, {style: LEFT}),
+            el('Hr', null, {style: HR}),
+            el('Div', [
+                el('P', [link('Methodology', 'https://github.com/s-vishnoi/chicago-bikeability-map')],
+                   {style: {margin: '0 0 4px 0px'}}),
+                el('P', [link('Suggestions?', 'https://docs.google.com/forms/d/e/1FAIpQLSeFxMoI1pig3d9YPGAEFEN-uDXyC7-F7AdTir7p3XG_DYAhrg/viewform?usp=sharing&ouid=111142553725252767700')],
+                   {style: {margin: '0 0 0 0px'}})
+            ])
+        ]));
+    }
+
+    function promptPanel() {
+        return el('Div', [el('P', 'Click a community area or select from the dropdown.')],
+                  {style: {paddingBottom: '200px'}});
+    }
+
+    function renderInfo(selection, panelData) {
+        if (selection === 'network') {
+            return panelData.network_panel;
+        }
+        var community = selection && panelData.communities[selection];
+        return community ? communityPanel(community) : promptPanel();
+    }
+
+    // same rules as resolve_selection in app.py
+    function selectionKey(trigger, clickData, dropdownValue, current, communities) {
+        if (trigger === 'show-network-btn') {
+            return 'network';
+        }
+        if (trigger === 'exit-network-btn') {
+            return null;
+        }
+        if (current === 'network') {
+            return current;
+        }
+        var key = current;
+        if (trigger === 'cartogram' && clickData) {
+            key = clickData.points[0].customdata;
+        } else if (trigger === 'carea-dropdown') {
+            key = dropdownValue || null;
+        }
+        if (key && !(key in communities) && key.indexOf('bin_') !== 0) {
+            return null;
+        }
+        return key;
+    }
+
+    function resolveSelection(clickData, dropdownValue, showClicks, exitClicks, current, panelData) {
+        var noUpdate = window.dash_clientside.no_update;
+        var triggered = window.dash_clientside.callback_context.triggered;
+        var trigger = triggered.length ? triggered[0].prop_id.split('.')[0] : null;
+        var key = selectionKey(trigger, clickData, dropdownValue, current, panelData.communities);
+        if (key === current) {
+            return [noUpdate, noUpdate, noUpdate, noUpdate, noUpdate];
+        }
+        // the dropdown mirrors the selected community; writing it does not re-trigger this
+        var dropdown = key in panelData.communities ? key : null;
+        var out = [key, trigger !== 'carea-dropdown' && dropdown !== dropdownValue ? dropdown : noUpdate,
+                   noUpdate, noUpdate, noUpdate];
+        if ((key === 'network') !== (current === 'network')) {
+            var network = key === 'network';
+            out[2] = network ? {display: 'none'} : panelData.views.cartogram;
+            out[3] = network ? panelData.views.iframe : {display: 'none'};
+            out[4] = {display: network ? 'inline-block' : 'none'};
+        }
+        return out;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        bikeability: Object.assign({}, (window.dash_clientside || {}).bikeability, {
+            resolve_selection: resolveSelection,
+            render_info: renderInfo
+        })
+    });
+})();
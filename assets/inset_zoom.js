@@ -0,0 +1,26 @@
+// Inset zoom filter for the crash heatmap.
+// Every autosize, pan and zoom of the cartogram sets its relayoutData. Only a zoom of
+// the community inset with the heatmap drawn needs the server (to re-rasterize the
+// heatmap for the new view), so only those reach the `inset-view` store that
+// update_selection in app.py listens to.
+
+(function () {
+    var INSET_AXES = /^[xy]axis2\.(range|autorange)/;
+
+    function insetRelayout(relayout, heatmap, overlay) {
+        var noUpdate = window.dash_clientside.no_update;
+        if (!relayout || !heatmap || !heatmap.length || !overlay || !overlay.heatmap) {
+            return noUpdate;
+        }
+        if (!Object.keys(relayout).some(function (k) { return INSET_AXES.test(k); })) {
+            return noUpdate;
+        }
+        return relayout;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        bikeability: Object.assign({}, (window.dash_clientside || {}).bikeability, {
+            inset_relayout: insetRelayout
+        })
+    });
+})();
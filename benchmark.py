@@ -0,0 +1,239 @@
+import os
+import sys
+import json
+import gzip
+import time
+import argparse
+import platform
+import statistics
+
+# === Benchmark ===
+# Headless, in one fresh process: import time of shared/layout/app (with the stage
+# breakdown from boot_timer), latency and response size of the selection callback for
+# every selection key, the layout fetch, server callbacks per interaction and RSS.
+# Results are written as JSON and compared against a baseline saved on the same
+# machine; none is committed, as timings depend on the hardware.
+#   python benchmark.py                        # run, write benchmarks/latest.json
+#   python benchmark.py --save-baseline        # ... and store it as the baseline
+#   python benchmark.py --data bundle --cartogram batched
+# With a baseline, exits 1 when a metric regresses past its tolerance.
+
+BENCH_DIR = os.path.join(os.path.dirname(__file__), "benchmarks")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+LATEST_FILE = os.path.join(BENCH_DIR, "latest.json")
+
+# allowed ratio to the baseline before a metric counts as a regression
+TOLERANCE = {'seconds': 1.25, 'ms': 1.25, 'bytes': 1.05, 'mb': 1.15, 'calls': 1.0}
+# ... and by more than this much, so timer noise on tiny values is not flagged
+NOISE_FLOOR = {'seconds': 0.05, 'ms': 1.0, 'bytes': 0, 'mb': 5, 'calls': 0}
+
+
+def _rss_mb():
+    # current resident set size (Linux); falls back to the peak
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _timed_import(name):
+    t0 = time.perf_counter()
+    __import__(name)
+    return time.perf_counter() - t0
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def _selection_callback(app):
+    # the server callback behind every selection (the one that patches the cartogram)
+    return next((k, v) for k, v in app.callback_map.items() if 'cartogram-overlay.data' in k)
+
+
+def _callback_body(app, triggered, values):
+    # the request the Dash renderer sends for the selection callback
+    output, spec = _selection_callback(app)
+    outputs = [dict(zip(('id', 'property'), o.rsplit('.', 1))) for o in output.strip('.').split('...')]
+    return {
+        'output': output,
+        'outputs': outputs,
+        'inputs': [dict(d, value=values.get(f"{d['id']}.{d['property']}")) for d in spec['inputs']],
+        'state': [dict(d, value=values.get(f"{d['id']}.{d['property']}")) for d in spec['state']],
+        'changedPropIds': [triggered],
+    }
+
+
+def interactions(names):
+    # interaction -> list of (label, triggered prop, prop values) from the initial view
+    click = lambda key: {'points': [{'customdata': key}]}
+    return {
+        'click_community': [(n, 'cartogram.clickData', {'cartogram.clickData': click(n)}) for n in names],
+        'click_bin': [(f"bin_{b}", 'cartogram.clickData', {'cartogram.clickData': click(f"bin_{b}")}) for b in range(5)],
+        'dropdown': [(n, 'carea-dropdown.value', {'carea-dropdown.value': n}) for n in names],
+        'show_network': [('network', 'show-network-btn.n_clicks', {'show-network-btn.n_clicks': 1})],
+        'exit_network': [(None, 'exit-network-btn.n_clicks',
+                          {'exit-network-btn.n_clicks': 1, 'selection.data': 'network'})],
+    }
+
+
+def measure_callbacks(app, names, repeat):
+    client = app.server.test_client()
+    # with the client-side panel the browser resolves the selection and posts only the key
+    client_resolves = any(d['id'] == 'selection' for d in _selection_callback(app)[1]['inputs'])
+    results = {}
+    for interaction, cases in interactions(names).items():
+        cold, warm, raw, compressed = [], [], [], []
+        for label, triggered, values in cases:
+            if client_resolves:
+                triggered, values = 'selection.data', {'selection.data': label}
+            body = _callback_body(app, triggered, values)
+            for i in range(repeat + 1):
+                t0 = time.perf_counter()
+                r = client.post("/_dash-update-component", json=body)
+                ms = (time.perf_counter() - t0) * 1000
+                if r.status_code not in (200, 204):
+                    raise RuntimeError(f"{interaction} {label}: HTTP {r.status_code}")
+                (cold if i == 0 else warm).append(ms)
+            raw.append(len(r.data))
+            compressed.append(len(gzip.compress(r.data)))
+        results[interaction] = {
+            'keys': len(cases),
+            'cold_ms_mean': statistics.fmean(cold),
+            'p50_ms': _percentile(warm, 50) if warm else None,
+            'p95_ms': _percentile(warm, 95) if warm else None,
+            'max_ms': max(warm) if warm else None,
+            'bytes_mean': statistics.fmean(raw),
+            'bytes_max': max(raw),
+            'gzip_bytes_mean': statistics.fmean(compressed),
+        }
+    return results
+
+
+def measure_layout(app):
+    client = app.server.test_client()
+    t0 = time.perf_counter()
+    r = client.get("/_dash-layout")
+    ms = (time.perf_counter() - t0) * 1000
+    return {'ms': ms, 'bytes': len(r.data), 'gzip_bytes': len(gzip.compress(r.data))}
+
+
+def run(repeat):
+    t0 = time.perf_counter()
+    imports = {name: _timed_import(name) for name in ('shared', 'layout', 'app')}
+    imports['total'] = time.perf_counter() - t0
+
+    import boot_timer
+    from app import app
+    from shared import DATA_MODE, CARTOGRAM_MODE, CLIENTSIDE_PANEL, community_stats
+    from callback_graph import count_invocations
+
+    rss_boot = _rss_mb()
+    layout = measure_layout(app)
+    callbacks = measure_callbacks(app, sorted(community_stats.names), repeat)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'data': DATA_MODE,
+            'cartogram': CARTOGRAM_MODE,
+            'clientside_panel': CLIENTSIDE_PANEL,
+            'repeat': repeat,
+        },
+        'import_seconds': imports,
+        'stage_seconds': dict(boot_timer.STAGES),
+        'rss_mb': {'boot': rss_boot, 'after_callbacks': _rss_mb()},
+        'layout': layout,
+        'callbacks': callbacks,
+        'server_calls': {label: server for label, (server, _) in count_invocations(app).items()},
+    }
+
+
+def _metrics(results):
+    # flat {metric path: (value, unit)} of everything compared against the baseline
+    out = {}
+    for name, v in results['import_seconds'].items():
+        out[f"import_seconds.{name}"] = (v, 'seconds')
+    for name, v in results['stage_seconds'].items():
+        out[f"stage_seconds.{name}"] = (v, 'seconds')
+    out['rss_mb.boot'] = (results['rss_mb']['boot'], 'mb')
+    out['layout.bytes'] = (results['layout']['bytes'], 'bytes')
+    for interaction, r in results['callbacks'].items():
+        for key, unit in (('cold_ms_mean', 'ms'), ('p50_ms', 'ms'), ('p95_ms', 'ms'), ('bytes_max', 'bytes')):
+            if r[key] is not None:
+                out[f"callbacks.{interaction}.{key}"] = (r[key], unit)
+    for label, n in results['server_calls'].items():
+        out[f"server_calls.{label}"] = (n, 'calls')
+    return out
+
+
+def compare(results, baseline):
+    # list of (metric, baseline, current, ratio, regressed)
+    rows = []
+    current = _metrics(results)
+    for metric, (before, unit) in _metrics(baseline).items():
+        if metric not in current:
+            continue
+        now = current[metric][0]
+        ratio = now / before if before else (1.0 if now == before else float('inf'))
+        rows.append((metric, before, now, ratio, ratio > TOLERANCE[unit] and now - before > NOISE_FLOOR[unit]))
+    return rows
+
+
+def _write(path, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(results, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark startup, callbacks and payload size.")
+    parser.add_argument("--data", choices=["source", "bundle"], help="BIKEABILITY_DATA for this run")
+    parser.add_argument("--cartogram", choices=["shapes", "batched"], help="BIKEABILITY_CARTOGRAM for this run")
+    parser.add_argument("--repeat", type=int, default=5, help="warm calls per selection key")
+    parser.add_argument("--out", default=LATEST_FILE, help="results file")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args()
+
+    if args.data:
+        os.environ["BIKEABILITY_DATA"] = args.data
+    if args.cartogram:
+        os.environ["BIKEABILITY_CARTOGRAM"] = args.cartogram
+
+    results = run(args.repeat)
+    _write(args.out, results)
+
+    print(f"import: " + ", ".join(f"{k} {v:.2f}s" for k, v in results['import_seconds'].items()))
+    print(f"stages: " + ", ".join(f"{k} {v:.2f}s" for k, v in results['stage_seconds'].items()))
+    print(f"rss: {results['rss_mb']['boot']:.0f} MB after boot")
+    print(f"layout: {results['layout']['bytes']:,} bytes ({results['layout']['gzip_bytes']:,} gzip)")
+    for interaction, r in results['callbacks'].items():
+        warm = f"p50 {r['p50_ms']:.1f} ms, p95 {r['p95_ms']:.1f} ms" if r['p50_ms'] is not None else ""
+        print(f"  {interaction:<16} cold {r['cold_ms_mean']:.1f} ms, {warm}, "
+              f"{r['bytes_max']:,} bytes max ({r['gzip_bytes_mean']:,.0f} gzip mean)")
+    print(f"wrote {args.out}")
+
+    if args.save_baseline:
+        _write(args.baseline, results)
+        print(f"saved baseline {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ('data', 'cartogram', 'clientside_panel'):
+            if baseline['meta'].get(key) != results['meta'][key]:
+                print(f"note: baseline has {key}={baseline['meta'].get(key)}, this run {results['meta'][key]}")
+        rows = compare(results, baseline)
+        regressions = [row for row in rows if row[4]]
+        for metric, before, now, ratio, _ in regressions:
+            print(f"REGRESSION {metric}: {before:.4g} -> {now:.4g} ({ratio:.2f}x)")
+        print(f"{len(rows)} metrics compared with {args.baseline}, {len(regressions)} regressions")
+        sys.exit(1 if regressions else 0)
+    else:
+        print(f"no baseline at {args.baseline}; nothing compared (save one with --save-baseline)")
@@ -0,0 +1,21 @@
+import time
+
+# === Boot stage timings ===
+# shared.py and layout.py call mark() at the end of each import stage; the time since
+# the previous mark is added to that stage. Read by the benchmark and /metrics.
+
+PROCESS_START = time.time()
+STAGES = {}  # stage -> seconds, in the order the stages ran
+
+_last = time.perf_counter()
+
+
+def mark(stage):
+    global _last
+    now = time.perf_counter()
+    STAGES[stage] = STAGES.get(stage, 0.0) + now - _last
+    _last = now
+
+
+def boot_seconds():
+    return sum(STAGES.values())
@@ -0,0 +1,166 @@
+import os
+import json
+import argparse
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from insets import write_insets
+from geometry_store import write_segment_geometry
+
+# === Precompiled data bundle ===
+# `python bundle.py build` runs the source pipeline in shared.py once and writes every
+# derived table into data/bundle/ as one NPZ (column arrays) plus a JSON manifest,
+# and the network insets and lane segment geometry into memory-mappable stores
+# (see insets.py and geometry_store.py), the crash month cube (crash_cube.py) and the
+# crash heatmap grids (crash_heatmap.py). Crash hotspots (hotspots.py) and lane crash
+# risk (segment_risk.py) ride along in the manifest lookups.
+# With BIKEABILITY_DATA=bundle, shared.py loads only this bundle at import time.
+
+BUNDLE_VERSION = 9
+BUNDLE_DIR = os.path.join(os.path.dirname(__file__), "data", "bundle")
+TABLES_FILE = "tables.npz"
+MANIFEST_FILE = "manifest.json"
+
+# DataFrames stored column by column in tables.npz
+BUNDLE_TABLES = ['viz_df', 'bike_lane_summary', 'miles_by_type', 'segments']
+
+
+def _to_json_safe(obj):
+    # numpy scalars from the pickles/groupbys -> plain python
+    if isinstance(obj, dict):
+        return {str(k): _to_json_safe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_json_safe(v) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def _column_array(series):
+    # strings as fixed-width unicode (no pickled objects); missing strings as ''
+    if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+        return np.asarray(series.fillna('').astype(str).to_numpy(), dtype=str)
+    return series.to_numpy()
+
+
+def write_bundle(tables, lookups, outline_xy, out_dir=BUNDLE_DIR, insets=None, segment_geometry=None, crash_cube=None,
+                 crash_heatmap=None):
+    os.makedirs(out_dir, exist_ok=True)
+
+    arrays = {}
+    table_meta = {}
+    for name, df in tables.items():
+        cols = [str(c) for c in df.columns]
+        for col in df.columns:
+            arrays[f"{name}/{col}"] = _column_array(df[col])
+        table_meta[name] = {
+            'columns': cols,
+            'dtypes': [str(arrays[f"{name}/{c}"].dtype) for c in cols],
+            'rows': len(df),
+            'null_strings': [str(c) for c in df.columns
+                             if arrays[f"{name}/{c}"].dtype.kind == 'U' and df[c].isna().any()],
+        }
+    arrays['outline/x'] = np.asarray(outline_xy[0], dtype=np.float64)
+    arrays['outline/y'] = np.asarray(outline_xy[1], dtype=np.float64)
+
+    manifest = {
+        'version': BUNDLE_VERSION,
+        'built_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'tables': table_meta,
+        'lookups': _to_json_safe(lookups),
+        'insets': insets,
+        'segment_geometry': segment_geometry,
+        'crash_cube': crash_cube,
+        'crash_heatmap': crash_heatmap,
+    }
+
+    # write to temp names first so a half-written bundle is never picked up
+    tmp_tables = os.path.join(out_dir, TABLES_FILE + ".tmp")
+    tmp_manifest = os.path.join(out_dir, MANIFEST_FILE + ".tmp")
+    with open(tmp_tables, "wb") as f:
+        np.savez(f, **arrays)
+    with open(tmp_manifest, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_tables, os.path.join(out_dir, TABLES_FILE))
+    os.replace(tmp_manifest, os.path.join(out_dir, MANIFEST_FILE))
+    return manifest
+
+
+def load_bundle(bundle_dir=BUNDLE_DIR):
+    manifest_path = os.path.join(bundle_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No data bundle at {bundle_dir}; run `python bundle.py build` first")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != BUNDLE_VERSION:
+        raise RuntimeError(
+            f"Data bundle version {manifest.get('version')} != {BUNDLE_VERSION}; "
+            "rebuild with `python bundle.py build`"
+        )
+
+    out = dict(manifest['lookups'])
+    with np.load(os.path.join(bundle_dir, TABLES_FILE), allow_pickle=False) as npz:
+        for name, meta in manifest['tables'].items():
+            df = pd.DataFrame({c: npz[f"{name}/{c}"] for c in meta['columns']})
+            for c in meta.get('null_strings', []):
+                df[c] = df[c].replace('', np.nan)
+            out[name] = df
+        out['outline_xy'] = (npz['outline/x'].tolist(), npz['outline/y'].tolist())
+    out['manifest'] = manifest
+    return out
+
+
+def build(out_dir=BUNDLE_DIR):
+    # always compile from the raw sources, whatever the caller's env says
+    os.environ['BIKEABILITY_DATA'] = 'source'
+    import shared
+
+    tables = {name: getattr(shared, name) for name in BUNDLE_TABLES}
+    lookups = {
+        'carea_grid': [{'name': c.name, 'gridloc': list(c.gridloc)} for c in shared.CAreaGrid],
+        'citywide_stats': shared.citywide_stats,
+        'injury_counts_city': shared.injury_counts_city,
+        'top_causes_city': shared.top_causes_city,
+        'hotspots': shared.hotspots,
+        'segment_risk': shared.segment_risk,
+        'bin_colors': shared.BIN_COLORS,
+        'legend_colors': shared.LEGEND_COLORS,
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    insets = write_insets(shared.network_plots, out_dir)
+    segment_geometry = write_segment_geometry(shared.bike_with_neigh, out_dir)
+    cube = shared.crash_cube
+    cube.save(out_dir)
+    crash_cube = {'months': cube.n_months, 'first': cube.month_label(0), 'causes': len(cube.causes)}
+    heatmap = shared.get_crash_heatmap()
+    heatmap.save(out_dir)
+    crash_heatmap = {'crashes': heatmap.n_points, 'levels': len(heatmap.levels),
+                     'cells': [len(ids) for ids, _, _ in heatmap.levels]}
+    return write_bundle(tables, lookups, shared.city_outline_xy, out_dir,
+                        insets=insets, segment_geometry=segment_geometry, crash_cube=crash_cube,
+                        crash_heatmap=crash_heatmap)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the precompiled data bundle.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--out", default=BUNDLE_DIR, help="output directory")
+    args = parser.parse_args()
+
+    manifest = build(args.out)
+    print(f"Wrote bundle v{manifest['version']} to {args.out}:")
+    for name, meta in manifest['tables'].items():
+        print(f"  {name}: {meta['rows']} rows x {len(meta['columns'])} cols")
+    print(f"  insets: {manifest['insets']['communities']} communities, {manifest['insets']['points']} points")
+    for crs, meta in manifest['segment_geometry'].items():
+        print(f"  segment geometry ({crs}): {meta['segments']} segments, {meta['coords']} coords")
+    cube = manifest['crash_cube']
+    print(f"  crash cube: {cube['months']} months from {cube['first']}, {cube['causes']} causes")
+    heatmap = manifest['crash_heatmap']
+    print(f"  crash heatmap: {heatmap['crashes']} crashes, {heatmap['levels']} levels, "
+          f"{heatmap['cells'][0]} to {heatmap['cells'][-1]} cells")
+    hotspots = manifest['lookups']['hotspots']
+    print(f"  hotspots: {sum(len(v) for v in hotspots.values())} in {len(hotspots)} communities")
+    risk = manifest['lookups']['segment_risk']
+    if risk:
+        print(f"  segment risk: {sum(risk['lanes']['crashes'])} crashes on {len(risk['lanes']['risk'])} lane segments")
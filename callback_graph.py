@@ -0,0 +1,75 @@
+import sys
+
+# === Callback invocation check ===
+# Walks the registered callback graph the way the Dash renderer does: a changed prop
+# fires every callback that has it as an Input, and the outputs of those callbacks fire
+# the next wave (a callback is never re-triggered by its own outputs). Counts the server
+# round trips each user interaction costs; exits non-zero if any costs more than one.
+#   python callback_graph.py
+
+INTERACTIONS = {
+    'page load': None,
+    'cartogram click': 'cartogram.clickData',
+    'dropdown change': 'carea-dropdown.value',
+    'show network': 'show-network-btn.n_clicks',
+    'exit network': 'exit-network-btn.n_clicks',
+    'date range': 'crash-range.value',
+    'lane weight': 'weight-protected.value',
+    'score mix': 'score-mix.value',
+    'crash heatmap': 'crash-heatmap.value',
+    'inset zoom': 'cartogram.relayoutData',
+}
+MAX_WAVES = 10
+
+
+def _outputs(spec):
+    # '..a.b...c.d..' (multi-output) or 'a.b'
+    if spec.startswith('..'):
+        return spec.strip('.').split('...')
+    return [spec]
+
+
+def callback_specs(app):
+    return [{
+        'name': cb['output'],
+        'server': cb['clientside_function'] is None,
+        'inputs': {f"{d['id']}.{d['property']}" for d in cb['inputs']},
+        'outputs': set(_outputs(cb['output'])),
+        'initial': not cb['prevent_initial_call'],
+    } for cb in app._callback_list]
+
+
+def invocations(specs, prop):
+    """Callbacks run, wave by wave, after `prop` changes (None = initial page load)."""
+    if prop is None:
+        wave = [cb for cb in specs if cb['initial']]
+    else:
+        wave = [cb for cb in specs if prop in cb['inputs']]
+    runs = []
+    for _ in range(MAX_WAVES):
+        if not wave:
+            break
+        runs.extend(wave)
+        wave = [cb for cb in specs
+                if any(cb is not src and cb['inputs'] & src['outputs'] for src in wave)]
+    return runs
+
+
+def count_invocations(app):
+    # interaction -> (server callback runs, clientside callback runs)
+    specs = callback_specs(app)
+    counts = {}
+    for label, prop in INTERACTIONS.items():
+        runs = invocations(specs, prop)
+        server = sum(cb['server'] for cb in runs)
+        counts[label] = (server, len(runs) - server)
+    return counts
+
+
+if __name__ == "__main__":
+    from app import app
+
+    counts = count_invocations(app)
+    for label, (server, client) in counts.items():
+        print(f"{label:<16} server={server} clientside={client}")
+    sys.exit(0 if all(server <= 1 for server, _ in counts.values()) else 1)
@@ -0,0 +1,43 @@
+import numpy as np
+
+# === Indexed per-community table ===
+# viz_df stays the pandas view used to build the figure; callbacks read this instead.
+# Rows are addressed by integer community id (= row position in viz_df), names map
+# to ids through a dict. Bins come from the live score set (scoring.py), not from here.
+
+N_BINS = 5
+
+
+class CommunityStats:
+    def __init__(self, names, columns, n_bins=N_BINS):
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.columns = {col: np.asarray(values) for col, values in columns.items()}
+        for values in self.columns.values():
+            values.flags.writeable = False  # shared by every request thread (and forked worker)
+        self.n_bins = n_bins
+        self._rows = [None] * len(self.names)
+
+    @classmethod
+    def from_frame(cls, df, key='CArea', n_bins=N_BINS):
+        return cls(df[key].tolist(), {col: df[col].to_numpy() for col in df.columns}, n_bins)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def id_of(self, name):
+        return self.ids[name]
+
+    def column(self, col):
+        return self.columns[col]
+
+    def row(self, name):
+        # plain-python dict of one community's values; built once per community
+        i = self.ids[name]
+        if self._rows[i] is None:
+            self._rows[i] = {col: values[i].item() if isinstance(values[i], np.generic) else values[i]
+                             for col, values in self.columns.items()}
+        return self._rows[i]
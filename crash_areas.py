@@ -0,0 +1,138 @@
+import os
+import re
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# === Crash -> community area assignment ===
+# Streams a raw crash CSV (the city's Traffic Crashes export) in chunks, keeps the bike
+# crashes (FIRST_CRASH_TYPE = PEDALCYCLIST), tags each with the community area polygon
+# containing its LATITUDE/LONGITUDE, and writes crash_with_carea.csv, the input of every
+# crash count in the app. Polygons go into an STR-tree once per worker and each chunk is
+# a single bulk `intersects` query over shapely point arrays, so no Python loop runs per
+# crash. At most 2 x workers chunks are in flight, which keeps memory bounded however
+# long the history is. Other crash types, records without coordinates and records
+# outside every area are dropped; an export without FIRST_CRASH_TYPE is refused.
+#   python crash_areas.py --crashes traffic_crashes.csv --areas community_areas.geojson
+# Area names in the GeoJSON (e.g. "OHARE", "LAKE VIEW") are matched to CAreaGrid.json
+# ignoring case and punctuation.
+
+data_path = os.path.join(os.path.dirname(__file__), "data")
+AREAS_FILE = os.path.join(data_path, "community_areas.geojson")
+OUTPUT_FILE = os.path.join(data_path, "crash_with_carea.csv")
+
+CRASH_COLUMNS = ['CRASH_RECORD_ID', 'CRASH_DATE', 'PRIM_CONTRIBUTORY_CAUSE', 'MOST_SEVERE_INJURY', 'LATITUDE', 'LONGITUDE']
+CRASH_TYPE_COLUMN = 'FIRST_CRASH_TYPE'
+BIKE_CRASH_TYPE = 'PEDALCYCLIST'
+CHUNK_ROWS = 100_000
+
+
+def _name_key(name):
+    return re.sub(r'[^A-Z0-9]', '', str(name).upper())
+
+
+def load_areas(path, name_field="community"):
+    """(names, polygons) with names spelled as in CAreaGrid.json."""
+    import shapely
+
+    with open(os.path.join(data_path, "CAreaGrid.json")) as f:
+        grid_names = {_name_key(d['name']): d['name'] for d in json.load(f)}
+    with open(path) as f:
+        features = json.load(f)['features']
+
+    names, polygons = [], []
+    for feature in features:
+        raw = feature['properties'][name_field]
+        if _name_key(raw) not in grid_names:
+            raise ValueError(f"community area {raw!r} is not in CAreaGrid.json")
+        names.append(grid_names[_name_key(raw)])
+        polygons.append(shapely.from_geojson(json.dumps(feature['geometry'])))
+    return np.array(names, dtype=object), np.array(polygons, dtype=object)
+
+
+# === Worker state ===
+# set once per pool process by _init_worker
+_areas = {}
+
+
+def _init_worker(names, polygons):
+    import shapely
+
+    _areas['names'] = names
+    _areas['tree'] = shapely.STRtree(polygons)
+
+
+def assign(lon, lat):
+    """Community name per point (None where missing or outside every area)."""
+    import shapely
+
+    names = np.full(len(lon), None, dtype=object)
+    valid = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+    point_i, area_i = _areas['tree'].query(shapely.points(lon[valid], lat[valid]), predicate='intersects')
+    # a point on a shared border matches both areas; keep the first
+    point_i, first = np.unique(point_i, return_index=True)
+    names[valid[point_i]] = _areas['names'][area_i[first]]
+    return names
+
+
+def _tag_chunk(chunk):
+    chunk = chunk.loc[chunk[CRASH_TYPE_COLUMN] == BIKE_CRASH_TYPE, CRASH_COLUMNS].copy()
+    chunk['CArea'] = assign(chunk['LONGITUDE'].to_numpy(dtype=float), chunk['LATITUDE'].to_numpy(dtype=float))
+    return chunk.dropna(subset=['CArea'])
+
+
+def tag_crashes(crashes_path, areas_path, out_path=OUTPUT_FILE, workers=None, chunk_rows=CHUNK_ROWS,
+                name_field="community"):
+    missing = set(CRASH_COLUMNS + [CRASH_TYPE_COLUMN]) - set(pd.read_csv(crashes_path, nrows=0).columns)
+    if missing:
+        raise ValueError(f"{crashes_path} lacks {', '.join(sorted(missing))}; expected the Traffic Crashes export")
+    names, polygons = load_areas(areas_path, name_field)
+    chunks = pd.read_csv(crashes_path, usecols=CRASH_COLUMNS + [CRASH_TYPE_COLUMN], chunksize=chunk_rows)
+
+    workers = workers or os.cpu_count() or 1
+    rows_in = rows_out = 0
+    tmp = out_path + ".tmp"
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(names, polygons)) as pool, \
+            open(tmp, "w", newline="") as out:
+        pending = deque()
+        header = True
+
+        def drain(block):
+            nonlocal header, rows_out
+            tagged = block.result()
+            tagged.to_csv(out, index=False, header=header)
+            header = False
+            rows_out += len(tagged)
+
+        for chunk in chunks:
+            rows_in += len(chunk)
+            pending.append(pool.submit(_tag_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                drain(pending.popleft())
+        while pending:
+            drain(pending.popleft())
+        if header:  # no rows at all: still write the columns
+            out.write(','.join(CRASH_COLUMNS + ['CArea']) + '\n')
+    os.replace(tmp, out_path)
+    return rows_in, rows_out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tag raw crash records with their community area.")
+    parser.add_argument("--crashes", required=True, help="raw crash CSV (Traffic Crashes export)")
+    parser.add_argument("--areas", default=AREAS_FILE, help="community area boundaries GeoJSON")
+    parser.add_argument("--name-field", default="community", help="area name property in the GeoJSON")
+    parser.add_argument("--out", default=OUTPUT_FILE, help="output CSV")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows per chunk")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    rows_in, rows_out = tag_crashes(args.crashes, args.areas, args.out, args.workers, args.chunk_rows,
+                                    args.name_field)
+    elapsed = time.perf_counter() - t0
+    print(f"{rows_out} bike crashes of {rows_in} crashes tagged in {elapsed:.2f}s ({rows_in / elapsed:,.0f} rows/s) -> {args.out}")
@@ -0,0 +1,160 @@
+import os
+import numpy as np
+import pandas as pd
+
+# === Time-sliced crash cube ===
+# Crash counts per community x month x injury level and community x month x cause,
+# held as running sums along the month axis with a leading zero month:
+#   injuries[c, t, i] = crashes in community c with injury i in months before t
+# so any month range [a, b] is one subtraction, cum[:, b + 1] - cum[:, a], over all
+# communities at once, without touching crash rows. crash_ingest.py keeps a cube file
+# in data/ next to its count tables; bundle.py writes one into the bundle.
+
+CUBE_FILE = "crash_cube.npz"
+DATE_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+INJURY_ORDER = ['FATAL', 'INCAPACITATING INJURY', 'NONINCAPACITATING INJURY', 'REPORTED, NOT EVIDENT', 'NO INDICATION OF INJURY']
+SEVERE_INJURIES = ['FATAL', 'INCAPACITATING INJURY']
+IGNORED_CAUSES = ['UNABLE TO DETERMINE', 'NOT APPLICABLE']
+
+
+def _month_index(dates):
+    # months since year 0, so ranges are plain integer offsets
+    dates = pd.to_datetime(dates, format=DATE_FORMAT)
+    return (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+
+
+def _codes(values, labels):
+    lookup = {label: i for i, label in enumerate(labels)}
+    return np.array([lookup[v] for v in values], dtype=np.int64)
+
+
+class CrashWindow:
+    """Counts for one month range, rows in cube community order."""
+
+    def __init__(self, cube, injuries, causes):
+        self.cube = cube
+        self.injuries = injuries   # (communities, injury levels)
+        self.causes = causes       # (communities, causes)
+        self.total = injuries.sum(axis=1)
+        self.severe = injuries[:, cube.severe_levels].sum(axis=1)
+        self.rate = np.divide(self.severe, self.total, out=np.zeros(len(self.total)), where=self.total > 0)
+
+    def injury_counts(self, c):
+        # {injury level: count} for community row c over every level the cube has seen,
+        # zeros included (as the unstack behind injuries_dict)
+        return {k: int(self.injuries[c, i]) for i, k in enumerate(self.cube.injury_levels) if self.cube.seen_levels[i]}
+
+    def top_causes(self, c, n=5):
+        # most frequent first, ties alphabetical (causes are stored sorted)
+        counts = self.causes[c]
+        order = np.argsort(-counts, kind='stable')
+        return [self.cube.causes[k] for k in order if counts[k] and k not in self.cube.ignored_causes][:n]
+
+
+class CrashCube:
+    def __init__(self, names, start_month, injury_levels, causes, injury_cum, cause_cum):
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.start_month = int(start_month)
+        self.injury_levels = list(injury_levels)
+        self.causes = list(causes)
+        self.injury_cum = injury_cum
+        self.cause_cum = cause_cum
+        self.severe_levels = [i for i, k in enumerate(self.injury_levels) if k in SEVERE_INJURIES]
+        self.ignored_causes = {i for i, k in enumerate(self.causes) if k in IGNORED_CAUSES}
+        self.seen_levels = injury_cum[:, -1].sum(axis=0) > 0
+
+    @property
+    def n_months(self):
+        return self.injury_cum.shape[1] - 1
+
+    def month_label(self, t, fmt="%b %Y"):
+        month = self.start_month + t
+        return pd.Timestamp(year=month // 12, month=month % 12 + 1, day=1).strftime(fmt)
+
+    @classmethod
+    def empty(cls, names):
+        return cls(names, 0, INJURY_ORDER, [], np.zeros((len(names), 1, len(INJURY_ORDER)), dtype=np.int32),
+                   np.zeros((len(names), 1, 0), dtype=np.int32))
+
+    @classmethod
+    def from_frame(cls, crashes, names):
+        return cls.empty(names).add(crashes)
+
+    def add(self, crashes):
+        """New cube with `crashes` (CArea-tagged rows) counted in; grows any axis as needed."""
+        crashes = crashes.dropna(subset=['CArea', 'CRASH_DATE'])
+        if crashes.empty:
+            return self
+        months = _month_index(crashes['CRASH_DATE'])
+        names = self.names + sorted(set(crashes['CArea']) - set(self.names))
+        levels = self.injury_levels + sorted(set(crashes['MOST_SEVERE_INJURY'].dropna()) - set(self.injury_levels))
+        causes = sorted(set(self.causes) | set(crashes['PRIM_CONTRIBUTORY_CAUSE'].dropna()))
+        start = months.min() if self.n_months == 0 else min(self.start_month, months.min())
+        end = max(self.start_month + self.n_months, months.max() + 1)
+
+        def grown(cum, labels, new_labels):
+            # back to per-month counts, re-laid on the new axes
+            counts = np.zeros((len(names), end - start, len(new_labels)), dtype=np.int64)
+            if self.n_months:
+                at = self.start_month - start
+                rows = np.diff(cum, axis=1)
+                cols = _codes(labels, new_labels)
+                counts[:len(self.names), at:at + self.n_months][:, :, cols] = rows
+            return counts
+
+        injuries = grown(self.injury_cum, self.injury_levels, levels)
+        cause_counts = grown(self.cause_cum, self.causes, causes)
+        c, t = _codes(crashes['CArea'], names), months - start
+        known = crashes['MOST_SEVERE_INJURY'].notna().to_numpy()
+        np.add.at(injuries, (c[known], t[known], _codes(crashes['MOST_SEVERE_INJURY'][known], levels)), 1)
+        known = crashes['PRIM_CONTRIBUTORY_CAUSE'].notna().to_numpy()
+        np.add.at(cause_counts, (c[known], t[known], _codes(crashes['PRIM_CONTRIBUTORY_CAUSE'][known], causes)), 1)
+
+        def cumulative(counts):
+            cum = np.zeros((counts.shape[0], counts.shape[1] + 1, counts.shape[2]), dtype=np.int32)
+            np.cumsum(counts, axis=1, out=cum[:, 1:])
+            return cum
+
+        return CrashCube(names, start, levels, causes, cumulative(injuries), cumulative(cause_counts))
+
+    def window(self, first=0, last=None):
+        """Counts for months first..last (inclusive, offsets from start_month)."""
+        last = self.n_months - 1 if last is None else last
+        return CrashWindow(
+            self,
+            self.injury_cum[:, last + 1] - self.injury_cum[:, first],
+            self.cause_cum[:, last + 1] - self.cause_cum[:, first],
+        )
+
+    def save(self, out_dir, name=CUBE_FILE):
+        tmp = os.path.join(out_dir, name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, names=np.array(self.names, dtype=str), start_month=self.start_month,
+                     injury_levels=np.array(self.injury_levels, dtype=str), causes=np.array(self.causes, dtype=str),
+                     injury_cum=self.injury_cum, cause_cum=self.cause_cum)
+        os.replace(tmp, os.path.join(out_dir, name))
+
+    @classmethod
+    def load(cls, store_dir, name=CUBE_FILE):
+        path = os.path.join(store_dir, name)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as npz:
+            return cls(npz['names'].tolist(), npz['start_month'], npz['injury_levels'].tolist(),
+                       npz['causes'].tolist(), npz['injury_cum'], npz['cause_cum'])
+
+    def reindex(self, names):
+        """Same cube with rows in `names` order (communities without crashes get zeros)."""
+        if names == self.names:
+            return self
+        rows = [self.ids.get(name, -1) for name in names]
+
+        def take(cum):
+            out = np.zeros((len(names),) + cum.shape[1:], dtype=cum.dtype)
+            present = [i for i, r in enumerate(rows) if r >= 0]
+            out[present] = cum[[rows[i] for i in present]]
+            return out
+
+        return CrashCube(names, self.start_month, self.injury_levels, self.causes,
+                         take(self.injury_cum), take(self.cause_cum))
@@ -0,0 +1,112 @@
+import os
+import numpy as np
+
+# === Multi-resolution crash heatmap ===
+# Crash coordinates binned once into square lon/lat grids: level 0 has CELL_DEG cells
+# and each level above merges 2 x 2 cells of the one below. A level is stored sparse,
+# as sorted flat cell ids (row * cols + col) and their counts, so memory follows the
+# number of occupied cells, not the city extent or the number of crashes. A view is
+# rasterized at the finest level that fits MAX_CELLS cells on its longer side: one
+# searchsorted per grid row and a scatter into a dense array. The trace sent to the
+# browser is therefore at most MAX_CELLS x MAX_CELLS values however many crashes
+# there are.
+
+HEATMAP_FILE = "crash_heatmap.npz"
+CELL_DEG = 0.0005   # ~55 m north-south
+N_LEVELS = 8        # up to 0.064 deg (~7 km) cells
+MAX_CELLS = 48
+COLORSCALE = [[0, 'rgba(139, 0, 0, 0.15)'], [1, 'rgba(139, 0, 0, 0.85)']]
+
+
+def _window(ids, counts, n_cols, r0, r1, c0, c1):
+    # occupied cells of rows r0..r1, cols c0..c1: (row, col, count) arrays
+    rows = np.arange(r0, r1 + 1)
+    lo = np.searchsorted(ids, rows * n_cols + c0, side='left')
+    hi = np.searchsorted(ids, rows * n_cols + c1, side='right')
+    lengths = hi - lo
+    # concatenated lo[i]..hi[i] ranges without a Python loop
+    at = np.repeat(lo - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(lengths.sum())
+    return ids[at] // n_cols, ids[at] % n_cols, counts[at]
+
+
+class CrashHeatmap:
+    def __init__(self, origin, cell, levels):
+        self.origin = (float(origin[0]), float(origin[1]))  # lon, lat of the grid corner
+        self.cell = float(cell)
+        self.levels = levels  # [(ids, counts, n_cols)] from finest to coarsest
+
+    @property
+    def n_points(self):
+        return int(self.levels[0][1].sum()) if self.levels else 0
+
+    @classmethod
+    def from_points(cls, lon, lat, cell=CELL_DEG, n_levels=N_LEVELS):
+        lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+        valid = np.isfinite(lon) & np.isfinite(lat)
+        lon, lat = lon[valid], lat[valid]
+        if not len(lon):
+            return cls((0.0, 0.0), cell, [(np.zeros(0, np.int64), np.zeros(0, np.int32), 1)] * n_levels)
+        origin = (np.floor(lon.min() / cell) * cell, np.floor(lat.min() / cell) * cell)
+        col = ((lon - origin[0]) // cell).astype(np.int64)
+        row = ((lat - origin[1]) // cell).astype(np.int64)
+        levels = []
+        for level in range(n_levels):
+            c, r = col >> level, row >> level
+            n_cols = int(c.max()) + 1
+            ids, counts = np.unique(r * n_cols + c, return_counts=True)
+            levels.append((ids, counts.astype(np.int32), n_cols))
+        return cls(origin, cell, levels)
+
+    def level_for(self, width, height, max_cells=MAX_CELLS):
+        # finest level whose cells cover the view with at most max_cells per side
+        span = max(width, height) / self.cell
+        level = int(np.ceil(np.log2(max(span / max_cells, 1))))
+        return min(level, len(self.levels) - 1)
+
+    def raster(self, x0, x1, y0, y1, max_cells=MAX_CELLS):
+        """(level, lon of first column, lat of first row, cell size, counts[row, col]) for
+        the lon range x0..x1 and lat range y0..y1."""
+        level = self.level_for(x1 - x0, y1 - y0, max_cells)
+        ids, counts, n_cols = self.levels[level]
+        size = self.cell * 2 ** level
+        n_rows = int(ids[-1] // n_cols) + 1 if len(ids) else 1
+        c0 = max(int((x0 - self.origin[0]) // size), 0)
+        c1 = min(int((x1 - self.origin[0]) // size), n_cols - 1)
+        r0 = max(int((y0 - self.origin[1]) // size), 0)
+        r1 = min(int((y1 - self.origin[1]) // size), n_rows - 1)
+        grid = np.zeros((max(r1 - r0 + 1, 0), max(c1 - c0 + 1, 0)), dtype=np.int32)
+        if grid.size:
+            rows, cols, values = _window(ids, counts, n_cols, r0, r1, c0, c1)
+            grid[rows - r0, cols - c0] = values
+        return level, self.origin[0] + c0 * size, self.origin[1] + r0 * size, size, grid
+
+    def trace(self, x0, x1, y0, y1, max_cells=MAX_CELLS):
+        # plotly heatmap trace (plain dict) for a view; empty cells stay transparent
+        _, lon0, lat0, size, grid = self.raster(x0, x1, y0, y1, max_cells)
+        shade = np.log1p(grid)
+        z = [[round(float(v), 2) if v else None for v in row] for row in shade]
+        return dict(
+            type='heatmap', z=z,
+            x0=lon0 + size / 2, dx=size, y0=lat0 + size / 2, dy=size,
+            colorscale=COLORSCALE, showscale=False, hoverinfo='skip',
+        )
+
+    def save(self, out_dir, name=HEATMAP_FILE):
+        arrays = {'origin': np.array(self.origin), 'cell': np.array(self.cell),
+                  'n_cols': np.array([n for _, _, n in self.levels], dtype=np.int64)}
+        for level, (ids, counts, _) in enumerate(self.levels):
+            arrays[f"ids/{level}"] = ids
+            arrays[f"counts/{level}"] = counts
+        tmp = os.path.join(out_dir, name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, os.path.join(out_dir, name))
+
+    @classmethod
+    def load(cls, store_dir, name=HEATMAP_FILE):
+        path = os.path.join(store_dir, name)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as npz:
+            levels = [(npz[f"ids/{level}"], npz[f"counts/{level}"], int(n)) for level, n in enumerate(npz['n_cols'])]
+            return cls(npz['origin'], float(npz['cell']), levels)
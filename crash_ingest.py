@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import pickle
+import argparse
+import pandas as pd
+from crash_cube import CrashCube
+
+# === Incremental crash ingestion ===
+# Keeps the crash aggregates as count tables in crash_counts.json:
+#   causes[carea][cause], injuries[carea][injury]  running counts
+#   top_causes[carea]                              derived top 5 (as causes_dict)
+#   ids                                            every CRASH_RECORD_ID ingested
+#   watermark                                      latest CRASH_DATE ingested
+#   cube                                           the crash_cube.<n>.npz it matches
+# An ingest run reads only the new CArea-tagged records (crash_areas.py output). It
+# skips records whose id was already ingested, adds the rest to the count tables
+# whatever their date (the city's feed receives late reports dated days back; the cube
+# grows into earlier months as needed), and re-ranks causes only for the communities
+# it touched. It then rewrites the small
+# derived files (grouped.csv, injury_counts_city.json, top_causes_city.json, the crash
+# keys of citywide_stats.pkl), adds the rows to a new generation of the month cube
+# (crash_cube.py) and appends them to crash_with_carea.csv. Every file is replaced
+# through a temp file, and the state is replaced last, so an interrupted run is simply
+# repeated.
+#   python crash_ingest.py --rebuild                  one full pass over crash_with_carea.csv
+#   python crash_ingest.py --new new_crashes.csv      daily refresh
+
+data_path = os.path.join(os.path.dirname(__file__), "data")
+STATE_FILE = "crash_counts.json"
+CRASH_FILE = "crash_with_carea.csv"
+
+DATE_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+SEVERE_INJURIES = ['FATAL', 'INCAPACITATING INJURY']
+IGNORED_CAUSES = ['UNABLE TO DETERMINE', 'NOT APPLICABLE']
+TOP_CAUSES = 5
+CRASH_COLUMNS = ['CRASH_RECORD_ID', 'CRASH_DATE', 'PRIM_CONTRIBUTORY_CAUSE', 'MOST_SEVERE_INJURY', 'LATITUDE', 'LONGITUDE', 'CArea']
+
+
+def empty_state():
+    return {'watermark': None, 'ids': [], 'crash_file_bytes': None, 'cube': None,
+            'causes': {}, 'injuries': {}, 'top_causes': {}}
+
+
+def load_state(data_dir=data_path):
+    path = os.path.join(data_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def top_causes(counts, n=TOP_CAUSES):
+    # most frequent first, ties alphabetical (same order as the pandas groupby in shared.py)
+    ranked = sorted(((c, k) for k, c in counts.items() if k not in IGNORED_CAUSES), key=lambda x: (-x[0], x[1]))
+    return [k for _, k in ranked[:n]]
+
+
+def new_records(crashes, state):
+    """Rows whose record id is not ingested yet, oldest first."""
+    crashes = crashes.dropna(subset=['CArea']).drop_duplicates('CRASH_RECORD_ID')
+    crashes = crashes[~crashes['CRASH_RECORD_ID'].isin(set(state['ids']))].copy()
+    crashes['_date'] = pd.to_datetime(crashes['CRASH_DATE'], format=DATE_FORMAT)
+    return crashes.sort_values('_date', kind='stable')
+
+
+def late_records(crashes, state):
+    # new rows dated at or before the watermark: reported after later crashes were ingested
+    if state['watermark'] is None:
+        return 0
+    return int((crashes['_date'] <= pd.Timestamp(state['watermark'])).sum())
+
+
+def apply_records(state, crashes):
+    """Add rows to the count tables; returns the communities touched."""
+    for table, column in (('causes', 'PRIM_CONTRIBUTORY_CAUSE'), ('injuries', 'MOST_SEVERE_INJURY')):
+        counts = crashes.groupby(['CArea', column]).size()
+        for (carea, key), n in counts.items():
+            row = state[table].setdefault(carea, {})
+            row[key] = row.get(key, 0) + int(n)
+
+    touched = sorted(crashes['CArea'].unique())
+    for carea in touched:
+        state['top_causes'][carea] = top_causes(state['causes'].get(carea, {}))
+
+    if len(crashes):
+        state['ids'] += crashes['CRASH_RECORD_ID'].tolist()
+        last = crashes['_date'].max()
+        if state['watermark'] is None or pd.Timestamp(state['watermark']) < last:
+            state['watermark'] = last.isoformat()
+    return touched
+
+
+# === Derived outputs ===
+# small (one row per community), so they are rebuilt from the count tables each run
+
+def injuries_dict(state):
+    # every community gets every injury level seen anywhere, as the unstack in shared.py
+    levels = sorted({k for row in state['injuries'].values() for k in row})
+    return {carea: {k: row.get(k, 0) for k in levels} for carea, row in sorted(state['injuries'].items())}
+
+
+def grouped_table(state):
+    injuries = injuries_dict(state)
+    rows = pd.DataFrame({
+        'CArea': list(injuries),
+        'total_crashes': [sum(row.values()) for row in injuries.values()],
+        'severe_crashes': [sum(row.get(k, 0) for k in SEVERE_INJURIES) for row in injuries.values()],
+    })
+    rows['severe_rate'] = rows['severe_crashes'] / rows['total_crashes']
+    # share of the city total, so every row moves when any community gets crashes
+    rows['crash_rate'] = rows['total_crashes'] / rows['total_crashes'].sum()
+    return rows
+
+
+def city_totals(state):
+    injuries, causes = {}, {}
+    for row in state['injuries'].values():
+        for k, n in row.items():
+            injuries[k] = injuries.get(k, 0) + n
+    for row in state['causes'].values():
+        for k, n in row.items():
+            causes[k] = causes.get(k, 0) + n
+    injuries = dict(sorted(injuries.items(), key=lambda x: -x[1]))
+    return injuries, top_causes(causes)
+
+
+def _replace(path, write, mode="w"):
+    tmp = path + ".tmp"
+    with open(tmp, mode) as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _write_cube(cube, state, data_dir):
+    # a new file per run; the state names the one that matches its counts
+    generation = int(state['cube'].split('.')[1]) + 1 if state['cube'] else 1
+    state['cube'] = f"crash_cube.{generation}.npz"
+    cube.save(data_dir, state['cube'])
+
+
+def _drop_old_cubes(state, data_dir):
+    for name in os.listdir(data_dir):
+        if name.startswith("crash_cube.") and name.endswith(".npz") and name != state['cube']:
+            os.remove(os.path.join(data_dir, name))
+
+
+def write_outputs(state, data_dir=data_path):
+    grouped = grouped_table(state)
+    injury_counts_city, top_causes_city = city_totals(state)
+    _replace(os.path.join(data_dir, "grouped.csv"), lambda f: grouped.to_csv(f, index=False))
+    _replace(os.path.join(data_dir, "injury_counts_city.json"), lambda f: json.dump(injury_counts_city, f))
+    _replace(os.path.join(data_dir, "top_causes_city.json"), lambda f: json.dump(top_causes_city, f))
+
+    stats_path = os.path.join(data_dir, "citywide_stats.pkl")
+    with open(stats_path, "rb") as f:
+        stats = pickle.load(f)
+    total, severe = int(grouped['total_crashes'].sum()), int(grouped['severe_crashes'].sum())
+    stats.update({'crashes_total': total, 'crashes_severe': severe, 'severe_rate': severe / total if total else 0.0})
+    _replace(stats_path, lambda f: pickle.dump(stats, f), "wb")
+
+    # last: until this lands, a rerun starts from the previous state
+    _replace(os.path.join(data_dir, STATE_FILE), lambda f: json.dump(state, f))
+    _drop_old_cubes(state, data_dir)
+
+
+def _append_crashes(crashes, state, data_dir):
+    # drop whatever an interrupted run appended after the last committed state
+    path = os.path.join(data_dir, CRASH_FILE)
+    if state['crash_file_bytes'] is not None and os.path.getsize(path) > state['crash_file_bytes']:
+        with open(path, "r+b") as f:
+            f.truncate(state['crash_file_bytes'])
+    with open(path, "a", newline="") as f:
+        crashes[CRASH_COLUMNS].to_csv(f, index=False, header=False)
+    state['crash_file_bytes'] = os.path.getsize(path)
+
+
+def rebuild(data_dir=data_path):
+    crashes = pd.read_csv(os.path.join(data_dir, CRASH_FILE))
+    state = empty_state()
+    crashes = new_records(crashes, state)
+    touched = apply_records(state, crashes)
+    _write_cube(CrashCube.from_frame(crashes, sorted(state['injuries'])), state, data_dir)
+    state['crash_file_bytes'] = os.path.getsize(os.path.join(data_dir, CRASH_FILE))
+    write_outputs(state, data_dir)
+    return len(crashes), touched, 0
+
+
+def ingest(new_path, data_dir=data_path):
+    state = load_state(data_dir)
+    if state is None:
+        raise SystemExit(f"no {STATE_FILE} in {data_dir}; run with --rebuild first")
+    if 'ids' not in state:
+        raise SystemExit(f"{STATE_FILE} in {data_dir} predates record id tracking; run with --rebuild")
+    crashes = new_records(pd.read_csv(new_path), state)
+    if crashes.empty:
+        return 0, [], 0
+    late = late_records(crashes, state)
+    cube = CrashCube.load(data_dir, state['cube'])
+    touched = apply_records(state, crashes)
+    _write_cube(cube.add(crashes), state, data_dir)
+    _append_crashes(crashes, state, data_dir)
+    write_outputs(state, data_dir)
+    return len(crashes), touched, late
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the crash aggregates from new records.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--new", help="CSV of new CArea-tagged crash records")
+    group.add_argument("--rebuild", action="store_true", help="rebuild the counts from crash_with_carea.csv")
+    parser.add_argument("--data", default=data_path, help="data directory")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    rows, touched, late = rebuild(args.data) if args.rebuild else ingest(args.new, args.data)
+    print(f"{rows} crashes ingested, {len(touched)} communities updated in {time.perf_counter() - t0:.2f}s")
+    if late:
+        print(f"{late} of them dated at or before the previous watermark (late reports), counted in their own months")
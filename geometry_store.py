@@ -0,0 +1,105 @@
+import os
+import numpy as np
+
+# === Binary bike lane segment geometry ===
+# bike_with_neigh.csv carries every segment twice as WKT text. This store keeps each CRS
+# GeoArrow-style: one float64 (n, 2) coordinate array plus two offset arrays
+# (segment -> parts, part -> coordinates), written once at build time and
+# memory-mapped when read, so nothing is parsed per process.
+
+# CRS name -> WKT column in bike_with_neigh.csv
+WKT_COLUMNS = {
+    'lonlat': 'the_geom',   # lon/lat degrees
+    'utm': 'geometry',      # UTM zone 16N metres
+}
+
+
+def _files(crs):
+    return {
+        'coords': f"segments_{crs}_coords.npy",
+        'part_offsets': f"segments_{crs}_part_offsets.npy",
+        'geom_offsets': f"segments_{crs}_geom_offsets.npy",
+    }
+
+
+class SegmentGeometry:
+    """Line geometry of all segments in one CRS.
+
+    coords[part_offsets[p]:part_offsets[p + 1]] are the vertices of part p, and
+    parts geom_offsets[i] .. geom_offsets[i + 1] - 1 belong to segment i.
+    """
+
+    def __init__(self, coords, part_offsets, geom_offsets, crs):
+        self.coords = coords
+        self.part_offsets = part_offsets
+        self.geom_offsets = geom_offsets
+        self.crs = crs
+
+    @classmethod
+    def from_wkt(cls, wkt_values, crs):
+        # build-time path (needs shapely); missing WKT becomes an empty segment
+        import shapely
+
+        geoms = shapely.from_wkt(np.asarray(wkt_values, dtype=object))
+        parts, part_geom = shapely.get_parts(geoms, return_index=True)
+        coords, coord_part = shapely.get_coordinates(parts, return_index=True)
+
+        part_offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(coord_part, minlength=len(parts)), out=part_offsets[1:])
+        geom_offsets = np.zeros(len(geoms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(part_geom, minlength=len(geoms)), out=geom_offsets[1:])
+        return cls(coords.astype(np.float64), part_offsets, geom_offsets, crs)
+
+    @classmethod
+    def load(cls, store_dir, crs):
+        files = _files(crs)
+        arrays = [np.load(os.path.join(store_dir, files[k]), mmap_mode='r')
+                  for k in ('coords', 'part_offsets', 'geom_offsets')]
+        return cls(*arrays, crs)
+
+    def save(self, store_dir):
+        files = _files(self.crs)
+        for key, values in (('coords', self.coords), ('part_offsets', self.part_offsets),
+                            ('geom_offsets', self.geom_offsets)):
+            tmp = os.path.join(store_dir, files[key] + ".tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(values))
+            os.replace(tmp, os.path.join(store_dir, files[key]))
+
+    def __len__(self):
+        return len(self.geom_offsets) - 1
+
+    def parts(self, i):
+        # list of (k, 2) coordinate views, one per line part of segment i
+        p0, p1 = self.geom_offsets[i], self.geom_offsets[i + 1]
+        return [self.coords[self.part_offsets[p]:self.part_offsets[p + 1]] for p in range(p0, p1)]
+
+    def segment_coords(self, i):
+        # all vertices of segment i (parts back to back) as one view
+        p0, p1 = self.geom_offsets[i], self.geom_offsets[i + 1]
+        return self.coords[self.part_offsets[p0]:self.part_offsets[p1]]
+
+    def coord_segment_ids(self):
+        # segment id of every coordinate row
+        counts = np.diff(np.asarray(self.part_offsets)[np.asarray(self.geom_offsets)])
+        return np.repeat(np.arange(len(self)), counts)
+
+    def bounds(self):
+        # (n, 4) minx, miny, maxx, maxy per segment; NaN for empty segments
+        out = np.full((len(self), 4), np.nan)
+        starts = np.asarray(self.part_offsets)[np.asarray(self.geom_offsets)]
+        nonempty = np.flatnonzero(np.diff(starts) > 0)
+        if len(nonempty):
+            coords = np.asarray(self.coords)
+            out[nonempty, :2] = np.minimum.reduceat(coords, starts[nonempty])
+            out[nonempty, 2:] = np.maximum.reduceat(coords, starts[nonempty])
+        return out
+
+
+def write_segment_geometry(bike_with_neigh, out_dir):
+    summary = {}
+    for crs, column in WKT_COLUMNS.items():
+        geometry = SegmentGeometry.from_wkt(bike_with_neigh[column], crs)
+        geometry.save(out_dir)
+        summary[crs] = {'segments': len(geometry), 'coords': int(len(geometry.coords))}
+    return summary
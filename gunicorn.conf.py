@@ -0,0 +1,37 @@
+import gc
+import os
+
+# === Production server ===
+#   gunicorn app:server
+# The app (shared.py data, layout.py figure, warmed response cache) is imported once in
+# the master and inherited by every forked worker. Those objects are only read after
+# boot, so their pages stay shared copy-on-write; bundle arrays are memory-mapped and
+# shared through the page cache.
+
+# Set WEB_CONCURRENCY (or BIKEABILITY_WORKERS) per instance size. The default only uses
+# the CPUs this process may run on, capped at MAX_DEFAULT_WORKERS: in a container
+# os.cpu_count() reports the host's cores, and neither sees a CPU quota, so an
+# uncapped default can fork more workers than the instance has memory for.
+MAX_DEFAULT_WORKERS = 2
+
+
+def default_workers():
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    return max(1, min(cpus, MAX_DEFAULT_WORKERS))
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+preload_app = True
+workers = int(os.environ.get("BIKEABILITY_WORKERS", os.environ.get("WEB_CONCURRENCY", default_workers())))
+threads = int(os.environ.get("BIKEABILITY_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+timeout = int(os.environ.get("BIKEABILITY_TIMEOUT", 60))
+accesslog = "-"
+
+
+def when_ready(server):
+    # move everything allocated at import out of the collector's generations, so a
+    # worker's gc passes never write refcount/gc headers into the shared pages
+    gc.collect()
+    gc.freeze()
+    server.log.info("app preloaded; %d objects frozen before fork", gc.get_freeze_count())
@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from geometry_store import SegmentGeometry, WKT_COLUMNS
+from network_common import pieces, UTM_EPSG
+
+# === Crash hotspots ===
+# DBSCAN over each community's crash locations (UTM metres): a crash with at least
+# MIN_CRASHES crashes (itself included) within EPS is a core crash, core crashes within
+# EPS of each other share a hotspot, and other crashes within EPS of a core crash join
+# it. Neighbours come from a uniform grid hash with EPS cells: points are sorted by cell
+# and each cell is paired only with its 3 x 3 block, so the work grows with the number
+# of crashes, not its square. Clusters are the connected components of the core graph
+# (root hooking with path compression), all in NumPy. Communities run in a process
+# pool. Each hotspot is summarized (crashes, severity mix, top cause, nearest bike lane
+# street, intersection or corridor by its shape) and the TOP_HOTSPOTS worst per
+# community go to hotspots.json, which shared.py loads for the info panel and inset.
+#   python hotspots.py [--crashes data/crash_with_carea.csv] [--workers 8] [--out data]
+# Rebuild the bundle (python bundle.py build) afterwards.
+
+data_path = os.path.join(os.path.dirname(__file__), "data")
+HOTSPOTS_FILE = "hotspots.json"
+
+EPS = 50.0                 # metres
+MIN_CRASHES = 5
+TOP_HOTSPOTS = 5
+SEVERE_WEIGHT = 4          # ranked by crashes + SEVERE_WEIGHT * severe crashes
+CORRIDOR_ELONGATION = 3.0  # long / short axis above which a hotspot is a corridor
+STREET_DISTANCE = 100.0    # metres: name the nearest bike lane street within this
+INJURY_ORDER = ['FATAL', 'INCAPACITATING INJURY', 'NONINCAPACITATING INJURY', 'REPORTED, NOT EVIDENT', 'NO INDICATION OF INJURY']
+SEVERE_INJURIES = ['FATAL', 'INCAPACITATING INJURY']
+IGNORED_CAUSES = ['UNABLE TO DETERMINE', 'NOT APPLICABLE']
+
+
+def neighbour_pairs(xy, eps=EPS):
+    """(i, j) for every ordered pair of points within eps, i == j included."""
+    cell = np.floor(xy / eps).astype(np.int64)
+    cell -= cell.min(axis=0)
+    n_y = int(cell[:, 1].max()) + 3  # column stride; the +/-1 rows never wrap into the next column
+    key = cell[:, 0] * n_y + cell[:, 1]
+    order = np.argsort(key, kind='stable')
+    cells, start, size = np.unique(key[order], return_index=True, return_counts=True)
+
+    out_i, out_j = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            target = cells + dx * n_y + dy
+            pos = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+            a = np.flatnonzero(cells[pos] == target)  # cell a pairs with cell b
+            b = pos[a]
+            counts = size[a] * size[b]
+            # every (point of a, point of b) pair, without a Python loop
+            pair = np.repeat(np.arange(len(a)), counts)
+            k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            i = order[start[a][pair] + k // size[b][pair]]
+            j = order[start[b][pair] + k % size[b][pair]]
+            near = np.hypot(*(xy[i] - xy[j]).T) <= eps
+            out_i.append(i[near])
+            out_j.append(j[near])
+    return np.concatenate(out_i), np.concatenate(out_j)
+
+
+def dbscan(xy, eps=EPS, min_samples=MIN_CRASHES):
+    """Cluster label per point, 0..k-1, or -1 for noise."""
+    n = len(xy)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    i, j = neighbour_pairs(xy, eps)
+    core = np.bincount(i, minlength=n) >= min_samples
+
+    # connected components of the core graph: hook the higher root of every edge onto
+    # the lower one, compress every path to its root, repeat until no edge spans two
+    # roots; each core point ends on its component's lowest index
+    edge = core[i] & core[j] & (i < j)
+    ci, cj = i[edge], j[edge]
+    labels = np.arange(n)
+    while len(ci):
+        ri, rj = labels[ci], labels[cj]
+        spans = ri != rj
+        ci, cj, ri, rj = ci[spans], cj[spans], ri[spans], rj[spans]
+        np.minimum.at(labels, np.maximum(ri, rj), np.minimum(ri, rj))
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+    # border points take the lowest label among their core neighbours
+    border = np.full(n, n)
+    edge = core[j] & ~core[i]
+    np.minimum.at(border, i[edge], labels[j[edge]])
+    labels = np.where(core, labels, border)
+    clustered = labels < n
+    out = np.full(n, -1, dtype=np.int64)
+    out[clustered] = np.unique(labels[clustered], return_inverse=True)[1]
+    return out
+
+
+# === Worker state ===
+# set once per pool process by _init_worker: lane pieces for naming hotspots
+_lanes = {}
+
+
+def _init_worker(lane_p0, lane_p1, lane_street):
+    import shapely
+
+    _lanes['tree'] = shapely.STRtree(shapely.linestrings(np.stack([lane_p0, lane_p1], axis=1)))
+    _lanes['street'] = lane_street
+
+
+def nearest_streets(xy):
+    # nearest bike lane street per point, None beyond STREET_DISTANCE
+    import shapely
+
+    names = np.full(len(xy), None, dtype=object)
+    if 'tree' not in _lanes or not len(xy):
+        return names
+    point_i, lane_i = _lanes['tree'].query_nearest(shapely.points(xy), max_distance=STREET_DISTANCE)
+    point_i, first = np.unique(point_i, return_index=True)  # ties: keep one
+    names[point_i] = _lanes['street'][lane_i[first]]
+    return names
+
+
+def summarize_clusters(labels, xy, injury, cause):
+    """One record per cluster, ranked worst first (without lon/lat)."""
+    k = int(labels.max()) + 1 if len(labels) else 0
+    if k == 0:
+        return []
+    member = labels >= 0
+    lab, pts = labels[member], xy[member]
+    count = np.bincount(lab, minlength=k)
+    severe = np.bincount(lab, weights=np.isin(injury[member], SEVERE_INJURIES), minlength=k).astype(int)
+
+    # centroid, radius and the axes of each cluster's spread
+    cx = np.bincount(lab, weights=pts[:, 0], minlength=k) / count
+    cy = np.bincount(lab, weights=pts[:, 1], minlength=k) / count
+    dx, dy = pts[:, 0] - cx[lab], pts[:, 1] - cy[lab]
+    radius = np.zeros(k)
+    np.maximum.at(radius, lab, np.hypot(dx, dy))
+    sxx = np.bincount(lab, weights=dx * dx, minlength=k) / count
+    syy = np.bincount(lab, weights=dy * dy, minlength=k) / count
+    sxy = np.bincount(lab, weights=dx * dy, minlength=k) / count
+    spread = np.sqrt(((sxx - syy) / 2) ** 2 + sxy ** 2)
+    long_axis = np.sqrt((sxx + syy) / 2 + spread)
+    short_axis = np.sqrt(np.maximum((sxx + syy) / 2 - spread, 0))
+    corridor = long_axis > CORRIDOR_ELONGATION * np.maximum(short_axis, 1.0)
+
+    frame = pd.DataFrame({'label': lab, 'injury': injury[member], 'cause': cause[member]})
+    injuries = frame.groupby(['label', 'injury']).size()
+    causes = frame[~frame['cause'].isin(IGNORED_CAUSES + [''])].groupby(['label', 'cause']).size()
+    causes = causes.reset_index(name='n').sort_values(['label', 'n', 'cause'], ascending=[True, False, True])
+    top_cause = causes.groupby('label')['cause'].first()
+
+    streets = nearest_streets(np.column_stack([cx, cy]))
+    order = np.lexsort((-severe, -(count + SEVERE_WEIGHT * severe)))
+    records = []
+    for c in order[:TOP_HOTSPOTS]:
+        records.append({
+            'kind': 'corridor' if corridor[c] else 'intersection',
+            'street': streets[c],
+            'x': float(cx[c]), 'y': float(cy[c]),
+            'radius_m': int(round(radius[c])),
+            'crashes': int(count[c]),
+            'severe': int(severe[c]),
+            'injuries': {k_: int(injuries[c][k_]) for k_ in INJURY_ORDER if k_ in injuries[c]},
+            'top_cause': top_cause.get(c),
+        })
+    return records
+
+
+def _community_task(args):
+    name, xy, injury, cause = args
+    return name, summarize_clusters(dbscan(xy), xy, injury, cause)
+
+
+def find_hotspots(crashes, lanes=None, workers=None):
+    """{community: ranked hotspot records} for CArea-tagged crashes."""
+    from pyproj import Transformer
+
+    crashes = crashes.dropna(subset=['CArea', 'LATITUDE', 'LONGITUDE'])
+    to_utm = Transformer.from_crs(4326, UTM_EPSG, always_xy=True)
+    to_lonlat = Transformer.from_crs(UTM_EPSG, 4326, always_xy=True)
+    xy = np.column_stack(to_utm.transform(crashes['LONGITUDE'].to_numpy(), crashes['LATITUDE'].to_numpy()))
+    carea = crashes['CArea'].to_numpy()
+    injury = crashes['MOST_SEVERE_INJURY'].fillna('').to_numpy()
+    cause = crashes['PRIM_CONTRIBUTORY_CAUSE'].fillna('').to_numpy()
+
+    initargs = (np.zeros((0, 2)), np.zeros((0, 2)), np.zeros(0, dtype=object))
+    if lanes is not None:
+        lane_geom = SegmentGeometry.from_wkt(lanes[WKT_COLUMNS['utm']].to_numpy(), 'utm')
+        lane_seg, lane_p0, lane_p1 = pieces(lane_geom)
+        # "55TH PL" -> "55th Pl" (str.title would give "55Th")
+        streets = lanes['STREET'].fillna('').map(lambda name: ' '.join(w.capitalize() for w in name.split()))
+        initargs = (lane_p0, lane_p1, streets.to_numpy(dtype=object)[lane_seg])
+
+    tasks = []
+    for name in pd.unique(carea):
+        idx = np.flatnonzero(carea == name)
+        tasks.append((name, xy[idx], injury[idx], cause[idx]))
+    tasks.sort(key=lambda t: -len(t[1]))  # largest first
+
+    hotspots = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        for name, records in pool.map(_community_task, tasks):
+            for record in records:
+                lon, lat = to_lonlat.transform(record.pop('x'), record.pop('y'))
+                record['lon'], record['lat'] = round(float(lon), 6), round(float(lat), 6)
+                record['street'] = record['street'] or None
+            if records:
+                hotspots[name] = records
+    return dict(sorted(hotspots.items()))
+
+
+def write_hotspots(hotspots, out_dir=data_path):
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, HOTSPOTS_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(hotspots, f)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find each community's crash hotspots.")
+    parser.add_argument("--crashes", default=os.path.join(data_path, "crash_with_carea.csv"), help="CArea-tagged crash CSV")
+    parser.add_argument("--lanes", default=os.path.join(data_path, "bike_with_neigh.csv"),
+                        help="bike lane CSV, for street names (skipped if missing)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--out", default=data_path, help="output directory")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    crashes = pd.read_csv(args.crashes)
+    lanes = pd.read_csv(args.lanes) if os.path.exists(args.lanes) else None
+    hotspots = find_hotspots(crashes, lanes, args.workers)
+    write_hotspots(hotspots, args.out)
+    n = sum(len(v) for v in hotspots.values())
+    print(f"{n} hotspots in {len(hotspots)} communities from {len(crashes)} crashes "
+          f"in {time.perf_counter() - t0:.2f}s -> {os.path.join(args.out, HOTSPOTS_FILE)}")
@@ -0,0 +1,83 @@
+import os
+import json
+from functools import lru_cache
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+# === Per-community network inset store ===
+# Replaces unpickling precomputed_network_plots.pkl (77 full go.Figure objects) in every
+# worker. All trace x/y coordinates go into one float64 (n, 2) array (insets.npy,
+# memory-mapped at serve time; NaN rows are line gaps) and the remaining trace
+# properties into insets.json, indexed by community. A community's traces are only
+# materialized when requested, behind a bounded LRU.
+
+COORDS_FILE = "insets.npy"
+INDEX_FILE = "insets.json"
+INSET_CACHE_SIZE = int(os.environ.get("BIKEABILITY_INSET_CACHE_SIZE", 16))
+
+
+def _as_coords(values):
+    if values is None:
+        return None
+    try:
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        return None  # non-numeric axis (dates, categories): kept with the style metadata
+
+
+def write_insets(network_plots, out_dir):
+    index = {}
+    chunks = []
+    offset = 0
+    for name, network_fig in network_plots.items():
+        traces = []
+        for trace in network_fig.data:
+            style = json.loads(to_json_plotly(trace))
+            x, y = _as_coords(trace.x), _as_coords(trace.y)
+            if x is not None and y is not None and len(x) == len(y):
+                style.pop('x', None)
+                style.pop('y', None)
+                chunks.append(np.column_stack([x, y]))
+                traces.append({'start': offset, 'stop': offset + len(x), 'style': style})
+                offset += len(x)
+            else:
+                traces.append({'start': None, 'stop': None, 'style': style})
+        index[name] = traces
+
+    coords = np.concatenate(chunks) if chunks else np.empty((0, 2))
+    tmp_coords = os.path.join(out_dir, COORDS_FILE + ".tmp")
+    tmp_index = os.path.join(out_dir, INDEX_FILE + ".tmp")
+    with open(tmp_coords, "wb") as f:
+        np.save(f, coords)
+    with open(tmp_index, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_coords, os.path.join(out_dir, COORDS_FILE))
+    os.replace(tmp_index, os.path.join(out_dir, INDEX_FILE))
+    return {'communities': len(index), 'points': int(len(coords))}
+
+
+def _to_list(values):
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+class InsetStore:
+    def __init__(self, store_dir, cache_size=INSET_CACHE_SIZE):
+        with open(os.path.join(store_dir, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        self.coords = np.load(os.path.join(store_dir, COORDS_FILE), mmap_mode='r')
+        self.traces = lru_cache(maxsize=cache_size)(self._load_traces)
+
+    def __contains__(self, carea_name):
+        return carea_name in self.index
+
+    def _load_traces(self, carea_name):
+        # plain trace dicts (plotly JSON) for one community; [] if it has no inset
+        traces = []
+        for entry in self.index.get(carea_name, []):
+            trace = dict(entry['style'])
+            if entry['start'] is not None:
+                xy = self.coords[entry['start']:entry['stop']]
+                trace['x'] = _to_list(xy[:, 0])
+                trace['y'] = _to_list(xy[:, 1])
+            traces.append(trace)
+        return traces
@@ -2,7 +2,10 @@ import numpy as np
 import plotly.graph_objects as go
 from dash import dcc, html
 from functools import lru_cache
-from shared import COLOR_GRADIENT_MAP, COLOR_INJURY, COLOR_EDGE, COLOR_TEXT, COLOR_TEXT_2, COLOR_INJURY_TEXT, norm, rgba_to_plotly_color
+from shared import CARTOGRAM_MODE, CLIENTSIDE_PANEL, crash_cube, scoring, info_panel_data, prompt_panel, BIN_COLORS, LEGEND_COLORS, COLOR_INJURY, COLOR_EDGE, COLOR_TEXT, COLOR_TEXT_2, COLOR_INJURY_TEXT
+from static_assets import asset_path
+from scoring import WEIGHT_ORDER
+from boot_timer import mark
 
 # CACHED versions of your data
 @lru_cache(maxsize=2)
@@ -11,12 +14,12 @@ def get_viz_df():
     return viz_df
 
 @lru_cache(maxsize=2)
-def get_translated_geom():
-    from shared import translated
-    return translated
+def get_city_outline_xy():
+    from shared import city_outline_xy
+    return city_outline_xy
 
 viz_df = get_viz_df()
-translated = get_translated_geom()
+city_outline_xy = get_city_outline_xy()
 
 
 
@@ -37,52 +40,144 @@ fig.update_layout(
 
 
 
-for _, row in viz_df.iterrows():
-    x, y = row['x'], row['y']
-    total, rate = row['total_crashes'], row['severe_rate']
-    bike_rank = row['bike_rank']
-    fill = rgba_to_plotly_color(COLOR_GRADIENT_MAP(norm(bike_rank)))
+def rect_paths(x0, x1, y0, y1):
+    # closed rectangles as one None-separated path list for a fill='toself' trace
+    xs = np.column_stack([x0, x1, x1, x0, x0, np.full(len(x0), np.nan)]).ravel()
+    ys = np.column_stack([y0, y0, y1, y1, y0, np.full(len(y0), np.nan)]).ravel()
+    return [None if np.isnan(v) else v for v in xs], [None if np.isnan(v) else v for v in ys]
 
-    w, h = scale-0.1, scale-0.1
-    minx, maxx = x - 0.5 * w, x + 0.5 * w
-    miny, maxy = y - 0.5 * h, y + 0.5 * h
-    red_h = h * rate
-    red_y0 = maxy - red_h
 
-    fig.add_shape(type="rect", x0=minx, x1=maxx, y0=miny, y1=maxy,
-                  fillcolor=fill, line=dict(color=COLOR_EDGE, width=0.5))
-    stroke = 0.01  # half of 2px in coordinate space
-    fig.add_shape(type="rect", x0=minx, x1=maxx , y0=red_y0, y1=maxy,
-              fillcolor=COLOR_INJURY, line=dict(color=COLOR_TEXT, width=1))
+# Tile geometry shared by the batched build and the patches that re-draw it: each
+# tile's injury bar hangs from the tile top and is h * severe_rate tall
+TILE_H = scale - 0.1
+TILE_MAXY = viz_df['y'].to_numpy() + 0.5 * TILE_H
 
 
-    fig.add_annotation(x=x, y=y, text=str(total), showarrow=False,
-                       font=dict(size=8, color=COLOR_TEXT))
-    fig.add_annotation(x=x, y=maxy - 0.1, text=f"{int(rate * 100)}%",
-                       showarrow=False, font=dict(size=8, color=COLOR_INJURY_TEXT))
-    
-    
-    
-    #BADGE
-    badge_text = row["abbrev"]
+def tile_layers(rate):
+    # (x0, x1, y0, y1) of every tile, injury bar and badge, rows in viz_df order
+    x, y = viz_df['x'].to_numpy(), viz_df['y'].to_numpy()
+    w = h = TILE_H
+    minx, maxx = x - 0.5 * w, x + 0.5 * w
+    miny, maxy = y - 0.5 * h, y + 0.5 * h
     badge_y = miny + 0.16
     badge_w = w * 1.1
     badge_h = h * 0.25
-    fig.add_shape(type="rect", x0=x - badge_w / 2, x1=x + badge_w / 2,
-                  y0=badge_y - badge_h / 2, y1=badge_y + badge_h / 2,
-                  fillcolor=fill, line=dict(color=COLOR_EDGE, width=0.4))
-    fig.add_annotation(x=x, y=badge_y, text=badge_text, showarrow=False,
-                       font=dict(size=7.2, color=COLOR_TEXT), yanchor="middle")
-
+    return [
+        (minx, maxx, miny, maxy),
+        (minx, maxx, maxy - h * rate, maxy),
+        (x - badge_w / 2, x + badge_w / 2, badge_y - badge_h / 2, badge_y + badge_h / 2),
+    ]
+
+
+# Batched mode: hit-test points for the one marker trace (communities + legend bins)
+hit_x, hit_y, hit_keys, hit_labels = [], [], [], []
+BIN_TRACES = []  # (trace index, bin) for traces dimmed by the bin filter, layer by layer
+TEXT_TRACE = None  # batched mode: index of the label trace
+
+if CARTOGRAM_MODE == 'batched':
+    # outline first so the tile traces draw over it
+    if len(city_outline_xy[0]):
+        fig.add_trace(go.Scatter(
+            x=list(city_outline_xy[0]), y=list(city_outline_xy[1]), mode='lines',
+            line=dict(color='#7CCDEF', width=1.5),
+            fill='toself',
+            fillcolor = '#7CCDEF',
+            hoverinfo='skip',
+            showlegend=False
+        ))
+
+    x, y = viz_df['x'].to_numpy(), viz_df['y'].to_numpy()
+    rate = viz_df['severe_rate'].to_numpy()
+    ranks = viz_df['bike_rank'].to_numpy().astype(int)
+    maxy = TILE_MAXY
+    badge_y = y - 0.5 * TILE_H + 0.16
+
+    # one filled trace per (layer, bin): tiles, then injury bars, then badges, as in shapes mode
+    styles = [
+        (None, dict(color=COLOR_EDGE, width=0.5)),
+        (COLOR_INJURY, dict(color=COLOR_TEXT, width=1)),
+        (None, dict(color=COLOR_EDGE, width=0.4)),
+    ]
+    for (x0, x1, y0, y1), (color, line) in zip(tile_layers(rate), styles):
+        for b in range(5):
+            members = ranks == b
+            px, py = rect_paths(x0[members], x1[members], y0[members], y1[members])
+            BIN_TRACES.append((len(fig.data), b))
+            fig.add_trace(go.Scatter(
+                x=px, y=py, mode='lines', fill='toself',
+                fillcolor=color or BIN_COLORS[b],
+                line=line, hoverinfo='skip', showlegend=False,
+            ))
+
+    # every tile label in one text trace
+    n = len(viz_df)
+    TEXT_TRACE = len(fig.data)
     fig.add_trace(go.Scatter(
-        x=[x], y=[y], mode='markers',
-        marker=dict(size=30, opacity=0),
-        customdata=[row['CArea']],
-        name=row['CArea'],
-        hovertemplate=f"{row['CArea'].title()}<extra></extra>",
-        showlegend=False, 
+        x=np.concatenate([x, x, x]),
+        y=np.concatenate([y, maxy - 0.1, badge_y]),
+        mode='text',
+        text=([str(t) for t in viz_df['total_crashes']]
+              + [f"{int(r * 100)}%" for r in rate]
+              + list(viz_df['abbrev'])),
+        textfont=dict(
+            size=[8] * n + [8] * n + [7.2] * n,
+            color=[COLOR_TEXT] * n + [COLOR_INJURY_TEXT] * n + [COLOR_TEXT] * n,
+        ),
+        hoverinfo='skip', showlegend=False,
     ))
 
+    hit_x += list(x)
+    hit_y += list(y)
+    hit_keys += list(viz_df['CArea'])
+    hit_labels += [name.title() for name in viz_df['CArea']]
+
+else:
+    for _, row in viz_df.iterrows():
+        x, y = row['x'], row['y']
+        total, rate = row['total_crashes'], row['severe_rate']
+        bike_rank = row['bike_rank']
+        fill = BIN_COLORS[int(bike_rank)]
+
+        w, h = scale-0.1, scale-0.1
+        minx, maxx = x - 0.5 * w, x + 0.5 * w
+        miny, maxy = y - 0.5 * h, y + 0.5 * h
+        red_h = h * rate
+        red_y0 = maxy - red_h
+
+        fig.add_shape(type="rect", x0=minx, x1=maxx, y0=miny, y1=maxy,
+                      fillcolor=fill, line=dict(color=COLOR_EDGE, width=0.5))
+        stroke = 0.01  # half of 2px in coordinate space
+        fig.add_shape(type="rect", x0=minx, x1=maxx , y0=red_y0, y1=maxy,
+                  fillcolor=COLOR_INJURY, line=dict(color=COLOR_TEXT, width=1))
+
+
+        fig.add_annotation(x=x, y=y, text=str(total), showarrow=False,
+                           font=dict(size=8, color=COLOR_TEXT))
+        fig.add_annotation(x=x, y=maxy - 0.1, text=f"{int(rate * 100)}%",
+                           showarrow=False, font=dict(size=8, color=COLOR_INJURY_TEXT))
+    
+    
+    
+        #BADGE
+        badge_text = row["abbrev"]
+        badge_y = miny + 0.16
+        badge_w = w * 1.1
+        badge_h = h * 0.25
+        fig.add_shape(type="rect", x0=x - badge_w / 2, x1=x + badge_w / 2,
+                      y0=badge_y - badge_h / 2, y1=badge_y + badge_h / 2,
+                      fillcolor=fill, line=dict(color=COLOR_EDGE, width=0.4))
+        fig.add_annotation(x=x, y=badge_y, text=badge_text, showarrow=False,
+                           font=dict(size=7.2, color=COLOR_TEXT), yanchor="middle")
+
+        fig.add_trace(go.Scatter(
+            x=[x], y=[y], mode='markers',
+            marker=dict(size=30, opacity=0),
+            customdata=[row['CArea']],
+            name=row['CArea'],
+            hovertemplate=f"{row['CArea'].title()}<extra></extra>",
+            showlegend=False, 
+        ))
+
 # Reference square
 ref_x, ref_y = 3.2, 7
 ref_scale, ref_rate = 1.42, 0.3
@@ -109,6 +204,7 @@ fig.add_annotation(x=ref_x, y=badge_y, text="COMMUNITY AREA",
                    yanchor="middle")
 fig.add_annotation(x=ref_x, y=ref_y - 0.10, text="# Bike Crashes",
                    showarrow=False, font=dict(size=9, color=COLOR_TEXT)),
+RANGE_ANNOTATION = len(fig.layout.annotations)  # rewritten by the date range filter
 fig.add_annotation(x=ref_x, y=ref_y + 0.10, text="Reported since 2018",
                    showarrow=False, font=dict(size=8, color=COLOR_TEXT_2)),
 fig.add_annotation(x=ref_x , y=ref_y + 0.45, text="% Severe",
@@ -123,7 +219,7 @@ legend_h = 4.0
 legend_w = 0.2
 n_bins = 5
 bin_vals = np.linspace(0, 1, n_bins)
-bin_colors = [rgba_to_plotly_color(COLOR_GRADIENT_MAP(v)) for v in bin_vals]
+bin_colors = LEGEND_COLORS
 bin_h = legend_h / n_bins
 for i, (val, color) in enumerate(zip(bin_vals[::-1], bin_colors[::-1])):
     y0 = legend_y_start + i * bin_h
@@ -165,6 +261,12 @@ for i, (val, color) in enumerate(zip(bin_vals[::-1], bin_colors[::-1])):
     flipped_bin = n_bins - 1 - i  # bin_4 (bluest) at top, bin_0 (reddest) at bottom
     y0 = legend_y_start + i * bin_h
     y1 = y0 + bin_h
+    if CARTOGRAM_MODE == 'batched':
+        hit_x.append(legend_x + legend_w / 2)
+        hit_y.append(y0 + bin_h / 2)
+        hit_keys.append(f'bin_{flipped_bin}')
+        hit_labels.append(f"Bikeability {flipped_bin + 1}")
+        continue
     fig.add_trace(go.Scatter(
         x=[legend_x + legend_w / 2],
         y=[y0 + bin_h / 2],
@@ -176,7 +278,16 @@ for i, (val, color) in enumerate(zip(bin_vals[::-1], bin_colors[::-1])):
         showlegend=False
     ))
 
-
+if CARTOGRAM_MODE == 'batched':
+    # one invisible marker trace does all hit-testing
+    fig.add_trace(go.Scatter(
+        x=hit_x, y=hit_y, mode='markers',
+        marker=dict(size=30, opacity=0),
+        customdata=hit_keys,
+        hovertext=hit_labels,
+        hovertemplate="%{hovertext}<extra></extra>",
+        showlegend=False,
+    ))
 
 
 
@@ -197,8 +308,8 @@ fig.update_layout(
 import plotly.graph_objects as go
 
 # Add city outline (behind rects) using transparent line
-if translated.geom_type == 'Polygon':
-    x, y = list(translated.exterior.xy[0]), list(translated.exterior.xy[1])
+if len(city_outline_xy[0]) and CARTOGRAM_MODE != 'batched':
+    x, y = list(city_outline_xy[0]), list(city_outline_xy[1])
     fig.add_trace(go.Scatter(
         x=x, y=y, mode='lines',
         line=dict(color='#7CCDEF', width=1.5),
@@ -294,6 +405,74 @@ fig.add_annotation(
     font=dict(size=11.5, color=COLOR_TEXT_2),
     showarrow=False
 )
+# Base figure structure that update_figure patches against
+N_COMMUNITY_SHAPES = 0 if CARTOGRAM_MODE == 'batched' else 3 * len(viz_df)  # tile, injury bar and badge per community
+N_BASE_SHAPES = len(fig.layout.shapes)
+N_BASE_ANNOTATIONS = len(fig.layout.annotations)
+N_BASE_TRACES = len(fig.data)
+LEGEND_SHAPE_START = N_BASE_SHAPES - n_bins  # legend bins are the last shapes
+
+BAR_LAYER = 1  # tile_layers index of the injury bars
+
+
+def bin_trace_paths(ranks, rate, layers=(0, 1, 2), bins=range(n_bins)):
+    # batched mode: (trace index, x path, y path) of the per-bin traces of `layers` for
+    # bike ranks `ranks` and severe rates `rate`
+    geometry = tile_layers(rate)
+    out = []
+    for layer in layers:
+        x0, x1, y0, y1 = geometry[layer]
+        for b in bins:
+            members = ranks == b
+            px, py = rect_paths(x0[members], x1[members], y0[members], y1[members])
+            out.append((BIN_TRACES[layer * n_bins + b][0], px, py))
+    return out
+
+# Community network inset (added on selection)
+INSET_XAXIS = dict(domain=[0.73, 0.96], anchor='y2', visible=False)
+INSET_YAXIS = dict(domain=[0.73, 0.96], anchor='x2', visible=False)
+INSET_SHAPE = go.layout.Shape(
+    type="path",
+    path=(
+        "M 0.72 0.745 "
+        "Q 0.72 0.72 0.745 0.72 "
+        "L 0.945 0.72 "
+        "Q 0.97 0.72 0.97 0.745 "
+        "L 0.97 0.945 "
+        "Q 0.97 0.97 0.945 0.97 "
+        "L 0.745 0.97 "
+        "Q 0.72 0.97 0.72 0.945 Z"
+    ),
+    fillcolor='#606060',
+    line=dict(color='lightgray', width=1),
+    layer='below',
+    xref='paper',
+    yref='paper'
+).to_plotly_json()
+INSET_ANNOTATION = go.layout.Annotation(
+    x=0.9,  # Center of your custom box horizontally
+    y=0.715,  # Slightly below the hover box
+    xref="paper",
+    yref="paper",
+    text="Hover to see cause",
+    showarrow=False,
+    font=dict(size=9, color= COLOR_TEXT_2),
+    align="center",
+).to_plotly_json()
+mark('figure')
+
+
+# bikeability weight sliders, one per lane type, in info panel order
+WEIGHT_SLIDERS = [(t, f'weight-{t.lower()}') for t in WEIGHT_ORDER]
+
+# date range slider: months since the first crash month, a mark each January
+RANGE_MARKS = {
+    t: crash_cube.month_label(t, "%Y")
+    for t in range(crash_cube.n_months)
+    if (crash_cube.start_month + t) % 12 == 0
+}
+
+
 def empty_plot():
     fig = go.Figure()
     fig.update_layout(
@@ -306,11 +485,38 @@ def empty_plot():
     return fig
 
 
+# cartogram and network iframe styles while each view is shown
+CARTOGRAM_STYLE = {
+    'display': 'block',
+    'width': '100%',
+    'height': '100%',
+    'border': 'none',
+    'backgroundColor': '#4A4A4A',
+    'borderRadius': '8px',
+    'boxShadow': '0 2px 6px rgba(0,0,0,0.1)'}
+
+IFRAME_STYLE = {
+    'display': 'block',
+    'width': '880px',
+    'height': '1030px',
+    'overflow': 'hidden',
+    'border': 'none',
+    'backgroundColor': '#4A4A4A',
+    'borderRadius': '8px',
+    'boxShadow': '0 2px 6px rgba(0,0,0,0.1)'}
+
+
 from dash import html, dcc
 
 layout = html.Div([
     dcc.Store(id='bin-shape-map', storage_type='memory'),
-    dcc.Store(id='view-mode', data='community'),
+    dcc.Store(id='selection', data=None),  # canonical selection: community name, 'bin_N', 'network' or None
+    dcc.Store(id='cartogram-overlay', data=None),  # overlay currently patched onto the cartogram
+    # the client-side panel also switches between the cartogram and network views itself
+    dcc.Store(id='panel-data', data=dict(info_panel_data(), views={'cartogram': CARTOGRAM_STYLE, 'iframe': IFRAME_STYLE})
+              if CLIENTSIDE_PANEL else None),
+    dcc.Store(id='scoring', data=None),  # bikeability weights the cartogram is drawn with (None = defaults)
+    dcc.Store(id='inset-view', data=None),  # last inset zoom relayout while the heatmap is drawn
 
     html.Div([
         html.Div([
@@ -355,7 +561,7 @@ layout = html.Div([
 
             html.Iframe(
                 id='network-iframe',
-                src='/assets/citywide_network.html',
+                src=f"/assets/{asset_path('citywide_network.html')}",
                 style={
                     'width': '850px',
                     'height': '1000px',
@@ -395,6 +601,41 @@ layout = html.Div([
         children=[
             html.Div([
                 html.Div([
+                    html.Div([
+                        html.Div("Crashes reported", style={'fontSize': '12px', 'color': COLOR_TEXT_2, 'marginBottom': '2px'}),
+                        dcc.RangeSlider(
+                            id='crash-range',
+                            min=0,
+                            max=crash_cube.n_months - 1,
+                            step=1,
+                            value=[0, crash_cube.n_months - 1],
+                            marks=RANGE_MARKS,
+                            allowCross=False,
+                            updatemode='mouseup',
+                        ),
+                        dcc.Checklist(
+                            id='crash-heatmap',
+                            options=[{'label': ' Crash heatmap in the community map', 'value': 'on'}],
+                            value=[],
+                            style={'fontSize': '12px', 'color': COLOR_TEXT_2},
+                        ),
+                    ], id='crash-range-control', style={'marginBottom': '8px'}),
+
+                    html.Details([
+                        html.Summary("Bikeability weights", style={'fontSize': '12px', 'color': COLOR_TEXT_2, 'cursor': 'pointer'}),
+                        html.Div([
+                            html.Div([
+                                html.Div(lane_type.title(), style={'fontSize': '11px', 'color': COLOR_TEXT_2}),
+                                dcc.Slider(id=slider_id, min=0, max=5, step=0.5, value=weight, marks=None,
+                                           tooltip={'placement': 'right'}, updatemode='drag'),
+                            ])
+                            for (lane_type, slider_id), weight in zip(WEIGHT_SLIDERS, scoring.weights)
+                        ]),
+                        html.Div("Infrastructure ↔ Network", style={'fontSize': '11px', 'color': COLOR_TEXT_2}),
+                        dcc.Slider(id='score-mix', min=0, max=1, step=0.05, value=scoring.mix,
+                                   marks={0: 'Network', 1: 'Infrastructure'}, updatemode='drag'),
+                    ], id='scoring-control', style={'marginBottom': '8px'}),
+
                     dcc.Dropdown(
                         id='carea-dropdown',
                         options=[{'label': name.title(), 'value': name} for name in sorted(viz_df['CArea'].unique())],
@@ -410,7 +651,7 @@ layout = html.Div([
                         }
                     ),
 
-                    html.Div(id='info-panel', style={
+                    html.Div(prompt_panel, id='info-panel', style={
                         'fontFamily': 'Segoe UI, sans-serif',
                         'fontSize': '14px',
                         'color': '#f0f0f0',
@@ -446,3 +687,4 @@ layout = html.Div([
     'fontFamily': 'Segoe UI, sans-serif',
     'backgroundColor': 'rgba(0,0,0,0)'
 })
+mark('layout')
@@ -0,0 +1,221 @@
+import sys
+import json
+import gzip
+import time
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+# === Load test ===
+# Replays browser-like sessions against a running server: the page, _dash-layout and
+# _dash-dependencies fetches, then cartogram clicks (community names and bin_N keys),
+# dropdown changes and network view toggles, each posted to _dash-update-component
+# with the store values a browser would hold. Reports throughput and p50/p95/p99 per
+# request kind.
+#   python loadtest.py --url http://localhost:8080 --users 20 --duration 60 --think 1
+
+ACTION_WEIGHTS = {'click_community': 50, 'click_bin': 15, 'dropdown': 20, 'toggle_network': 15}
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def _find(component, component_id):
+    # depth-first search of a layout JSON tree for a component id
+    if isinstance(component, list):
+        for child in component:
+            found = _find(child, component_id)
+            if found:
+                return found
+    elif isinstance(component, dict):
+        props = component.get('props', {})
+        if props.get('id') == component_id:
+            return component
+        return _find(props.get('children'), component_id)
+    return None
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}   # request kind -> [seconds]
+        self.bytes = {}     # request kind -> [wire bytes]
+        self.errors = {}    # request kind -> count
+        self.sessions = 0
+
+    def record(self, kind, seconds, size, ok):
+        with self._lock:
+            self.latency.setdefault(kind, []).append(seconds)
+            self.bytes.setdefault(kind, []).append(size)
+            if not ok:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def session_done(self):
+        with self._lock:
+            self.sessions += 1
+
+    def report(self, elapsed):
+        rows = {}
+        for kind, values in sorted(self.latency.items()):
+            rows[kind] = {
+                'requests': len(values),
+                'errors': self.errors.get(kind, 0),
+                'rps': len(values) / elapsed,
+                'p50_ms': _percentile(values, 50) * 1000,
+                'p95_ms': _percentile(values, 95) * 1000,
+                'p99_ms': _percentile(values, 99) * 1000,
+                'bytes_mean': sum(self.bytes[kind]) / len(values),
+            }
+        total = sum(r['requests'] for r in rows.values())
+        return {'elapsed_s': elapsed, 'sessions': self.sessions, 'requests': total,
+                'rps': total / elapsed, 'kinds': rows}
+
+
+class Session:
+    """One simulated browser tab on its own keep-alive connection."""
+
+    def __init__(self, url, recorder, rng, think):
+        parts = urlsplit(url)
+        self.host, self.prefix = parts.netloc, parts.path.rstrip('/') + '/'
+        self.recorder = recorder
+        self.rng = rng
+        self.think = think
+        self.conn = http.client.HTTPConnection(self.host, timeout=60)
+
+    def request(self, kind, method, path, body=None):
+        headers = {'Accept-Encoding': 'gzip'}
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        t0 = time.perf_counter()
+        try:
+            self.conn.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, timeout=60)
+            self.recorder.record(kind, time.perf_counter() - t0, 0, False)
+            return None, None
+        self.recorder.record(kind, time.perf_counter() - t0, len(data), status < 400)
+        if response.getheader('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        return status, data
+
+    def load_page(self):
+        self.request('index', 'GET', '')
+        _, layout = self.request('layout', 'GET', '_dash-layout')
+        _, deps = self.request('dependencies', 'GET', '_dash-dependencies')
+        if layout is None or deps is None:
+            return False
+        layout = json.loads(layout)
+        # the server callback behind every selection; with the client-side panel the
+        # browser resolves the selection and only posts the key
+        self.callback = next(cb for cb in json.loads(deps) if 'cartogram-overlay.data' in cb['output'])
+        self.client_resolves = any(d['id'] == 'selection' for d in self.callback['inputs'])
+        dropdown = _find(layout, 'carea-dropdown')
+        self.names = [o['value'] if isinstance(o, dict) else o for o in dropdown['props']['options']]
+        # store values the browser starts with
+        self.values = {'selection.data': None, 'cartogram-overlay.data': None, 'carea-dropdown.value': None}
+        return True
+
+    def _post(self, kind, triggered, value, key):
+        if self.client_resolves:
+            if key == self.values.get('selection.data'):
+                return  # the browser sends nothing
+            triggered, value = 'selection.data', key
+        self.values[triggered] = value
+        spec = self.callback
+        outputs = [dict(zip(('id', 'property'), o.rsplit('.', 1))) for o in spec['output'].strip('.').split('...')]
+        body = {
+            'output': spec['output'],
+            'outputs': outputs,
+            'inputs': [dict(d, value=self.values.get(f"{d['id']}.{d['property']}")) for d in spec['inputs']],
+            'state': [dict(d, value=self.values.get(f"{d['id']}.{d['property']}")) for d in spec['state']],
+            'changedPropIds': [triggered],
+        }
+        status, data = self.request(kind, 'POST', '_dash-update-component', body)
+        if status == 200:
+            for component_id, props in json.loads(data).get('response', {}).items():
+                for prop, v in props.items():
+                    if prop != 'figure':  # the figure comes back as a Patch; the browser applies it
+                        self.values[f"{component_id}.{prop}"] = v
+
+    def act(self):
+        network = self.values.get('selection.data') == 'network'
+        kinds = [k for k in ACTION_WEIGHTS if not (network and k.startswith('click'))]
+        kind = self.rng.choices(kinds, [ACTION_WEIGHTS[k] for k in kinds])[0]
+        if kind in ('click_community', 'click_bin'):
+            key = self.rng.choice(self.names) if kind == 'click_community' else f"bin_{self.rng.randrange(5)}"
+            self._post(kind, 'cartogram.clickData', {'points': [{'customdata': key}]}, key)
+        elif kind == 'dropdown':
+            name = self.rng.choice(self.names + [None])
+            self._post(kind, 'carea-dropdown.value', name, self.values.get('selection.data') if network else name)
+        elif network:
+            clicks = (self.values.get('exit-network-btn.n_clicks') or 0) + 1
+            self._post('exit_network', 'exit-network-btn.n_clicks', clicks, None)
+        else:
+            clicks = (self.values.get('show-network-btn.n_clicks') or 0) + 1
+            self._post('show_network', 'show-network-btn.n_clicks', clicks, 'network')
+
+    def pause(self):
+        if self.think > 0:
+            time.sleep(self.rng.expovariate(1 / self.think))
+
+    def run(self, actions):
+        try:
+            if not self.load_page():
+                return
+            for _ in range(actions):
+                self.pause()
+                self.act()
+            self.recorder.session_done()
+        finally:
+            self.conn.close()
+
+
+def run(url, users, duration, actions, think, seed):
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    def user(i):
+        rng = random.Random(seed + i)
+        while time.perf_counter() < deadline:
+            Session(url, recorder, rng, think).run(actions)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder.report(time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay dashboard sessions against a running server.")
+    parser.add_argument("--url", default="http://localhost:8080", help="server base URL")
+    parser.add_argument("--users", type=int, default=10, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to keep starting sessions")
+    parser.add_argument("--actions", type=int, default=10, help="interactions per session")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time between interactions (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.url, args.users, args.duration, args.actions, args.think, args.seed)
+    print(f"{report['sessions']} sessions, {report['requests']} requests in {report['elapsed_s']:.1f}s "
+          f"({report['rps']:.1f} req/s)")
+    print(f"  {'kind':<16}{'reqs':>7}{'errs':>6}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'bytes':>9}")
+    for kind, r in report['kinds'].items():
+        print(f"  {kind:<16}{r['requests']:>7}{r['errors']:>6}{r['rps']:>8.1f}{r['p50_ms']:>9.1f}"
+              f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['bytes_mean']:>9.0f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+    sys.exit(1 if any(r['errors'] for r in report['kinds'].values()) else 0)
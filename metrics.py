@@ -0,0 +1,158 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+
+import boot_timer
+
+# === Prometheus metrics ===
+# Per-callback invocations, latency and response size histograms and errors, the
+# selection keys users ask for, boot timings and response cache stats, served as
+# Prometheus text on /metrics. Counters live in this process only; under gunicorn
+# each worker reports its own. Off unless BIKEABILITY_METRICS=1: the route is not
+# authenticated, so expose it only where the scraper alone can reach it.
+
+METRICS_ENABLED = os.environ.get("BIKEABILITY_METRICS", "0") == "1"
+METRICS_PATH = "/metrics"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {cumulative}'
+
+
+class CallbackStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(BYTES_BUCKETS)
+        self.statuses = {}  # HTTP status -> count
+        self.errors = 0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.callbacks = {}   # callback name -> CallbackStats
+        self.selections = {}  # selection key -> count
+
+    def observe_callback(self, name, seconds, size, status):
+        with self._lock:
+            stats = self.callbacks.get(name)
+            if stats is None:
+                stats = self.callbacks[name] = CallbackStats()
+            stats.latency.observe(seconds)
+            stats.size.observe(size)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if status >= 500:
+                stats.errors += 1
+
+    def observe_selection(self, key):
+        key = 'none' if key is None else key
+        with self._lock:
+            self.selections[key] = self.selections.get(key, 0) + 1
+
+    def render(self, cache_stats=None):
+        out = []
+
+        def family(name, kind, help_text):
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+
+        family("bikeability_process_start_time_seconds", "gauge", "Unix time the process started.")
+        out.append(f"bikeability_process_start_time_seconds {boot_timer.PROCESS_START}")
+        family("bikeability_boot_seconds", "gauge", "Data load and figure build time at import.")
+        out.append(f"bikeability_boot_seconds {boot_timer.boot_seconds()}")
+        family("bikeability_boot_stage_seconds", "gauge", "Import time per load stage.")
+        for stage, seconds in boot_timer.STAGES.items():
+            out.append(f'bikeability_boot_stage_seconds{{stage="{_escape(stage)}"}} {seconds}')
+
+        with self._lock:
+            callbacks = {name: (s.latency, s.size, dict(s.statuses), s.errors) for name, s in self.callbacks.items()}
+            selections = dict(self.selections)
+            family("bikeability_callback_requests_total", "counter", "Callback requests by HTTP status.")
+            for name, (_, _, statuses, _) in callbacks.items():
+                for status, count in sorted(statuses.items()):
+                    out.append(f'bikeability_callback_requests_total{{callback="{_escape(name)}",status="{status}"}} {count}')
+            family("bikeability_callback_errors_total", "counter", "Callback requests that failed with a 5xx.")
+            for name, (_, _, _, errors) in callbacks.items():
+                out.append(f'bikeability_callback_errors_total{{callback="{_escape(name)}"}} {errors}')
+            family("bikeability_callback_latency_seconds", "histogram", "Callback request latency.")
+            for name, (latency, _, _, _) in callbacks.items():
+                out.extend(latency.lines("bikeability_callback_latency_seconds", f'callback="{_escape(name)}"'))
+            family("bikeability_callback_response_bytes", "histogram", "Uncompressed callback response size.")
+            for name, (_, size, _, _) in callbacks.items():
+                out.extend(size.lines("bikeability_callback_response_bytes", f'callback="{_escape(name)}"'))
+
+        family("bikeability_selection_total", "counter", "Selections made, by selection key.")
+        for key, count in sorted(selections.items()):
+            out.append(f'bikeability_selection_total{{key="{_escape(key)}"}} {count}')
+
+        if cache_stats is not None:
+            for stat in ('hits', 'misses', 'evictions'):
+                family(f"bikeability_response_cache_{stat}_total", "counter", f"Response cache {stat}.")
+                out.append(f"bikeability_response_cache_{stat}_total {cache_stats[stat]}")
+            family("bikeability_response_cache_entries", "gauge", "Responses currently cached.")
+            out.append(f"bikeability_response_cache_entries {cache_stats['size']}")
+        return "\n".join(out) + "\n"
+
+
+metrics = Metrics()
+
+
+def install_metrics(app, cache=None):
+    """Time every callback request on the app's Flask server and serve /metrics."""
+    from flask import g, request, Response
+
+    server = app.server
+    update_path = app.config.routes_pathname_prefix + "_dash-update-component"
+    names = {}  # callback output spec -> function name
+
+    def callback_name(output):
+        # unknown outputs share one label so clients can't grow the series count
+        if output not in app.callback_map:
+            return 'unknown'
+        if output not in names:
+            names[output] = getattr(app.callback_map[output].get('callback'), '__name__', 'clientside')
+        return names[output]
+
+    @server.before_request
+    def _start_timer():
+        if request.path == update_path:
+            g.metrics_start = time.perf_counter()
+
+    # registered after compression, so it runs first and sees the uncompressed size
+    @server.after_request
+    def _observe(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            body = request.get_json(silent=True) or {}
+            size = response.calculate_content_length() or 0
+            metrics.observe_callback(callback_name(body.get('output', '')),
+                                     time.perf_counter() - start, size, response.status_code)
+        return response
+
+    @server.route(METRICS_PATH)
+    def _metrics():
+        text = metrics.render(cache.stats() if cache is not None else None)
+        return Response(text, content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,31 @@
+import os
+import numpy as np
+
+# === Lane and road network constants ===
+# Shared by the offline builders (road_coverage.py, hotspots.py, segment_risk.py) and
+# the app, so it needs nothing beyond NumPy: no shapely, pyproj or road data.
+
+data_path = os.path.join(os.path.dirname(__file__), "data")
+ROADS_FILE = os.path.join(data_path, "roads_with_neigh.csv")
+
+METRES_PER_MILE = 1609.344
+UTM_EPSG = 32616         # WGS 84 / UTM zone 16N, the `geometry` columns
+
+LANE_TYPES = ['PROTECTED', 'BUFFERED', 'BIKE', 'SHARED', 'NEIGHBORHOOD']  # inset drawing order
+LANE_DASH = {'PROTECTED': 'solid', 'BUFFERED': 'longdash', 'BIKE': 'dash', 'SHARED': 'dot', 'NEIGHBORHOOD': 'dashdot'}
+
+
+def pieces(geometry):
+    """Split every line into its vertex-to-vertex pieces.
+
+    Returns (segment index, start xy, end xy) per piece; zero-length pieces are dropped."""
+    coords = np.asarray(geometry.coords)
+    part_len = np.diff(geometry.part_offsets)
+    coord_part = np.repeat(np.arange(len(part_len)), part_len)
+    part_geom = np.repeat(np.arange(len(geometry.geom_offsets) - 1), np.diff(geometry.geom_offsets))
+
+    start = np.flatnonzero(coord_part[:-1] == coord_part[1:])
+    p0, p1 = coords[start], coords[start + 1]
+    keep = np.any(p0 != p1, axis=1)
+    start = start[keep]
+    return part_geom[coord_part[start]], p0[keep], p1[keep]
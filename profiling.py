@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import hmac
+import time
+import argparse
+import threading
+
+# === On-demand profiling ===
+# A deterministic per-thread profiler (sys.setprofile) that adds each event's elapsed
+# time to the current node of a call tree, written out as collapsed stacks
+# (flamegraph.pl / speedscope) and a speedscope JSON profile.
+#   BIKEABILITY_PROFILE=1              profile every callback request
+#   BIKEABILITY_PROFILE_TOKEN=<secret> profile requests sent with X-Profile-Token: <secret>
+#   python profiling.py import         profile importing the app (shared.py, layout.py)
+# Files go to BIKEABILITY_PROFILE_DIR (default ./profiles). With neither variable set
+# no hook is installed.
+
+PROFILE_ALL = os.environ.get("BIKEABILITY_PROFILE", "0") == "1"
+PROFILE_TOKEN = os.environ.get("BIKEABILITY_PROFILE_TOKEN", "")
+PROFILE_DIR = os.environ.get("BIKEABILITY_PROFILE_DIR", "profiles")
+PROFILE_HEADER = "X-Profile-Token"
+
+
+class _Node:
+    __slots__ = ('key', 'parent', 'children', 'self_time')
+
+    def __init__(self, key, parent):
+        self.key = key
+        self.parent = parent
+        self.children = {}
+        self.self_time = 0.0
+
+
+def _label(key):
+    if hasattr(key, 'co_name'):
+        return f"{key.co_name} ({os.path.basename(key.co_filename)}:{key.co_firstlineno})"
+    return f"{getattr(key, '__qualname__', repr(key))} (builtin)"
+
+
+class StackProfiler:
+    """Self time per call stack for the thread that calls start()."""
+
+    def __init__(self, name):
+        self.name = name
+        self.root = _Node(None, None)
+        self._node = self.root
+        self._last = None
+        self.wall = 0.0
+
+    def _event(self, frame, event, arg):
+        now = time.perf_counter()
+        node = self._node
+        node.self_time += now - self._last
+        if event == 'call':
+            key = frame.f_code
+        elif event == 'c_call':
+            key = arg
+        else:
+            # return / c_return / c_exception; frames entered before start() end at root
+            if node.parent is not None:
+                self._node = node.parent
+            self._last = time.perf_counter()
+            return
+        child = node.children.get(key)
+        if child is None:
+            child = node.children[key] = _Node(key, node)
+        self._node = child
+        self._last = time.perf_counter()  # keep the profiler's own time out of the frames
+
+    def start(self):
+        self._t0 = self._last = time.perf_counter()
+        sys.setprofile(self._event)
+        return self
+
+    def stop(self):
+        sys.setprofile(None)
+        self.wall = time.perf_counter() - self._t0
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stacks(self):
+        # (tuple of frame labels root -> leaf, self seconds) for every stack with self time
+        out = []
+        todo = [(child, ()) for child in self.root.children.values()]
+        while todo:
+            node, path = todo.pop()
+            path = path + (_label(node.key),)
+            if node.self_time > 0:
+                out.append((path, node.self_time))
+            todo.extend((child, path) for child in node.children.values())
+        return out
+
+    def write(self, out_dir=PROFILE_DIR):
+        """Write <name>.collapsed.txt and <name>.speedscope.json; returns the file stem."""
+        os.makedirs(out_dir, exist_ok=True)
+        stem = os.path.join(out_dir, f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{threading.get_ident() % 10000}")
+        stacks = sorted(self.stacks())
+
+        with open(stem + ".collapsed.txt", "w") as f:
+            for path, seconds in stacks:
+                f.write(f"{';'.join(path)} {max(1, round(seconds * 1e6))}\n")
+
+        frames, index = [], {}
+        samples = []
+        for path, _ in stacks:
+            sample = []
+            for label in path:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({'name': label})
+                sample.append(index[label])
+            samples.append(sample)
+        weights = [round(seconds * 1e6, 1) for _, seconds in stacks]
+        speedscope = {
+            '$schema': "https://www.speedscope.app/file-format-schema.json",
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled', 'name': self.name, 'unit': 'microseconds',
+                'startValue': 0, 'endValue': sum(weights),
+                'samples': samples, 'weights': weights,
+            }],
+            'name': self.name,
+            'exporter': 'bikeability profiling.py',
+        }
+        with open(stem + ".speedscope.json", "w") as f:
+            json.dump(speedscope, f)
+        return stem
+
+
+def install_profiling(app):
+    """Profile callback requests on the app's Flask server when enabled."""
+    if not (PROFILE_ALL or PROFILE_TOKEN):
+        return
+    from flask import g, request
+
+    server = app.server
+    update_path = app.config.routes_pathname_prefix + "_dash-update-component"
+
+    def wanted():
+        if PROFILE_ALL:
+            return True
+        token = request.headers.get(PROFILE_HEADER, "")
+        return bool(token) and hmac.compare_digest(token, PROFILE_TOKEN)
+
+    @server.before_request
+    def _start_profile():
+        if request.path == update_path and wanted():
+            output = (request.get_json(silent=True) or {}).get('output', '')
+            func = app.callback_map[output].get('callback') if output in app.callback_map else None
+            g.profiler = StackProfiler(f"callback-{getattr(func, '__name__', 'unknown')}").start()
+
+    @server.after_request
+    def _write_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            stem = profiler.stop().write()
+            response.headers['X-Profile'] = os.path.basename(stem)
+        return response
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the app import.")
+    parser.add_argument("command", choices=["import"])
+    parser.add_argument("--module", default="app", help="module to import (app, layout or shared)")
+    parser.add_argument("--out", default=PROFILE_DIR, help="output directory")
+    args = parser.parse_args()
+
+    with StackProfiler(f"import-{args.module}") as profiler:
+        __import__(args.module)
+    stem = profiler.write(args.out)
+    print(f"import {args.module}: {profiler.wall:.2f}s profiled -> {stem}.collapsed.txt, {stem}.speedscope.json")
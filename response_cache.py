@@ -0,0 +1,75 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+from plotly.io.json import to_json_plotly
+
+# === Selection-keyed response cache ===
+# Callback outputs depend only on a normalized selection key (a community name,
+# 'bin_0'..'bin_4', 'network' or None), so there are only ~83 distinct responses.
+# Values are stored pre-serialized to plain JSON types, so Dash re-encodes them
+# without walking components or numpy arrays again.
+
+CACHE_SIZE = int(os.environ.get("BIKEABILITY_CACHE_SIZE", 256))
+CACHE_WARM = os.environ.get("BIKEABILITY_CACHE_WARM", "0") == "1"
+
+
+def to_plain_json(value):
+    # components / plotly objects / numpy -> dicts, lists and scalars
+    return json.loads(to_json_plotly(value))
+
+
+class SelectionCache:
+    """Bounded LRU of JSON-ready responses keyed by (callback, selection key)."""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # computed outside the lock; two threads racing on a miss store the same value
+        value = to_plain_json(compute())
+        self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def warm(self, keys, compute):
+        # fill keys at boot without counting misses
+        for key in keys:
+            if key not in self._entries:
+                self._store(key, to_plain_json(compute(key)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+response_cache = SelectionCache()
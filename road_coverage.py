@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import pickle
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from geometry_store import SegmentGeometry, WKT_COLUMNS
+from network_common import pieces, ROADS_FILE, METRES_PER_MILE, UTM_EPSG, LANE_TYPES, LANE_DASH
+
+# === Road coverage engine ===
+# A road piece (two consecutive vertices of a street centerline) is covered when a bike
+# lane piece lies within COVER_DISTANCE metres of it and runs along a similar direction
+# (bearings within COVER_ANGLE degrees, ignoring which way each line was digitized).
+# Lane pieces go into an STR-tree once per worker; each community's road pieces are
+# checked against it in a process pool, and bearings are compared in NumPy over all
+# candidate pairs at once. Writes the coverage artifacts read by shared.py:
+#   name_to_network_score.json     covered / total road miles per community
+#   name_to_road_length.json       road miles per community
+#   citywide_stats.pkl             roads_total/covered/uncovered/coverage_pct and lane
+#                                  miles by type (other keys are kept)
+#   precomputed_network_plots.pkl  per-community inset figures
+#   python road_coverage.py --roads data/roads_with_neigh.csv [--workers 8] [--out data]
+# Roads use the bike_with_neigh.csv layout: UTM WKT in `geometry`, community in `CArea`.
+# Rebuild the bundle (python bundle.py build) afterwards.
+
+data_path = os.path.join(os.path.dirname(__file__), "data")
+
+COVER_DISTANCE = 600.0   # metres
+COVER_ANGLE = 45.0       # degrees
+ROAD_CHUNK = 4096        # road pieces per tree query, bounds the candidate pair arrays
+COVERED_COLOR = '#009E73'
+UNCOVERED_COLOR = '#D55E00'
+SEVERE_INJURIES = ['FATAL', 'INCAPACITATING INJURY']
+
+
+def bearings(p0, p1):
+    # undirected compass bearing in [0, 180)
+    return np.degrees(np.arctan2(p1[:, 0] - p0[:, 0], p1[:, 1] - p0[:, 1])) % 180.0
+
+
+# === Worker state ===
+# set once per pool process by _init_worker, so tasks only carry their road pieces
+_lanes = {}
+
+
+def _init_worker(lane_p0, lane_p1):
+    import shapely
+
+    _lanes['tree'] = shapely.STRtree(shapely.linestrings(np.stack([lane_p0, lane_p1], axis=1)))
+    _lanes['bearing'] = bearings(lane_p0, lane_p1)
+
+
+def covered_mask(road_p0, road_p1):
+    """True for each road piece with a similarly oriented lane piece within COVER_DISTANCE."""
+    import shapely
+
+    tree, lane_bearing = _lanes['tree'], _lanes['bearing']
+    road_bearing = bearings(road_p0, road_p1)
+    covered = np.zeros(len(road_p0), dtype=bool)
+    for lo in range(0, len(road_p0), ROAD_CHUNK):
+        hi = min(lo + ROAD_CHUNK, len(road_p0))
+        lines = shapely.linestrings(np.stack([road_p0[lo:hi], road_p1[lo:hi]], axis=1))
+        road_i, lane_i = tree.query(lines, predicate='dwithin', distance=COVER_DISTANCE)
+        diff = np.abs(road_bearing[lo + road_i] - lane_bearing[lane_i])
+        similar = np.minimum(diff, 180.0 - diff) <= COVER_ANGLE
+        covered[lo + road_i[similar]] = True
+    return covered
+
+
+def _community_task(args):
+    name, road_p0, road_p1 = args
+    return name, covered_mask(road_p0, road_p1)
+
+
+def compute_coverage(roads, lanes, workers=None):
+    """Coverage of every community's roads.
+
+    roads/lanes: frames with a UTM WKT `geometry` column and `CArea`. Returns a frame of
+    road pieces (CArea, x0, y0, x1, y1, miles, covered)."""
+    road_geom = SegmentGeometry.from_wkt(roads[WKT_COLUMNS['utm']].to_numpy(), 'utm')
+    road_seg, road_p0, road_p1 = pieces(road_geom)
+    lane_geom = SegmentGeometry.from_wkt(lanes[WKT_COLUMNS['utm']].to_numpy(), 'utm')
+    _, lane_p0, lane_p1 = pieces(lane_geom)
+
+    road_carea = roads['CArea'].to_numpy()[road_seg]
+    tasks = []
+    for name in pd.unique(road_carea[pd.notna(road_carea)]):
+        idx = np.flatnonzero(road_carea == name)
+        tasks.append((name, road_p0[idx], road_p1[idx]))
+    # largest communities first so the pool doesn't wait on one straggler
+    tasks.sort(key=lambda t: -len(t[1]))
+
+    covered = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(lane_p0, lane_p1)) as pool:
+        for name, mask in pool.map(_community_task, tasks):
+            covered[name] = mask
+
+    flags = np.zeros(len(road_p0), dtype=bool)
+    for name, mask in covered.items():
+        flags[road_carea == name] = mask
+    return pd.DataFrame({
+        'CArea': road_carea,
+        'x0': road_p0[:, 0], 'y0': road_p0[:, 1],
+        'x1': road_p1[:, 0], 'y1': road_p1[:, 1],
+        'miles': np.hypot(*(road_p1 - road_p0).T) / METRES_PER_MILE,
+        'covered': flags,
+    }).dropna(subset=['CArea'])
+
+
+def summarize(road_pieces, lanes, citywide_stats=None):
+    """Per-community scores and road miles, and the updated citywide stats dict."""
+    miles = road_pieces.groupby('CArea')['miles'].sum()
+    covered = road_pieces[road_pieces['covered']].groupby('CArea')['miles'].sum().reindex(miles.index, fill_value=0)
+    network_score = (covered / miles).fillna(0)
+
+    total, covered_total = float(miles.sum()), float(covered.sum())
+    stats = dict(citywide_stats or {})
+    stats.update({
+        'roads_total': total,
+        'covered': covered_total,
+        'uncovered': total - covered_total,
+        'coverage_pct': covered_total * 100 / total if total else 0.0,
+    })
+    lane_miles = lanes.groupby('DISPLAYROU_CLEAN')['length_miles'].sum()
+    for k in LANE_TYPES:
+        stats[k + '_MI'] = float(lane_miles.get(k, 0.0))
+    return network_score.to_dict(), miles.to_dict(), stats
+
+
+# === Inset figures ===
+
+def _line_xy(x0, y0, x1, y1):
+    # one trace for many two-point lines: x0 x1 None x0 x1 None ...
+    gap = np.full(len(x0), None, dtype=object)
+    return (np.column_stack([x0, x1, gap]).ravel().tolist(),
+            np.column_stack([y0, y1, gap]).ravel().tolist())
+
+
+def _polyline_xy(geometry, index):
+    # parts of the chosen segments, separated by None
+    xs, ys = [], []
+    for i in index:
+        for p in range(geometry.geom_offsets[i], geometry.geom_offsets[i + 1]):
+            xy = geometry.coords[geometry.part_offsets[p]:geometry.part_offsets[p + 1]]
+            xs.extend(xy[:, 0].tolist() + [None])
+            ys.extend(xy[:, 1].tolist() + [None])
+    return xs, ys
+
+
+def network_plots(road_pieces, lanes, crashes=None):
+    """Per-community inset figures: covered and uncovered roads, lanes by type, severe crashes."""
+    import plotly.graph_objects as go
+    from pyproj import Transformer
+
+    to_lonlat = Transformer.from_crs(UTM_EPSG, 4326, always_xy=True)
+    lon0, lat0 = to_lonlat.transform(road_pieces['x0'].to_numpy(), road_pieces['y0'].to_numpy())
+    lon1, lat1 = to_lonlat.transform(road_pieces['x1'].to_numpy(), road_pieces['y1'].to_numpy())
+    carea = road_pieces['CArea'].to_numpy()
+    covered = road_pieces['covered'].to_numpy()
+
+    lane_geom = SegmentGeometry.from_wkt(lanes[WKT_COLUMNS['lonlat']].to_numpy(), 'lonlat')
+    lane_carea = lanes['CArea'].to_numpy()
+    lane_type = lanes['DISPLAYROU_CLEAN'].to_numpy()
+    if crashes is not None:
+        crashes = crashes[crashes['MOST_SEVERE_INJURY'].isin(SEVERE_INJURIES)]
+
+    plots = {}
+    for name in pd.unique(carea):
+        fig = go.Figure()
+        for mask, color in ((covered, COVERED_COLOR), (~covered, UNCOVERED_COLOR)):
+            sel = (carea == name) & mask
+            x, y = _line_xy(lon0[sel], lat0[sel], lon1[sel], lat1[sel])
+            fig.add_trace(go.Scatter(x=x, y=y, mode='lines', line=dict(color=color, width=1), hoverinfo='skip'))
+        for k in LANE_TYPES:
+            index = np.flatnonzero((lane_carea == name) & (lane_type == k))
+            if len(index):
+                x, y = _polyline_xy(lane_geom, index)
+                fig.add_trace(go.Scatter(x=x, y=y, mode='lines', name=k,
+                                         line=dict(color='lightgray', width=2, dash=LANE_DASH[k])))
+        if crashes is not None:
+            local = crashes[crashes['CArea'] == name]
+            if len(local):
+                fig.add_trace(go.Scatter(x=local['LONGITUDE'], y=local['LATITUDE'], mode='markers',
+                                         marker=dict(color='darkred', size=6),
+                                         text=local['PRIM_CONTRIBUTORY_CAUSE'],
+                                         hovertemplate='%{text}<extra></extra>'))
+        plots[name] = fig
+    return plots
+
+
+# === Writing ===
+
+def _replace(path, write, mode="w"):
+    # temp file + rename, so the app never reads a half-written artifact
+    tmp = path + ".tmp"
+    with open(tmp, mode) as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def write_artifacts(out_dir, network_score, road_length, stats, plots):
+    os.makedirs(out_dir, exist_ok=True)
+    _replace(os.path.join(out_dir, "name_to_network_score.json"), lambda f: json.dump(network_score, f))
+    _replace(os.path.join(out_dir, "name_to_road_length.json"), lambda f: json.dump(road_length, f))
+    _replace(os.path.join(out_dir, "citywide_stats.pkl"), lambda f: pickle.dump(stats, f), "wb")
+    _replace(os.path.join(out_dir, "precomputed_network_plots.pkl"), lambda f: pickle.dump(plots, f), "wb")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute road coverage and the network artifacts.")
+    parser.add_argument("--roads", default=ROADS_FILE, help="road centerline CSV (UTM `geometry`, `CArea`)")
+    parser.add_argument("--lanes", default=os.path.join(data_path, "bike_with_neigh.csv"), help="bike lane CSV")
+    parser.add_argument("--crashes", default=os.path.join(data_path, "crash_with_carea.csv"),
+                        help="crash CSV for the inset markers (skipped if missing)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--out", default=data_path, help="output directory")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.roads):
+        parser.error(f"road centerlines not found: {args.roads}")
+    t0 = time.perf_counter()
+    roads = pd.read_csv(args.roads, usecols=[WKT_COLUMNS['utm'], 'CArea'])
+    lanes = pd.read_csv(args.lanes)
+    crashes = pd.read_csv(args.crashes) if os.path.exists(args.crashes) else None
+    t1 = time.perf_counter()
+    road_pieces = compute_coverage(roads, lanes, args.workers)
+    t2 = time.perf_counter()
+
+    with open(os.path.join(data_path, "citywide_stats.pkl"), "rb") as f:
+        previous = pickle.load(f)
+    network_score, road_length, stats = summarize(road_pieces, lanes, previous)
+    plots = network_plots(road_pieces, lanes, crashes)
+    write_artifacts(args.out, network_score, road_length, stats, plots)
+    t3 = time.perf_counter()
+
+    print(f"read {t1 - t0:.2f}s, coverage {t2 - t1:.2f}s ({len(road_pieces)} road pieces), "
+          f"artifacts {t3 - t2:.2f}s")
+    print(f"{stats['covered']:.0f} of {stats['roads_total']:.0f} road miles covered ({stats['coverage_pct']:.1f}%) "
+          f"-> {args.out}")
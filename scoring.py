@@ -0,0 +1,67 @@
+import numpy as np
+from community_stats import N_BINS
+
+# === Bikeability scoring ===
+# The formula behind name_to_infrastructure_score.json and name_to_bike_rank.json,
+# evaluated for all communities at once so the weights can change at request time:
+#   infrastructure = sum(weight[type] * lane miles[type]) / road miles, scaled so the
+#                    best community scores 1
+#   combined       = mix * infrastructure + (1 - mix) * network score
+#   bike rank      = quintile of combined (0 = lowest .. 4 = highest), as pd.qcut
+# The default weights are the per-type `weight` column of bike_with_neigh.csv.
+
+# lane types in the order of weight vectors, scoring store records and the weight
+# sliders (info panel order); network_common.LANE_TYPES is the inset drawing order
+WEIGHT_ORDER = ['PROTECTED', 'NEIGHBORHOOD', 'BUFFERED', 'BIKE', 'SHARED']
+DEFAULT_MIX = 0.5
+
+
+def lane_weights(segments):
+    # {lane type: weight} as carried by the lane segments
+    weights = segments.groupby('DISPLAYROU_CLEAN')['weight'].first()
+    return {t: float(weights.get(t, 0)) for t in WEIGHT_ORDER}
+
+
+class Scores:
+    """One evaluation of the formula, rows in engine community order."""
+
+    def __init__(self, infrastructure, combined, ranks):
+        self.infrastructure = infrastructure
+        self.combined = combined
+        self.ranks = ranks
+
+
+class ScoringEngine:
+    def __init__(self, names, lane_miles, road_length, network_score, weights, mix=DEFAULT_MIX, n_bins=N_BINS):
+        self.names = list(names)
+        self.lane_miles = np.asarray(lane_miles, dtype=float)  # (communities, WEIGHT_ORDER)
+        self.road_length = np.asarray(road_length, dtype=float)
+        self.network_score = np.asarray(network_score, dtype=float)
+        self.weights = np.array([weights[t] for t in WEIGHT_ORDER], dtype=float)
+        self.mix = float(mix)
+        self.n_bins = n_bins
+
+    @classmethod
+    def from_frame(cls, df, weights, key='CArea', **kwargs):
+        # df has <TYPE>_MI, road_length and network_score per community (viz_df)
+        return cls(df[key].tolist(), df[[t + '_MI' for t in WEIGHT_ORDER]].to_numpy(),
+                   df['road_length'].to_numpy(), df['network_score'].to_numpy(), weights, **kwargs)
+
+    def infrastructure(self, weights):
+        ratio = np.divide(self.lane_miles @ weights, self.road_length,
+                          out=np.zeros(len(self.names)), where=self.road_length > 0)
+        top = ratio.max()
+        return ratio / top if top > 0 else ratio
+
+    def ranks(self, combined):
+        # right-closed quantile bins, so equal scores share a rank
+        edges = np.quantile(combined, np.linspace(0, 1, self.n_bins + 1))
+        return np.searchsorted(edges[1:-1], combined, side='left')
+
+    def score(self, weights=None, mix=None):
+        """Scores for `weights` (in WEIGHT_ORDER) and `mix`; defaults where None."""
+        weights = self.weights if weights is None else np.asarray(weights, dtype=float)
+        mix = self.mix if mix is None else float(mix)
+        infrastructure = self.infrastructure(weights)
+        combined = mix * infrastructure + (1 - mix) * self.network_score
+        return Scores(infrastructure, combined, self.ranks(combined))
@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from geometry_store import SegmentGeometry, WKT_COLUMNS
+from network_common import pieces, UTM_EPSG, METRES_PER_MILE, LANE_TYPES, ROADS_FILE
+
+# === Per-segment crash risk ===
+# Snaps every crash (UTM metres) to the nearest bike lane segment of bike_with_neigh.csv
+# and, if road centerlines are given, to the nearest road segment, each within
+# SNAP_DISTANCE. Segment pieces (two consecutive vertices) go into an STR-tree of their
+# bounding boxes; each chunk of crashes queries it with a SNAP_DISTANCE box around every
+# crash, and the candidate pairs are measured with one vectorized point-to-segment
+# distance. Writes segment_risk.json, read by shared.py:
+#   lanes     crashes, severe, crashes_per_mile and risk level per lane segment,
+#             row-aligned with bike_with_neigh.csv
+#   by_type   segments, miles, crashes, severe and rates per DISPLAYROU_CLEAN type
+#   roads     the same per road segment, row-aligned with the roads CSV (if given)
+# Risk levels: 0 for segments without crashes, then 1..N_RISK_LEVELS by quantile of
+# crashes per mile among the others. The network inset colors lanes by level.
+#   python segment_risk.py [--crashes data/crash_with_carea.csv] [--roads data/roads_with_neigh.csv] [--out data]
+# Rebuild the bundle (python bundle.py build) afterwards.
+
+data_path = os.path.join(os.path.dirname(__file__), "data")
+RISK_FILE = "segment_risk.json"
+
+SNAP_DISTANCE = 30.0   # metres
+N_RISK_LEVELS = 3
+CRASH_CHUNK = 65536    # crashes per tree query, bounds the candidate pair arrays
+SEVERE_INJURIES = ['FATAL', 'INCAPACITATING INJURY']
+
+
+def point_segment_distance(xy, p0, p1):
+    # distance from each point to the matching piece p0 -> p1 (pieces have non-zero length)
+    d = p1 - p0
+    t = np.clip(np.einsum('ij,ij->i', xy - p0, d) / np.einsum('ij,ij->i', d, d), 0.0, 1.0)
+    return np.hypot(*(p0 + t[:, None] * d - xy).T)
+
+
+def snap(xy, geometry, tolerance=SNAP_DISTANCE):
+    """Nearest segment of `geometry` per point within tolerance, -1 if none."""
+    import shapely
+
+    seg, p0, p1 = pieces(geometry)
+    tree = shapely.STRtree(shapely.linestrings(np.stack([p0, p1], axis=1)))
+    nearest = np.full(len(xy), -1, dtype=np.int64)
+    for lo in range(0, len(xy), CRASH_CHUNK):
+        pts = xy[lo:lo + CRASH_CHUNK]
+        boxes = shapely.box(pts[:, 0] - tolerance, pts[:, 1] - tolerance, pts[:, 0] + tolerance, pts[:, 1] + tolerance)
+        point_i, piece_i = tree.query(boxes)  # bounding box candidates only
+        dist = point_segment_distance(pts[point_i], p0[piece_i], p1[piece_i])
+        near = dist <= tolerance
+        point_i, piece_i, dist = point_i[near], piece_i[near], dist[near]
+        # closest candidate per point (ties: lowest piece)
+        order = np.lexsort((piece_i, dist, point_i))
+        point_i, first = np.unique(point_i[order], return_index=True)
+        nearest[lo + point_i] = seg[piece_i[order][first]]
+    return nearest
+
+
+def segment_miles(geometry):
+    seg, p0, p1 = pieces(geometry)
+    return np.bincount(seg, weights=np.hypot(*(p1 - p0).T), minlength=len(geometry)) / METRES_PER_MILE
+
+
+def risk_levels(crashes_per_mile, n_levels=N_RISK_LEVELS):
+    # 0 without crashes, else right-closed quantile bins of the positive rates (as bike ranks)
+    rates = np.asarray(crashes_per_mile, dtype=float)
+    levels = np.zeros(len(rates), dtype=np.int64)
+    positive = rates > 0
+    if positive.any():
+        edges = np.quantile(rates[positive], np.linspace(0, 1, n_levels + 1))
+        levels[positive] = 1 + np.searchsorted(edges[1:-1], rates[positive], side='left')
+    return levels
+
+
+def segment_counts(nearest, severe, miles):
+    n = len(miles)
+    matched = nearest >= 0
+    crashes = np.bincount(nearest[matched], minlength=n)
+    severe = np.bincount(nearest[matched & severe], minlength=n)
+    per_mile = np.divide(crashes, miles, out=np.zeros(n), where=miles > 0)
+    return {
+        'crashes': crashes.tolist(),
+        'severe': severe.tolist(),
+        'crashes_per_mile': np.round(per_mile, 2).tolist(),
+        'risk': risk_levels(per_mile).tolist(),
+    }
+
+
+def by_type(lanes, counts):
+    frame = pd.DataFrame({'type': lanes['DISPLAYROU_CLEAN'].to_numpy(), 'miles': lanes['length_miles'].to_numpy(),
+                          'crashes': counts['crashes'], 'severe': counts['severe']})
+    totals = frame.groupby('type').agg(segments=('miles', 'size'), miles=('miles', 'sum'),
+                                       crashes=('crashes', 'sum'), severe=('severe', 'sum'))
+    out = {}
+    for k in LANE_TYPES:
+        if k in totals.index:
+            row = totals.loc[k]
+            out[k] = {
+                'segments': int(row['segments']),
+                'miles': round(float(row['miles']), 1),
+                'crashes': int(row['crashes']),
+                'severe': int(row['severe']),
+                'crashes_per_mile': round(float(row['crashes'] / row['miles']), 2) if row['miles'] else 0.0,
+                'severe_per_mile': round(float(row['severe'] / row['miles']), 2) if row['miles'] else 0.0,
+            }
+    return out
+
+
+def compute_risk(crashes, lanes, roads=None):
+    """segment_risk.json contents for lon/lat crashes and UTM lane (and road) segments."""
+    from pyproj import Transformer
+
+    crashes = crashes.dropna(subset=['LATITUDE', 'LONGITUDE'])
+    to_utm = Transformer.from_crs(4326, UTM_EPSG, always_xy=True)
+    xy = np.column_stack(to_utm.transform(crashes['LONGITUDE'].to_numpy(), crashes['LATITUDE'].to_numpy()))
+    severe = crashes['MOST_SEVERE_INJURY'].isin(SEVERE_INJURIES).to_numpy()
+
+    lane_geom = SegmentGeometry.from_wkt(lanes[WKT_COLUMNS['utm']].to_numpy(), 'utm')
+    # lane rates use length_miles, as the lane miles everywhere else in the app
+    lane_counts = segment_counts(snap(xy, lane_geom), severe, lanes['length_miles'].to_numpy(dtype=float))
+    risk = {
+        'snap_distance_m': SNAP_DISTANCE,
+        'crashes': len(crashes),
+        'lanes': lane_counts,
+        'by_type': by_type(lanes, lane_counts),
+    }
+    if roads is not None:
+        road_geom = SegmentGeometry.from_wkt(roads[WKT_COLUMNS['utm']].to_numpy(), 'utm')
+        risk['roads'] = segment_counts(snap(xy, road_geom), severe, segment_miles(road_geom))
+    return risk
+
+
+def write_risk(risk, out_dir=data_path):
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, RISK_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(risk, f)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snap crashes to lane and road segments and write per-segment risk.")
+    parser.add_argument("--crashes", default=os.path.join(data_path, "crash_with_carea.csv"), help="crash CSV")
+    parser.add_argument("--lanes", default=os.path.join(data_path, "bike_with_neigh.csv"), help="bike lane CSV")
+    parser.add_argument("--roads", default=ROADS_FILE,
+                        help="road centerline CSV (UTM `geometry`), skipped if missing")
+    parser.add_argument("--out", default=data_path, help="output directory")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    crashes = pd.read_csv(args.crashes, usecols=['LONGITUDE', 'LATITUDE', 'MOST_SEVERE_INJURY'])
+    lanes = pd.read_csv(args.lanes)
+    roads = pd.read_csv(args.roads, usecols=[WKT_COLUMNS['utm']]) if os.path.exists(args.roads) else None
+    risk = compute_risk(crashes, lanes, roads)
+    write_risk(risk, args.out)
+
+    on_lanes = sum(risk['lanes']['crashes'])
+    print(f"{on_lanes} of {risk['crashes']} crashes within {SNAP_DISTANCE:.0f} m of a bike lane"
+          + (f", {sum(risk['roads']['crashes'])} of a road" if roads is not None else "")
+          + f" in {time.perf_counter() - t0:.2f}s -> {os.path.join(args.out, RISK_FILE)}")
+    for k, row in risk['by_type'].items():
+        print(f"  {k:<13} {row['miles']:>7.1f} mi  {row['crashes']:>6} crashes  "
+              f"{row['crashes_per_mile']:>7.2f}/mi  {row['severe_per_mile']:>6.2f} severe/mi")
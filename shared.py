@@ -1,102 +1,40 @@
+from boot_timer import mark
 import os
 import json
 import pickle
 import pandas as pd
 import numpy as np
-import geopandas as gpd
-from shapely.affinity import scale as scale_geom, translate as translate_geom
 from dash import Dash, dcc, html, Input, Output, State, ctx
-from matplotlib.colors import Normalize, LinearSegmentedColormap
 import plotly.graph_objects as go
+from functools import lru_cache
+from community_stats import CommunityStats
+from geometry_store import SegmentGeometry, WKT_COLUMNS
+from crash_cube import CrashCube
+from crash_heatmap import CrashHeatmap
+from scoring import ScoringEngine, lane_weights
+mark('imports')
 
 # === path- DONT replace ===
 data_path = os.path.join(os.path.dirname(__file__), "data")
 
+# === data mode ===
+# "source": parse the raw CSV/GeoJSON/JSON files and rebuild every derived table (default)
+# "bundle": load only the precompiled bundle written by `python bundle.py build`;
+#           geopandas, shapely and matplotlib are then never imported
+DATA_MODE = os.environ.get("BIKEABILITY_DATA", "source")
+# "shapes": one layout shape/annotation per tile element (default)
+# "batched": tiles, bars and badges as a few filled traces, labels as one text trace
+CARTOGRAM_MODE = os.environ.get("BIKEABILITY_CARTOGRAM", "shapes")
+# render the info panel in the browser from a one-time dcc.Store (assets/info_panel.js)
+CLIENTSIDE_PANEL = os.environ.get("BIKEABILITY_CLIENTSIDE_PANEL", "0") == "1"
 
 
-
-# === Load Chicago outline ===
-places = gpd.read_file(os.path.join(data_path, "chicago_places.geojson"))
-
-with open(os.path.join(data_path, "CAreaGrid.json")) as f:
-    carea_raw = json.load(f)
-
 class CArea:
     def __init__(self, name, gridloc):
         self.name = name
         self.gridloc = tuple(gridloc)
 
-CAreaGrid = [CArea(d['name'], d['gridloc']) for d in carea_raw]
-
-grouped = pd.read_csv(os.path.join(data_path, "grouped.csv"))
-bike_with_neigh = pd.read_csv(os.path.join(data_path, "bike_with_neigh.csv"))
-crash_with_carea = pd.read_csv(os.path.join(data_path, "crash_with_carea.csv"))
-
-with open(os.path.join(data_path, "name_to_road_length.json")) as f:
-    name_to_road_length = json.load(f)
-with open(os.path.join(data_path, "community_pops.json")) as f:
-    community_pops = json.load(f)
-
-with open(os.path.join(data_path, "name_to_infrastructure_score.json")) as f:
-    name_to_infrastructure_score = json.load(f)
-with open(os.path.join(data_path,"name_to_network_score.json")) as f:
-    name_to_network_score = json.load(f)
-with open(os.path.join(data_path, "name_to_bike_rank.json")) as f:
-    name_to_bikeability_rank = json.load(f)
-
-with open(os.path.join(data_path, "precomputed_network_plots.pkl"), "rb") as f:
-    network_plots = pickle.load(f)
-with open(os.path.join(data_path,"citywide_stats.pkl"), "rb") as f:
-    citywide_stats = pickle.load(f)
-#citywide network fig loaded directly 
-
-with open(os.path.join(data_path, "injury_counts_city.json")) as f:
-    injury_counts_city = json.load(f)
-with open(os.path.join(data_path, "top_causes_city.json")) as f:
-    top_causes_city = json.load(f)
-
-
-
-
-
- # Filter to Chicago
-city_gdf = places[places['NAME'] == 'Chicago']
-city_outline = city_gdf.unary_union
-
-from shapely.affinity import scale as scale_geom, translate as translate_geom
-from shapely.geometry import box
-
-# Compute cartogram bounding box
-x_vals = [carea.gridloc[0] for carea in CAreaGrid]
-y_vals = [carea.gridloc[1] for carea in CAreaGrid]
-xmin, xmax = min(x_vals) - 1, max(x_vals) + 1
-ymin, ymax = min(y_vals) - 1, max(y_vals) + 1
-carto_w = xmax - xmin
-carto_h = ymax - ymin
-
-# Get bounds of city
-city_bounds = city_outline.bounds
-outline_w = city_bounds[2] - city_bounds[0]
-outline_h = city_bounds[3] - city_bounds[1]
-
-# Compute scale factors
-scale_x = carto_w / outline_w
-scale_y = carto_h / outline_h
-scale_factor = min(scale_x, scale_y)+0.1
 
-# Apply transformation
-xfact = scale_factor * 0.85  # tweak x compression
-yfact = -scale_factor * 1.15  # flip y
-scaled = scale_geom(city_outline, xfact=xfact, yfact=yfact, origin='center')
-
-center_x = (xmin + xmax) / 2
-center_y = (ymin + ymax) / 2
-
-translated = translate_geom(
-    scaled,
-    xoff=center_x - (scaled.bounds[0] + scaled.bounds[2]) / 2 - 0.9,
-    yoff=center_y - (scaled.bounds[1] + scaled.bounds[3]) / 2 +0.2
-)
 def name_to_abbrev(n):
     # simple abbreviator for capitalized names
 
@@ -140,15 +78,8 @@ def name_to_abbrev(n):
             abrv += word[0][0] + cons[0]"""
     return abrv
 
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.colors import Normalize, LinearSegmentedColormap
-import plotly.graph_objects as go
-from dash import Dash, dcc, html, Input, Output, State, ctx
-
 
 # Define colors
-COLOR_GRADIENT_MAP = LinearSegmentedColormap.from_list("pink_to_blue", ['#FFC0CB', '#418CC0'])
 COLOR_INJURY = 'darkred'
 COLOR_EDGE = 'rgba(160, 160, 160, 0.5)'#'#B3DDF2'
 COLOR_TEXT = "#1A1A1A"
@@ -160,92 +91,290 @@ def rgba_to_plotly_color(rgba):
     r, g, b, a = rgba
     return f'rgba({int(r*255)}, {int(g*255)}, {int(b*255)}, {a:.2f})'
 
-norm = Normalize(vmin=0, vmax=5)
-
-# Group bike lane types
-bike_lane_summary = (
-    bike_with_neigh.groupby(['CArea', 'DISPLAYROU_CLEAN'])
-    .size()
-    .unstack(fill_value=0)
-    .reset_index()
-)
-
-
-causes_dict = (
-    crash_with_carea[~crash_with_carea['PRIM_CONTRIBUTORY_CAUSE'].isin(['UNABLE TO DETERMINE', 'NOT APPLICABLE'])]
-    .groupby(['CArea', 'PRIM_CONTRIBUTORY_CAUSE'])
-    .size()
-    .reset_index(name='count')
-    .sort_values(['CArea', 'count'], ascending=[True, False])
-    .groupby('CArea')['PRIM_CONTRIBUTORY_CAUSE']
-    .apply(lambda x: x.head(5).tolist())
-    .to_dict()
-)
-
-
-injuries_dict = (
-    crash_with_carea.groupby(['CArea', 'MOST_SEVERE_INJURY'])
-    .size()
-    .unstack(fill_value=0)
-    .to_dict(orient='index')
-)
-
-
-# Build viz data
-viz_data = []
-for carea in CAreaGrid:
-    name = carea.name
-    total = grouped.loc[grouped['CArea'] == name, 'total_crashes'].values[0]
-    severe = grouped.loc[grouped['CArea'] == name, 'severe_crashes'].values[0]
-    share = grouped.loc[grouped['CArea'] == name, 'crash_rate'].values[0]
-    rate = severe / total if total > 0 else 0
-
-    infrastructure_score = name_to_infrastructure_score.get(name, 0)
-    network_score = name_to_network_score.get(name, 0)
-    bike_rank = name_to_bikeability_rank.get(name, 0)
-    road_length = name_to_road_length.get(name, 0)
-    population = community_pops[name]
-    abbrev = name_to_abbrev(name).upper()
-    x, y = carea.gridloc
-    viz_data.append({
-        'CArea': name, 'x': x, 'y': y,
+
+def gradient_colors():
+    # 5-bin pink->blue scale: tile fill per bike_rank (0-4) and legend swatches (bottom->top)
+    from matplotlib.colors import Normalize, LinearSegmentedColormap
+
+    gradient = LinearSegmentedColormap.from_list("pink_to_blue", ['#FFC0CB', '#418CC0'])
+    norm = Normalize(vmin=0, vmax=5)
+    bin_colors = [rgba_to_plotly_color(gradient(norm(rank))) for rank in range(5)]
+    legend_colors = [rgba_to_plotly_color(gradient(v)) for v in np.linspace(0, 1, 5)]
+    return bin_colors, legend_colors
+
+lane_cols = [k + '_MI' for k in ['PROTECTED','BUFFERED','BIKE','SHARED','NEIGHBORHOOD']]
+
+
+if DATA_MODE == "bundle":
+    from bundle import load_bundle, BUNDLE_DIR
+
+    _bundle = load_bundle()
+    CAreaGrid = [CArea(d['name'], d['gridloc']) for d in _bundle['carea_grid']]
+    viz_df = _bundle['viz_df']
+    bike_lane_summary = _bundle['bike_lane_summary']
+    miles_by_type = _bundle['miles_by_type']
+    citywide_stats = _bundle['citywide_stats']
+    injury_counts_city = _bundle['injury_counts_city']
+    top_causes_city = _bundle['top_causes_city']
+    hotspots = _bundle['hotspots']
+    segment_risk = _bundle['segment_risk']
+    city_outline_xy = _bundle['outline_xy']
+    BIN_COLORS, LEGEND_COLORS = _bundle['bin_colors'], _bundle['legend_colors']
+    segments = _bundle['segments']
+    crash_cube = CrashCube.load(BUNDLE_DIR)
+    mark('read bundle')
+
+else:
+    import geopandas as gpd
+    from crash_ingest import load_state as load_crash_state
+    from shapely.affinity import scale as scale_geom, translate as translate_geom
+
+    BIN_COLORS, LEGEND_COLORS = gradient_colors()
+
+    # === Load Chicago outline ===
+    places = gpd.read_file(os.path.join(data_path, "chicago_places.geojson"))
+
+    with open(os.path.join(data_path, "CAreaGrid.json")) as f:
+        carea_raw = json.load(f)
+
+    CAreaGrid = [CArea(d['name'], d['gridloc']) for d in carea_raw]
+
+    bike_with_neigh = pd.read_csv(os.path.join(data_path, "bike_with_neigh.csv"))
+    # the cube kept by crash_ingest.py replaces the full crash table when present
+    crash_state = load_crash_state(data_path)
+
+    with open(os.path.join(data_path, "name_to_road_length.json")) as f:
+        name_to_road_length = json.load(f)
+    with open(os.path.join(data_path, "community_pops.json")) as f:
+        community_pops = json.load(f)
+
+    # infrastructure score and bike rank are computed below (scoring.py)
+    with open(os.path.join(data_path,"name_to_network_score.json")) as f:
+        name_to_network_score = json.load(f)
+
+    with open(os.path.join(data_path,"citywide_stats.pkl"), "rb") as f:
+        citywide_stats = pickle.load(f)
+    #citywide network fig loaded directly 
+
+    with open(os.path.join(data_path, "injury_counts_city.json")) as f:
+        injury_counts_city = json.load(f)
+    with open(os.path.join(data_path, "top_causes_city.json")) as f:
+        top_causes_city = json.load(f)
+    # written by hotspots.py; without it no hotspots are shown
+    hotspots_path = os.path.join(data_path, "hotspots.json")
+    hotspots = {}
+    if os.path.exists(hotspots_path):
+        with open(hotspots_path) as f:
+            hotspots = json.load(f)
+    # written by segment_risk.py; without it lanes keep their plain inset style
+    risk_path = os.path.join(data_path, "segment_risk.json")
+    segment_risk = None
+    if os.path.exists(risk_path):
+        with open(risk_path) as f:
+            segment_risk = json.load(f)
+        # road rows are not drawn; lane rows must still match bike_with_neigh.csv
+        segment_risk.pop('roads', None)
+        if len(segment_risk['lanes']['risk']) != len(bike_with_neigh):
+            segment_risk = None
+    mark('read files')
+
+
+    # Filter to Chicago
+    city_gdf = places[places['NAME'] == 'Chicago']
+    city_outline = city_gdf.unary_union
+
+    # Compute cartogram bounding box
+    x_vals = [carea.gridloc[0] for carea in CAreaGrid]
+    y_vals = [carea.gridloc[1] for carea in CAreaGrid]
+    xmin, xmax = min(x_vals) - 1, max(x_vals) + 1
+    ymin, ymax = min(y_vals) - 1, max(y_vals) + 1
+    carto_w = xmax - xmin
+    carto_h = ymax - ymin
+
+    # Get bounds of city
+    city_bounds = city_outline.bounds
+    outline_w = city_bounds[2] - city_bounds[0]
+    outline_h = city_bounds[3] - city_bounds[1]
+
+    # Compute scale factors
+    scale_x = carto_w / outline_w
+    scale_y = carto_h / outline_h
+    scale_factor = min(scale_x, scale_y)+0.1
+
+    # Apply transformation
+    xfact = scale_factor * 0.85  # tweak x compression
+    yfact = -scale_factor * 1.15  # flip y
+    scaled = scale_geom(city_outline, xfact=xfact, yfact=yfact, origin='center')
+
+    center_x = (xmin + xmax) / 2
+    center_y = (ymin + ymax) / 2
+
+    translated = translate_geom(
+        scaled,
+        xoff=center_x - (scaled.bounds[0] + scaled.bounds[2]) / 2 - 0.9,
+        yoff=center_y - (scaled.bounds[1] + scaled.bounds[3]) / 2 +0.2
+    )
+    # outline drawn behind the cartogram (single polygons only)
+    if translated.geom_type == 'Polygon':
+        city_outline_xy = (list(translated.exterior.xy[0]), list(translated.exterior.xy[1]))
+    else:
+        city_outline_xy = ([], [])
+    mark('geometry')
+
+    # Group bike lane types
+    bike_lane_summary = (
+        bike_with_neigh.groupby(['CArea', 'DISPLAYROU_CLEAN'])
+        .size()
+        .unstack(fill_value=0)
+        .reset_index()
+    )
+
+
+    # month cube behind every crash number in the app; the full date range is just its
+    # widest window, so the counts can't jump when the slider leaves it
+    names = [carea.name for carea in CAreaGrid]
+    crash_cube = CrashCube.load(data_path, crash_state['cube']) if crash_state and crash_state.get('cube') else None
+    if crash_cube is None:
+        crash_with_carea = pd.read_csv(os.path.join(data_path, "crash_with_carea.csv"))
+        crash_cube = CrashCube.from_frame(crash_with_carea, names)
+    all_months = crash_cube.reindex(names).window()
+
+    # Build viz data (one vectorized pass over all communities)
+    total, severe, rate = all_months.total, all_months.severe, all_months.rate
+
+    name_col = pd.Series(names)
+    viz_df = pd.DataFrame({
+        'CArea': names,
+        'x': [carea.gridloc[0] for carea in CAreaGrid],
+        'y': [carea.gridloc[1] for carea in CAreaGrid],
         'total_crashes': total,
         'severe_crashes': severe,
         'severe_rate': rate,
-        'infrastructure_score':infrastructure_score,
-        'network_score':network_score,
-        'bike_rank': bike_rank,
-        'road_length':road_length,
-        'population':population,
-        'abbrev': abbrev,
-        'crashes_share':share,
-
+        'network_score': name_col.map(name_to_network_score).fillna(0).to_numpy(),
+        'road_length': name_col.map(name_to_road_length).fillna(0).to_numpy(),
+        'population': [community_pops[name] for name in names],
+        'abbrev': [name_to_abbrev(name).upper() for name in names],
+        'crashes_share': np.divide(total, total.sum(), out=np.zeros(len(names)), where=total.sum() > 0),
     })
-viz_df = pd.DataFrame(viz_data)
-viz_df = viz_df.merge(bike_lane_summary, on='CArea', how='left').fillna(0)
+    viz_df = viz_df.merge(bike_lane_summary, on='CArea', how='left').fillna(0)
 
-for k in ['PROTECTED','BUFFERED','BIKE','SHARED','NEIGHBORHOOD']:
-    bike_with_neigh[k + '_MI'] = bike_with_neigh.apply(
-        lambda row: row['length_miles'] if row['DISPLAYROU_CLEAN'] == k else 0,
-        axis=1
-    )
+    for k in ['PROTECTED','BUFFERED','BIKE','SHARED','NEIGHBORHOOD']:
+        bike_with_neigh[k + '_MI'] = bike_with_neigh['length_miles'].where(bike_with_neigh['DISPLAYROU_CLEAN'] == k, 0)
 
 
-miles_by_type = bike_with_neigh.groupby('CArea')[[k + '_MI' for k in ['PROTECTED','BUFFERED','BIKE','SHARED','NEIGHBORHOOD']]].sum().reset_index()
-viz_df = viz_df.merge(miles_by_type, on='CArea', how='left')
+    miles_by_type = bike_with_neigh.groupby('CArea')[[k + '_MI' for k in ['PROTECTED','BUFFERED','BIKE','SHARED','NEIGHBORHOOD']]].sum().reset_index()
+    viz_df = viz_df.merge(miles_by_type, on='CArea', how='left')
 
 
-def get_bike_coverage_plotly(carea_name):
-    return network_plots.get(carea_name, go.Figure())
+    #no bike areas 
+    missing = set(viz_df['CArea']) - set(miles_by_type['CArea'])
+    print("Names in viz_df but missing in miles_by_type:")
+    print(sorted(missing))
+    #fill nans foe those areas
+    viz_df[lane_cols] = viz_df[lane_cols].fillna(0)
 
+    # lane segment attributes; geometry lives in the segment geometry store
+    segments = bike_with_neigh.drop(columns=['the_geom', 'geometry'] + lane_cols)
+    mark('aggregations')
 
-#no bike areas 
-missing = set(viz_df['CArea']) - set(miles_by_type['CArea'])
-print("Names in viz_df but missing in miles_by_type:")
-print(sorted(missing))
-#fill nans foe those areas
-lane_cols = [k + '_MI' for k in ['PROTECTED','BUFFERED','BIKE','SHARED','NEIGHBORHOOD']]
-viz_df[lane_cols] = viz_df[lane_cols].fillna(0)
+
+# bikeability at the default weights; the sliders re-score through the same engine
+scoring = ScoringEngine.from_frame(viz_df, lane_weights(segments))
+default_scores = scoring.score()
+viz_df['infrastructure_score'] = default_scores.infrastructure
+viz_df['bike_rank'] = default_scores.ranks
+
+community_stats = CommunityStats.from_frame(viz_df)
+crash_cube = crash_cube.reindex(community_stats.names)
+all_months = crash_cube.window()
+
+
+def crash_window(crash_range):
+    # CrashWindow for a [first, last] month range of the date slider; None for all months
+    # (all_months, which the figure and viz_df were built from)
+    if not crash_range or list(crash_range) == [0, crash_cube.n_months - 1]:
+        return None
+    return crash_cube.window(*crash_range)
+
+
+def score_params(weights, mix):
+    # slider values as the `scoring` store record; None at the default weights
+    if weights is None or mix is None:
+        return None
+    weights = [float(w) for w in weights]
+    if weights == scoring.weights.tolist() and float(mix) == scoring.mix:
+        return None
+    return {'weights': weights, 'mix': float(mix)}
+
+
+def score_set(params):
+    # Scores for a `scoring` store record; None for the default weights
+    if not params:
+        return None
+    return scoring.score(params['weights'], params['mix'])
+
+
+def score_fields(carea_name, scores=None):
+    # one community's rank (0-4) and infrastructure score under `scores`
+    if scores is None:
+        row = community_stats.row(carea_name)
+        return {'bike_rank': row['bike_rank'], 'infrastructure_score': row['infrastructure_score']}
+    i = community_stats.id_of(carea_name)
+    return {'bike_rank': int(scores.ranks[i]), 'infrastructure_score': float(scores.infrastructure[i])}
+
+
+def crash_fields(carea_name, window=None):
+    # one community's crash numbers over a cube window (default: all months)
+    window = all_months if window is None else window
+    i = community_stats.id_of(carea_name)
+    return {
+        'total_crashes': int(window.total[i]),
+        'severe_crashes': int(window.severe[i]),
+        'severe_rate': float(window.rate[i]),
+        'causes': window.top_causes(i),
+        'injuries': window.injury_counts(i),
+    }
+
+
+if DATA_MODE == "bundle":
+    from insets import InsetStore
+
+    # insets are read on demand from the memory-mapped store, no pickle
+    network_store = InsetStore(BUNDLE_DIR)
+
+    def get_inset_traces(carea_name):
+        return network_store.traces(carea_name)
+
+    def get_bike_coverage_plotly(carea_name):
+        return go.Figure(data=get_inset_traces(carea_name))
+
+else:
+    with open(os.path.join(data_path, "precomputed_network_plots.pkl"), "rb") as f:
+        network_plots = pickle.load(f)
+
+    def get_bike_coverage_plotly(carea_name):
+        return network_plots.get(carea_name, go.Figure())
+
+    def get_inset_traces(carea_name):
+        return [trace.to_plotly_json() for trace in get_bike_coverage_plotly(carea_name).data]
+mark('insets')
+
+
+@lru_cache(maxsize=None)
+def get_segment_geometry(crs='utm'):
+    # SegmentGeometry for `crs` ('utm' or 'lonlat'), row-aligned with `segments`
+    if DATA_MODE == "bundle":
+        return SegmentGeometry.load(BUNDLE_DIR, crs)
+    return SegmentGeometry.from_wkt(bike_with_neigh[WKT_COLUMNS[crs]], crs)
+
+
+@lru_cache(maxsize=None)
+def get_crash_heatmap():
+    # CrashHeatmap of every crash location; built on first use, as only the heatmap layer needs it
+    if DATA_MODE == "bundle":
+        return CrashHeatmap.load(BUNDLE_DIR)
+    crashes = pd.read_csv(os.path.join(data_path, "crash_with_carea.csv"), usecols=['LONGITUDE', 'LATITUDE'])
+    return CrashHeatmap.from_points(crashes['LONGITUDE'], crashes['LATITUDE'])
 
 
 injury_order = ['FATAL', 'INCAPACITATING INJURY', 'NONINCAPACITATING INJURY', 'REPORTED, NOT EVIDENT', 'NO INDICATION OF INJURY']
@@ -253,6 +382,11 @@ injury_order = ['FATAL', 'INCAPACITATING INJURY', 'NONINCAPACITATING INJURY', 'R
 
 
 
+prompt_panel = html.Div([
+    html.P("Click a community area or select from the dropdown."),
+], style={'paddingBottom': '200px'})
+
+
 network_mode_panel = html.Div([
     html.H3("Citywide Biking Network"),
     html.I("Do you live in a red desert?"),
@@ -381,3 +515,62 @@ network_mode_panel = html.Div([
             style={'color': 'lightgray', 'textDecoration': 'none'})
     ], style={'margin': '0 0 0 0px'})
 ])
+
+
+def panel_crash_data(carea_name, window=None):
+    # the crash part of a community's client-side panel entry (re-sent when the date range moves)
+    crash = crash_fields(carea_name, window)
+    injuries = crash['injuries']
+    return {
+        'total_crashes': int(crash['total_crashes']),
+        'causes': [c.title() for c in crash['causes'][:3]],
+        'injuries': [
+            [f"{k.title()}" + (" (Severe):" if k.upper() in ['FATAL', 'INCAPACITATING INJURY'] else ":"),
+             int(injuries.get(k, 0))]
+            for k in injury_order if k in injuries
+        ],
+        'severe': f"{crash['severe_crashes']} ({int(crash['severe_rate'] * 100)}%)",
+    }
+
+
+def hotspot_label(hotspot):
+    # "Near 26th St (intersection)"
+    place = f"Near {hotspot['street']}" if hotspot['street'] else "Unnamed location"
+    return f"{place} ({hotspot['kind']})"
+
+
+def hotspot_detail(hotspot):
+    return f"{hotspot['crashes']} crashes, {hotspot['severe']} severe ({int(hotspot['severe'] / hotspot['crashes'] * 100)}%)"
+
+
+def panel_hotspot_data(carea_name):
+    # the community's worst hotspots as (label, detail) rows, shared by both info panels
+    return [[hotspot_label(h) + ":", hotspot_detail(h)] for h in hotspots.get(carea_name, [])[:3]]
+
+
+def panel_score_data(carea_name, scores=None):
+    # the scoring part of a community's client-side panel entry (re-sent when the weights move)
+    fields = score_fields(carea_name, scores)
+    return {
+        'bike_rank': int(fields['bike_rank']) + 1,
+        'infrastructure_score': str(round(fields['infrastructure_score'], 2)),
+    }
+
+
+def info_panel_data():
+    # everything the client-side info panel needs, formatted exactly like update_info
+    communities = {}
+    for name in community_stats.names:
+        row = community_stats.row(name)
+        communities[name] = {
+            'title': name.title(),
+            'population': int(round(row['population'], -3)),
+            **panel_crash_data(name),
+            **panel_score_data(name),
+            'hotspots': panel_hotspot_data(name),
+            'road_length': int(row['road_length']),
+            'lanes': {col: str(round(row[col], 1)) for col in lane_cols if col in row},
+            'network_score': str(round(row['network_score'], 2)),
+        }
+    # the network panel is a static component tree; dcc.Store serializes it like any callback output
+    return {'communities': communities, 'network_panel': network_mode_panel}
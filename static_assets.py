@@ -0,0 +1,118 @@
+import os
+import json
+import argparse
+import hashlib
+
+# === Static asset build ===
+# Writes content-hashed, right-sized copies of the images and pages the app links to
+# into assets/build/ (preview re-encoded as JPEG), plus a manifest (logical name -> hashed path under assets/).
+# Hashed files never change under the same URL, so they are served as immutable.
+#   python static_assets.py build
+# Without a build the app links the original files.
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), "assets")
+BUILD_DIR = os.path.join(ASSETS_DIR, "build")
+MANIFEST_FILE = "manifest.json"
+
+FAVICON_SIZE = (48, 48)
+PREVIEW_SIZE = (1200, 630)   # og:image / twitter large card
+PREVIEW_BACKGROUND = '#4A4A4A'
+
+
+def _hashed_name(name, data):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _image_bytes(image, fmt, **options):
+    import io
+    buf = io.BytesIO()
+    image.save(buf, format=fmt, optimize=True, **options)
+    return buf.getvalue()
+
+
+def _favicon(source):
+    from PIL import Image
+
+    with Image.open(source) as im:
+        return _image_bytes(im.convert('RGBA').resize(FAVICON_SIZE, Image.LANCZOS), 'PNG')
+
+
+def _preview(source):
+    # source letterboxed onto the dashboard background at the social card size
+    from PIL import Image
+
+    with Image.open(source) as im:
+        im = im.convert('RGB')
+        im.thumbnail(PREVIEW_SIZE, Image.LANCZOS)
+        card = Image.new('RGB', PREVIEW_SIZE, PREVIEW_BACKGROUND)
+        card.paste(im, ((PREVIEW_SIZE[0] - im.width) // 2, (PREVIEW_SIZE[1] - im.height) // 2))
+        return _image_bytes(card, 'JPEG', quality=85)
+
+
+def build(assets_dir=ASSETS_DIR, build_dir=BUILD_DIR):
+    os.makedirs(build_dir, exist_ok=True)
+    preview_source = os.path.join(assets_dir, "preview.png")
+    if not os.path.exists(preview_source):
+        preview_source = os.path.join(assets_dir, "bike.png")
+
+    # logical name -> (output file name, bytes)
+    outputs = {
+        'bike.png': ("bike.png", _favicon(os.path.join(assets_dir, "bike.png"))),
+        'preview.png': ("preview.jpg", _preview(preview_source)),
+    }
+    network_page = os.path.join(assets_dir, "citywide_network.html")
+    if os.path.exists(network_page):
+        with open(network_page, "rb") as f:
+            outputs['citywide_network.html'] = ("citywide_network.html", f.read())
+
+    manifest = {}
+    for name, (out_name, data) in outputs.items():
+        hashed = _hashed_name(out_name, data)
+        path = os.path.join(build_dir, hashed)
+        if not os.path.exists(path):
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        manifest[name] = f"{os.path.basename(build_dir)}/{hashed}"
+
+    # drop outputs of earlier builds
+    keep = {os.path.basename(p) for p in manifest.values()} | {MANIFEST_FILE}
+    for stale in set(os.listdir(build_dir)) - keep:
+        os.remove(os.path.join(build_dir, stale))
+
+    tmp = os.path.join(build_dir, MANIFEST_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(build_dir, MANIFEST_FILE))
+    return manifest
+
+
+def load_manifest(build_dir=BUILD_DIR):
+    try:
+        with open(os.path.join(build_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+asset_manifest = load_manifest()
+
+
+def asset_path(name):
+    # path under assets/ to link for `name`: the hashed build output if there is one
+    return asset_manifest.get(name, name)
+
+
+def is_hashed_asset(path):
+    return path.startswith(f"/assets/{os.path.basename(BUILD_DIR)}/") and not path.endswith(MANIFEST_FILE)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build content-hashed static assets.")
+    parser.add_argument("command", choices=["build"])
+    parser.parse_args()
+
+    for name, hashed in build().items():
+        size = os.path.getsize(os.path.join(ASSETS_DIR, hashed))
+        print(f"  {name} -> assets/{hashed} ({size:,} bytes)")
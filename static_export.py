@@ -0,0 +1,199 @@
+import os
+import json
+import shutil
+import argparse
+from html import escape
+
+# === Static export ===
+# Every response the app can produce is keyed by the selection (None, bin_0..bin_4, a
+# community name or 'network'), so the whole dashboard can be pre-rendered:
+#   index.html       the Dash layout rendered to plain HTML
+#   figure.json      the base cartogram figure
+#   states/<n>.json  per selection: the update_selection figure patch and panel HTML
+#   manifest.json    selection key -> state file, community names, view styles
+#   loader.js        swaps states in with plotly.js (static_loader.js)
+# The output is plain files for object storage or a CDN; no Python process serves it.
+#   python static_export.py [--out dist/static]
+
+EXPORT_DIR = os.path.join(os.path.dirname(__file__), "dist", "static")
+LOADER_FILE = os.path.join(os.path.dirname(__file__), "static_loader.js")
+
+VOID_TAGS = {'area', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+UNITLESS = {'flex', 'flexGrow', 'flexShrink', 'fontWeight', 'lineHeight', 'opacity', 'order', 'zIndex'}
+# html component props that become attributes as they are
+ATTRIBUTES = {'id', 'href', 'target', 'rel', 'src', 'title', 'alt', 'width', 'height'}
+
+
+def _css_name(name):
+    return ''.join('-' + c.lower() if c.isupper() else c for c in name)
+
+
+def style_text(style):
+    # React style dict -> CSS declarations (numbers get px like React does)
+    parts = []
+    for name, value in (style or {}).items():
+        if isinstance(value, (int, float)) and name not in UNITLESS:
+            value = f"{value}px"
+        parts.append(f"{_css_name(name)}: {value}")
+    return '; '.join(parts)
+
+
+def _relative(url):
+    # site-root asset links -> relative, so the export works under any prefix
+    return url[1:] if isinstance(url, str) and url.startswith('/assets/') else url
+
+
+def _attributes(props):
+    attrs = []
+    for name in sorted(ATTRIBUTES & props.keys()):
+        if props[name] is not None:
+            attrs.append(f'{name}="{escape(str(_relative(props[name])))}"')
+    if props.get('className'):
+        attrs.append(f'class="{escape(props["className"])}"')
+    if props.get('style'):
+        attrs.append(f'style="{escape(style_text(props["style"]))}"')
+    return ''.join(' ' + a for a in attrs)
+
+
+def to_html(node):
+    """Dash component JSON (as serialized for the renderer) -> HTML.
+
+    dcc.Graph becomes an empty div the loader plots into, dcc.Dropdown a <select>,
+    dcc.Loading its children; other dcc components (Store) are dropped."""
+    if node is None or isinstance(node, bool):
+        return ''
+    if isinstance(node, (list, tuple)):
+        return ''.join(to_html(child) for child in node)
+    if not isinstance(node, dict):
+        return escape(str(node))
+
+    props = node.get('props', {})
+    kind = node.get('type')
+    if node.get('namespace') == 'dash_core_components':
+        if kind == 'Graph':
+            return f"<div{_attributes(props)}></div>"
+        if kind == 'Dropdown':
+            options = [f'<option value="">{escape(props.get("placeholder") or "")}</option>']
+            for option in props.get('options', []):
+                value, label = (option['value'], option['label']) if isinstance(option, dict) else (option, option)
+                options.append(f'<option value="{escape(str(value))}">{escape(str(label))}</option>')
+            return f"<select{_attributes(props)}>{''.join(options)}</select>"
+        if kind == 'Loading':
+            return to_html(props.get('children'))
+        return ''
+
+    tag = kind.lower()
+    if tag in VOID_TAGS:
+        return f"<{tag}{_attributes(props)}>"
+    return f"<{tag}{_attributes(props)}>{to_html(props.get('children'))}</{tag}>"
+
+
+def _find(node, component_id):
+    if isinstance(node, list):
+        for child in node:
+            found = _find(child, component_id)
+            if found:
+                return found
+    elif isinstance(node, dict):
+        props = node.get('props', {})
+        if props.get('id') == component_id:
+            return node
+        return _find(props.get('children'), component_id)
+    return None
+
+
+def _index_html(app, body, favicon):
+    meta = ''.join(
+        '<meta ' + ' '.join(f'{k}="{escape(_relative(v))}"' for k, v in tag.items()) + '>'
+        for tag in app.config.meta_tags
+    )
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{escape(app.title)}</title>
+{meta}
+<link rel="icon" href="{escape(favicon)}">
+<link rel="stylesheet" href="assets/style.css">
+<script src="plotly.min.js"></script>
+</head>
+<body>
+{body}
+<script src="loader.js"></script>
+</body>
+</html>
+"""
+
+
+def export(out_dir=EXPORT_DIR):
+    from plotly.offline import get_plotlyjs
+    from app import app, info_panel, overlay_patch, CARTOGRAM_STYLE, IFRAME_STYLE
+    from shared import community_stats
+    from response_cache import to_plain_json
+    from static_assets import ASSETS_DIR, asset_path
+
+    states_dir = os.path.join(out_dir, "states")
+    os.makedirs(states_dir, exist_ok=True)
+
+    layout = to_plain_json(app.layout)
+    graph = _find(layout, 'cartogram')
+    figure = graph['props'].pop('figure')
+    config = graph['props'].get('config', {})
+
+    keys = [None] + [f"bin_{b}" for b in range(community_stats.n_bins)] + list(community_stats.names) + ['network']
+    states = {}
+    for i, key in enumerate(keys):
+        patch, _ = overlay_patch(None, None if key == 'network' else key)
+        state = {
+            'key': key,
+            'operations': to_plain_json(patch)['operations'],
+            'panel': to_html(info_panel(key)),
+        }
+        with open(os.path.join(states_dir, f"{i}.json"), "w") as f:
+            json.dump(state, f, separators=(',', ':'))
+        states['' if key is None else key] = f"states/{i}.json"
+
+    manifest = {
+        'states': states,
+        'communities': list(community_stats.names),
+        'config': config,
+        'views': {
+            'community': {'cartogram': style_text(CARTOGRAM_STYLE), 'network-iframe': 'display: none',
+                          'exit-network-btn': 'display: none'},
+            'network': {'cartogram': 'display: none', 'network-iframe': style_text(IFRAME_STYLE),
+                        'exit-network-btn': 'display: inline-block'},
+        },
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    with open(os.path.join(out_dir, "figure.json"), "w") as f:
+        json.dump(figure, f, separators=(',', ':'))
+
+    # initial panel is the prompt, as in the live app
+    _find(layout, 'info-panel')['props']['children'] = info_panel(None)
+    # states are pre-rendered over the full crash history at the default weights only
+    for control in ('crash-range-control', 'scoring-control'):
+        _find(layout, control)['props']['style'] = {'display': 'none'}
+    with open(os.path.join(out_dir, "index.html"), "w") as f:
+        f.write(_index_html(app, to_html(layout), f"assets/{asset_path('bike.png')}"))
+    with open(os.path.join(out_dir, "plotly.min.js"), "w") as f:
+        f.write(get_plotlyjs())
+    shutil.copyfile(LOADER_FILE, os.path.join(out_dir, "loader.js"))
+
+    # linked assets (hashed copies when static_assets.py build has run)
+    for name in ('style.css', asset_path('bike.png'), asset_path('preview.png'), asset_path('citywide_network.html')):
+        source = os.path.join(ASSETS_DIR, name)
+        if os.path.exists(source):
+            os.makedirs(os.path.dirname(os.path.join(out_dir, "assets", name)), exist_ok=True)
+            shutil.copyfile(source, os.path.join(out_dir, "assets", name))
+    return len(states)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render every dashboard state to static files.")
+    parser.add_argument("--out", default=EXPORT_DIR, help="output directory")
+    args = parser.parse_args()
+
+    n = export(args.out)
+    size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(args.out) for f in files)
+    print(f"Exported {n} states to {args.out} ({size / 2**20:.1f} MB)")
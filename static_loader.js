@@ -0,0 +1,94 @@
+// Loader for the static export (python static_export.py).
+// Plays the part of the update_selection callback: resolves clicks, dropdown changes
+// and network toggles to a selection key, then fetches that state's figure patch and
+// panel HTML and swaps them in. Needs plotly.js and the exported files beside it.
+
+(function () {
+    var graph = document.getElementById('cartogram');
+    var panel = document.getElementById('info-panel');
+    var dropdown = document.getElementById('carea-dropdown');
+    var manifest, baseFigure;
+    var selection = null;
+    var pending = 0;
+
+    function getJSON(url) {
+        return fetch(url).then(function (r) { return r.json(); });
+    }
+
+    function clone(value) {
+        return JSON.parse(JSON.stringify(value));
+    }
+
+    // the Dash Patch operations overlay_patch emits
+    function applyPatch(doc, operations) {
+        operations.forEach(function (op) {
+            var target = doc;
+            var path = op.location.slice(0, -1);
+            var last = op.location[op.location.length - 1];
+            path.forEach(function (key) {
+                if (target[key] === undefined) { target[key] = {}; }
+                target = target[key];
+            });
+            var value = (op.params || {}).value;
+            if (op.operation === 'Assign') {
+                target[last] = value;
+            } else if (op.operation === 'Delete') {
+                if (Array.isArray(target)) { target.splice(last, 1); } else { delete target[last]; }
+            } else if (op.operation === 'Extend') {
+                target[last] = (target[last] || []).concat(value);
+            } else if (op.operation === 'Append') {
+                (target[last] = target[last] || []).push(value);
+            } else if (op.operation === 'Merge') {
+                target[last] = Object.assign(target[last] || {}, value);
+            } else {
+                throw new Error('unsupported patch operation ' + op.operation);
+            }
+        });
+        return doc;
+    }
+
+    function setView(view) {
+        var styles = manifest.views[view];
+        Object.keys(styles).forEach(function (id) {
+            document.getElementById(id).setAttribute('style', styles[id]);
+        });
+        if (view === 'community') { Plotly.Plots.resize(graph); }
+    }
+
+    function show(key) {
+        var previous = selection;
+        if (key === previous) { return; }
+        selection = key;
+        var request = ++pending;
+        getJSON(manifest.states[key === null ? '' : key]).then(function (state) {
+            if (request !== pending) { return; }  // a newer selection won
+            var figure = applyPatch(clone(baseFigure), state.operations);
+            Plotly.react(graph, figure.data, figure.layout, manifest.config);
+            panel.innerHTML = state.panel;
+            dropdown.value = manifest.communities.indexOf(key) >= 0 ? key : '';
+            if ((key === 'network') !== (previous === 'network')) {
+                setView(key === 'network' ? 'network' : 'community');
+            }
+        });
+    }
+
+    Promise.all([getJSON('manifest.json'), getJSON('figure.json')]).then(function (loaded) {
+        manifest = loaded[0];
+        baseFigure = loaded[1];
+        Plotly.newPlot(graph, clone(baseFigure.data), clone(baseFigure.layout), manifest.config).then(function () {
+            graph.on('plotly_click', function (event) {
+                if (selection !== 'network' && event.points.length) {
+                    var key = event.points[0].customdata;
+                    show(key in manifest.states ? key : null);
+                }
+            });
+        });
+        dropdown.addEventListener('change', function () {
+            if (selection !== 'network') { show(dropdown.value || null); }
+        });
+        document.getElementById('show-network-btn').addEventListener('click', function () { show('network'); });
+        document.getElementById('exit-network-btn').addEventListener('click', function () {
+            if (selection === 'network') { show(null); }
+        });
+    });
+})();
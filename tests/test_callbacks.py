@@ -0,0 +1,183 @@
+import json
+
+import pytest
+
+from app import app
+from callback_graph import INTERACTIONS, count_invocations
+from shared import CLIENTSIDE_PANEL, community_stats
+
+# === One server round trip per interaction ===
+# Fires every user interaction at the running app through /_dash-update-component,
+# the way the Dash renderer does, and checks that it runs exactly one server callback
+# and that none of the props that callback returns is the input of another callback
+# (which the renderer would fire next).
+
+
+def _component_values(component, values):
+    # initial prop values of every component with an id, as the browser starts with them
+    if isinstance(component, (list, tuple)):
+        for child in component:
+            _component_values(child, values)
+        return values
+    if not hasattr(component, 'to_plotly_json'):
+        return values
+    props = component.to_plotly_json()['props']
+    if 'id' in props:
+        for prop, value in props.items():
+            if prop not in ('id', 'children'):
+                values[f"{props['id']}.{prop}"] = value
+    _component_values(props.get('children'), values)
+    return values
+
+
+def _outputs(spec):
+    return spec.strip('.').split('...') if spec.startswith('..') else [spec]
+
+
+CALLBACKS = [{
+    'output': cb['output'],
+    'server': cb['clientside_function'] is None,
+    'inputs': [f"{d['id']}.{d['property']}" for d in cb['inputs']],
+    'state': [f"{d['id']}.{d['property']}" for d in cb['state']],
+} for cb in app._callback_list]
+SERVER_CALLBACKS = [cb for cb in CALLBACKS if cb['server']]
+
+
+def inset_relayout(relayout, heatmap, overlay):
+    # assets/inset_zoom.js: the relayouts the browser passes on to inset-view (None = kept)
+    if not relayout or not heatmap or not (overlay or {}).get('heatmap'):
+        return None
+    if not any(k.startswith(('xaxis2.range', 'yaxis2.range', 'xaxis2.autorange', 'yaxis2.autorange'))
+               for k in relayout):
+        return None
+    return relayout
+
+
+class Browser:
+    """Holds prop values like the renderer and posts the server callback a prop change fires."""
+
+    def __init__(self):
+        self.client = app.server.test_client()
+        self.values = _component_values(app.layout, {})
+        self.values.pop('cartogram.figure', None)  # patched, not replaced; never sent back
+        self.requests = 0
+
+    def change(self, prop, value):
+        self.values[prop] = value
+        if prop == 'cartogram.relayoutData':
+            view = inset_relayout(value, self.values.get('crash-heatmap.value'), self.values.get('cartogram-overlay.data'))
+            if view is None:
+                return None, []
+            prop, value = 'inset-view.data', view
+            self.values[prop] = value
+        fired = [cb for cb in SERVER_CALLBACKS if prop in cb['inputs']]
+        assert len(fired) == 1, f"{prop} fires {len(fired)} server callbacks"
+        cb = fired[0]
+        body = {
+            'output': cb['output'],
+            'outputs': [dict(zip(('id', 'property'), o.rsplit('.', 1))) for o in _outputs(cb['output'])],
+            'inputs': [{'id': p.rsplit('.', 1)[0], 'property': p.rsplit('.', 1)[1], 'value': self.values.get(p)}
+                       for p in cb['inputs']],
+            'state': [{'id': p.rsplit('.', 1)[0], 'property': p.rsplit('.', 1)[1], 'value': self.values.get(p)}
+                      for p in cb['state']],
+            'changedPropIds': [prop],
+        }
+        r = self.client.post('/_dash-update-component', json=body)
+        self.requests += 1
+        assert r.status_code in (200, 204), r.data[:300]
+        returned = []
+        if r.status_code == 200:
+            for component_id, props in json.loads(r.data)['response'].items():
+                for name, value in props.items():
+                    returned.append(f"{component_id}.{name}")
+                    if name != 'figure':
+                        self.values[f"{component_id}.{name}"] = value
+        return cb, returned
+
+
+def click(key):
+    return {'points': [{'customdata': key}]}
+
+
+def _select(browser, key):
+    browser.change('cartogram.clickData', click(key))
+
+
+def _network(browser):
+    browser.change('show-network-btn.n_clicks', 1)
+
+
+def _heatmap_on(browser):
+    _select(browser, community_stats.names[0])
+    browser.change('crash-heatmap.value', ['on'])
+
+
+INSET_ZOOM = {'xaxis2.range[0]': -87.7, 'xaxis2.range[1]': -87.6}
+
+# interaction: (setup, changed prop, new value); setup runs first, as earlier user actions
+CASES = {
+    'community click': (None, 'cartogram.clickData', click(community_stats.names[0])),
+    'bin click': (None, 'cartogram.clickData', click('bin_2')),
+    'community after community': (lambda b: _select(b, community_stats.names[0]),
+                                  'cartogram.clickData', click(community_stats.names[1])),
+    'dropdown': (None, 'carea-dropdown.value', community_stats.names[1]),
+    'show network': (None, 'show-network-btn.n_clicks', 1),
+    'exit network': (_network, 'exit-network-btn.n_clicks', 1),
+    'date range': (None, 'crash-range.value', [1, 12]),
+    'lane weight': (None, 'weight-protected.value', 0.25),
+    'score mix': (None, 'score-mix.value', 0.8),
+    'crash heatmap': (lambda b: _select(b, community_stats.names[0]), 'crash-heatmap.value', ['on']),
+    'inset zoom': (_heatmap_on, 'cartogram.relayoutData', INSET_ZOOM),
+}
+
+
+# relayouts that draw nothing new: (setup, relayoutData)
+BROWSER_ONLY_RELAYOUTS = {
+    'autosize': (None, {'autosize': True}),
+    'cartogram pan': (lambda b: _select(b, community_stats.names[0]), {'xaxis.range[0]': 0, 'xaxis.range[1]': 10}),
+    'inset zoom, heatmap off': (lambda b: _select(b, community_stats.names[0]), INSET_ZOOM),
+    'cartogram pan, heatmap on': (_heatmap_on, {'xaxis.range[0]': 0, 'xaxis.range[1]': 10}),
+}
+
+
+def test_callback_graph_one_server_call_per_interaction():
+    counts = count_invocations(app)
+    assert set(counts) == set(INTERACTIONS)
+    for label, (server, _) in counts.items():
+        assert server == (0 if INTERACTIONS[label] is None else 1), f"{label}: {server} server callbacks"
+
+
+@pytest.mark.skipif(CLIENTSIDE_PANEL, reason="selections are resolved by a clientside callback")
+@pytest.mark.parametrize('label', list(CASES))
+def test_interaction_runs_one_server_callback(label):
+    setup, prop, value = CASES[label]
+    browser = Browser()
+    if setup:
+        setup(browser)
+    requests = browser.requests
+
+    cb, returned = browser.change(prop, value)
+
+    assert browser.requests == requests + 1
+    assert returned, f"{label}: nothing updated"
+    for output in returned:
+        chained = [other['output'] for other in CALLBACKS if other is not cb and output in other['inputs']]
+        assert not chained, f"{label}: {output} fires {chained}"
+
+
+def test_relayout_is_not_a_server_input():
+    assert not [cb['output'] for cb in SERVER_CALLBACKS if 'cartogram.relayoutData' in cb['inputs']]
+
+
+@pytest.mark.skipif(CLIENTSIDE_PANEL, reason="selections are resolved by a clientside callback")
+@pytest.mark.parametrize('label', list(BROWSER_ONLY_RELAYOUTS))
+def test_relayout_stays_in_browser(label):
+    setup, relayout = BROWSER_ONLY_RELAYOUTS[label]
+    browser = Browser()
+    if setup:
+        setup(browser)
+    requests = browser.requests
+
+    browser.change('cartogram.relayoutData', relayout)
+
+    assert browser.requests == requests
@@ -0,0 +1,60 @@
+import json
+
+import pandas as pd
+import pytest
+
+from crash_areas import CRASH_COLUMNS, tag_crashes
+
+# === Crash tagging on two square areas ===
+# Rogers Park spans lon -1..0, West Ridge lon 0..1 (lat 0..1 both); only bike crashes
+# inside one of them make it to the output.
+
+
+def _square(x0):
+    return {'type': 'Polygon', 'coordinates': [[[x0, 0], [x0 + 1, 0], [x0 + 1, 1], [x0, 1], [x0, 0]]]}
+
+
+@pytest.fixture
+def areas(tmp_path):
+    path = tmp_path / "areas.geojson"
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'community': 'ROGERS PARK'}, 'geometry': _square(-1)},
+        {'type': 'Feature', 'properties': {'community': 'WEST RIDGE'}, 'geometry': _square(0)},
+    ]}))
+    return str(path)
+
+
+def _crash(i, crash_type, lon, lat):
+    return {'CRASH_RECORD_ID': f"r{i}", 'CRASH_DATE': '06/27/2023 12:00:00 AM', 'PRIM_CONTRIBUTORY_CAUSE': 'SPEEDING',
+            'MOST_SEVERE_INJURY': 'NO INDICATION OF INJURY', 'LATITUDE': lat, 'LONGITUDE': lon,
+            'FIRST_CRASH_TYPE': crash_type, 'CRASH_TYPE': 'NO INJURY / DRIVE AWAY'}
+
+
+def test_keeps_bike_crashes_only(tmp_path, areas):
+    crashes = pd.DataFrame([
+        _crash(0, 'PEDALCYCLIST', -0.5, 0.5),
+        _crash(1, 'REAR END', -0.5, 0.5),        # not a bike crash
+        _crash(2, 'PEDALCYCLIST', 0.5, 0.5),
+        _crash(3, 'PEDESTRIAN', 0.5, 0.5),       # not a bike crash
+        _crash(4, 'PEDALCYCLIST', 5.0, 0.5),     # outside every area
+        _crash(5, 'PEDALCYCLIST', None, None),   # no coordinates
+    ])
+    crashes.to_csv(tmp_path / "crashes.csv", index=False)
+    out = tmp_path / "crash_with_carea.csv"
+
+    rows_in, rows_out = tag_crashes(str(tmp_path / "crashes.csv"), areas, str(out), workers=1, chunk_rows=2)
+
+    tagged = pd.read_csv(out)
+    assert (rows_in, rows_out) == (6, 2)
+    assert list(tagged.columns) == CRASH_COLUMNS + ['CArea']
+    assert tagged['CRASH_RECORD_ID'].tolist() == ['r0', 'r2']
+    assert tagged['CArea'].tolist() == ['Rogers Park', 'West Ridge']
+
+
+def test_refuses_export_without_crash_type(tmp_path, areas):
+    crashes = pd.DataFrame([_crash(0, 'PEDALCYCLIST', -0.5, 0.5)]).drop(columns='FIRST_CRASH_TYPE')
+    crashes.to_csv(tmp_path / "crashes.csv", index=False)
+
+    with pytest.raises(ValueError, match='FIRST_CRASH_TYPE'):
+        tag_crashes(str(tmp_path / "crashes.csv"), areas, str(tmp_path / "out.csv"), workers=1)
+    assert not (tmp_path / "out.csv").exists()
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crash_cube import DATE_FORMAT, CrashCube, IGNORED_CAUSES, SEVERE_INJURIES
+
+# === Month cube windows vs a brute-force groupby ===
+
+NAMES = ['Rogers Park', 'West Ridge', 'Uptown', 'Lincoln Square', 'Edgewater']  # Edgewater has no crashes
+CAUSES = ['SPEEDING', 'FAILING TO YIELD RIGHT-OF-WAY', 'DISREGARDING TRAFFIC SIGNALS', 'UNABLE TO DETERMINE']
+INJURIES = ['FATAL', 'INCAPACITATING INJURY', 'NONINCAPACITATING INJURY', 'NO INDICATION OF INJURY']
+
+
+def _crashes(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2021-11-01') + pd.to_timedelta(rng.integers(0, 900, n), unit='D')
+    return pd.DataFrame({
+        'CRASH_DATE': dates.strftime(DATE_FORMAT),
+        'PRIM_CONTRIBUTORY_CAUSE': rng.choice(CAUSES, n),
+        'MOST_SEVERE_INJURY': rng.choice(INJURIES, n, p=[0.02, 0.1, 0.4, 0.48]),
+        'CArea': rng.choice(NAMES[:-1], n),
+        '_month': dates.year * 12 + dates.month - 1,
+    })
+
+
+@pytest.fixture(scope='module')
+def crashes():
+    return _crashes()
+
+
+@pytest.fixture(scope='module')
+def cube(crashes):
+    return CrashCube.from_frame(crashes, NAMES)
+
+
+def _brute_force(crashes, cube, first, last):
+    rows = crashes[crashes['_month'].between(cube.start_month + first, cube.start_month + last)]
+    injuries = rows.groupby(['CArea', 'MOST_SEVERE_INJURY']).size().unstack(fill_value=0)
+    causes = rows.groupby(['CArea', 'PRIM_CONTRIBUTORY_CAUSE']).size()
+    return injuries.reindex(index=NAMES, columns=INJURIES, fill_value=0), causes
+
+
+@pytest.mark.parametrize('first, last', [(0, None), (0, 0), (3, 3), (2, 17), (10, 29), (29, 29)])
+def test_window_matches_groupby(crashes, cube, first, last):
+    last = cube.n_months - 1 if last is None else last
+    expected, causes = _brute_force(crashes, cube, first, last)
+    window = cube.window(first, last)
+
+    for c, name in enumerate(NAMES):
+        assert window.injury_counts(c) == {k: int(expected.loc[name, k]) for k in INJURIES}
+        assert window.total[c] == expected.loc[name].sum()
+        assert window.severe[c] == expected.loc[name, SEVERE_INJURIES].sum()
+        ranked = sorted(((-n, k) for (carea, k), n in causes.items() if carea == name and k not in IGNORED_CAUSES))
+        assert window.top_causes(c) == [k for _, k in ranked][:5]
+
+
+def test_window_covers_every_crash(crashes, cube):
+    assert cube.n_months == crashes['_month'].max() - crashes['_month'].min() + 1
+    assert cube.window().total.sum() == len(crashes)
+
+
+def test_add_in_pieces(crashes, cube):
+    # late rows (earlier months) grow the month axis backwards
+    split = crashes.sort_values('_month').iloc[200:]
+    pieced = CrashCube.empty(NAMES).add(split).add(crashes.drop(split.index))
+    assert pieced.start_month == cube.start_month
+    np.testing.assert_array_equal(pieced.window().injuries, cube.window().injuries)
+    np.testing.assert_array_equal(pieced.window(4, 20).causes, cube.window(4, 20).causes)
+
+
+def test_app_totals_come_from_the_cube():
+    # the default (all months) figures and the slider's full window are the same numbers
+    import shared
+
+    full = shared.crash_cube.window(0, shared.crash_cube.n_months - 1)
+    for name in shared.community_stats.names:
+        i = shared.community_stats.id_of(name)
+        assert shared.crash_fields(name) == shared.crash_fields(name, full)
+        row = shared.community_stats.row(name)
+        assert (row['total_crashes'], row['severe_crashes']) == (full.total[i], full.severe[i])
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from crash_heatmap import CELL_DEG, MAX_CELLS, N_LEVELS, CrashHeatmap
+
+# === Sparse multi-level grids and view rasters ===
+
+
+@pytest.fixture(scope='module')
+def points():
+    rng = np.random.default_rng(0)
+    lon = np.concatenate([rng.uniform(-87.9, -87.6, 3000), rng.normal(-87.65, 0.002, 1000)])
+    lat = np.concatenate([rng.uniform(41.7, 42.0, 3000), rng.normal(41.88, 0.002, 1000)])
+    lon[::97] = np.nan  # missing coordinates are skipped
+    return lon, lat
+
+
+@pytest.fixture(scope='module')
+def heatmap(points):
+    return CrashHeatmap.from_points(*points)
+
+
+def _valid(points):
+    lon, lat = points
+    keep = np.isfinite(lon) & np.isfinite(lat)
+    return lon[keep], lat[keep]
+
+
+def test_every_level_holds_every_point(points, heatmap):
+    n = len(_valid(points)[0])
+    assert heatmap.n_points == n
+    assert len(heatmap.levels) == N_LEVELS
+    for ids, counts, _ in heatmap.levels:
+        assert counts.sum() == n
+        assert np.all(np.diff(ids) > 0)  # sorted, one entry per occupied cell
+
+
+def test_full_view_raster_sums_to_input_at_every_level(points, heatmap):
+    lon, lat = _valid(points)
+    seen = set()
+    for max_cells in 2 ** np.arange(3, 11):
+        level, _, _, size, grid = heatmap.raster(lon.min(), lon.max(), lat.min(), lat.max(), int(max_cells))
+        seen.add(level)
+        assert size == pytest.approx(CELL_DEG * 2 ** level)
+        assert grid.sum() == len(lon), f"level {level}"
+    assert seen == set(range(N_LEVELS))
+
+
+@pytest.mark.parametrize('view', [(-87.7, -87.62, 41.85, 41.9), (-87.655, -87.645, 41.875, 41.885),
+                                  (-88.5, -87.8, 41.0, 41.75)])
+def test_window_raster_matches_binning(points, heatmap, view):
+    lon, lat = _valid(points)
+    level, lon0, lat0, size, grid = heatmap.raster(*view)
+    # brute force: bin each point at this level and keep the cells the raster covers
+    col = ((lon - heatmap.origin[0]) // CELL_DEG).astype(np.int64) >> level
+    row = ((lat - heatmap.origin[1]) // CELL_DEG).astype(np.int64) >> level
+    c0 = int(round((lon0 - heatmap.origin[0]) / size))
+    r0 = int(round((lat0 - heatmap.origin[1]) / size))
+    inside = (col >= c0) & (col < c0 + grid.shape[1]) & (row >= r0) & (row < r0 + grid.shape[0])
+    expected = np.zeros_like(grid)
+    np.add.at(expected, (row[inside] - r0, col[inside] - c0), 1)
+    np.testing.assert_array_equal(grid, expected)
+    assert max(grid.shape) <= MAX_CELLS + 1  # a view edge can cut into one more cell
+
+
+def test_no_points():
+    heatmap = CrashHeatmap.from_points([np.nan], [np.nan])
+    assert heatmap.n_points == 0
+    assert heatmap.raster(-87.7, -87.6, 41.8, 41.9)[-1].sum() == 0
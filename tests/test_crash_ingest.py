@@ -0,0 +1,106 @@
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from crash_cube import CrashCube
+from crash_ingest import CRASH_COLUMNS, CRASH_FILE, DATE_FORMAT, injuries_dict, ingest, load_state, rebuild
+
+# === Incremental ingest vs one rebuild ===
+# A synthetic crash history ingested in increments (with late reports dated before the
+# watermark and rows sent twice) must end in the same tables as one --rebuild over it.
+
+COMMUNITIES = ['Rogers Park', 'West Ridge', 'Uptown', 'Lincoln Square']
+CAUSES = ['SPEEDING', 'FAILING TO YIELD RIGHT-OF-WAY', 'DISREGARDING TRAFFIC SIGNALS', 'UNABLE TO DETERMINE']
+INJURIES = ['FATAL', 'INCAPACITATING INJURY', 'NONINCAPACITATING INJURY', 'NO INDICATION OF INJURY']
+
+
+def _crashes(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2022-01-01') + pd.to_timedelta(rng.integers(0, 730 * 24, n), unit='h')
+    frame = pd.DataFrame({
+        'CRASH_RECORD_ID': [f"r{i:04d}" for i in range(n)],
+        'CRASH_DATE': dates.strftime(DATE_FORMAT),
+        'PRIM_CONTRIBUTORY_CAUSE': rng.choice(CAUSES, n),
+        'MOST_SEVERE_INJURY': rng.choice(INJURIES, n, p=[0.02, 0.08, 0.4, 0.5]),
+        'LATITUDE': rng.uniform(41.9, 42.0, n),
+        'LONGITUDE': rng.uniform(-87.7, -87.6, n),
+        'CArea': rng.choice(COMMUNITIES, n),
+    })
+    return frame.iloc[np.argsort(dates.to_numpy(), kind='stable')].reset_index(drop=True)
+
+
+def _data_dir(path, crashes):
+    path.mkdir()
+    crashes[CRASH_COLUMNS].to_csv(path / CRASH_FILE, index=False)
+    with open(path / "citywide_stats.pkl", "wb") as f:
+        pickle.dump({}, f)
+    return path
+
+
+def _cube_counts(data_dir):
+    # {(community, month label, injury level or cause): count}, independent of axis order
+    cube = CrashCube.load(data_dir, load_state(data_dir)['cube'])
+    counts = {}
+    for labels, cum in ((cube.injury_levels, cube.injury_cum), (cube.causes, cube.cause_cum)):
+        per_month = np.diff(cum, axis=1)
+        for c, t, k in zip(*np.nonzero(per_month)):
+            counts[(cube.names[c], cube.month_label(t), labels[k])] = int(per_month[c, t, k])
+    return counts
+
+
+def test_increments_match_rebuild(tmp_path):
+    crashes = _crashes()
+    full = _data_dir(tmp_path / "full", crashes)
+    rebuild(full)
+
+    # most of the first 60% up front; then a batch that resends rows already ingested;
+    # then the rest, with late reports from the first months
+    head, later = crashes.iloc[:240], crashes.iloc[240:]
+    late = head.sample(frac=0.1, random_state=1)
+    first = head.drop(late.index)
+    batches = [
+        pd.concat([later.iloc[:80], first.iloc[-10:]]),
+        pd.concat([later.iloc[80:], late]),
+    ]
+    incremental = _data_dir(tmp_path / "incremental", first)
+    rebuild(incremental)
+    ingested = []
+    for i, batch in enumerate(batches):
+        batch.to_csv(tmp_path / f"new_{i}.csv", index=False)
+        ingested.append(ingest(tmp_path / f"new_{i}.csv", incremental))
+
+    assert [rows for rows, _, _ in ingested] == [80, len(later) - 80 + len(late)]
+    assert [n_late for _, _, n_late in ingested] == [0, len(late)]   # counted and reported, not dropped
+
+    pd.testing.assert_frame_equal(pd.read_csv(incremental / "grouped.csv"), pd.read_csv(full / "grouped.csv"))
+    state, expected = load_state(incremental), load_state(full)
+    assert injuries_dict(state) == injuries_dict(expected)
+    assert state['top_causes'] == expected['top_causes']
+    assert sorted(state['ids']) == sorted(expected['ids'])
+    assert state['watermark'] == expected['watermark']
+    assert _cube_counts(incremental) == _cube_counts(full)
+
+
+def test_ingest_twice_adds_nothing(tmp_path):
+    crashes = _crashes(100)
+    data_dir = _data_dir(tmp_path / "data", crashes.iloc[:50])
+    rebuild(data_dir)
+    crashes.iloc[50:].to_csv(tmp_path / "new.csv", index=False)
+
+    assert ingest(tmp_path / "new.csv", data_dir)[0] == 50
+    assert ingest(tmp_path / "new.csv", data_dir) == (0, [], 0)
+    assert sum(load_state(data_dir)['injuries']['Uptown'].values()) == (crashes['CArea'] == 'Uptown').sum()
+
+
+def test_old_state_needs_rebuild(tmp_path):
+    data_dir = _data_dir(tmp_path / "data", _crashes(20))
+    rebuild(data_dir)
+    state = load_state(data_dir)
+    del state['ids']
+    (data_dir / "crash_counts.json").write_text(json.dumps(state))
+
+    with pytest.raises(SystemExit, match='--rebuild'):
+        ingest(tmp_path / "unused.csv", data_dir)
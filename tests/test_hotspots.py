@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from hotspots import EPS, MIN_CRASHES, dbscan, neighbour_pairs
+
+# === Grid-hash DBSCAN vs a brute-force reference ===
+
+
+def brute_force_dbscan(xy, eps=EPS, min_samples=MIN_CRASHES):
+    # full distance matrix and a flood fill; each core component is labelled by its
+    # lowest index, border points join the lowest such label among their core
+    # neighbours, then labels are renumbered 0..k-1 in index order (as dbscan does)
+    n = len(xy)
+    near = np.hypot(*(xy[:, None, :] - xy[None, :, :]).transpose(2, 0, 1)) <= eps
+    core = near.sum(axis=1) >= min_samples
+    root = np.full(n, -1)
+    for start in np.flatnonzero(core):
+        if root[start] >= 0:
+            continue
+        stack = [start]
+        root[start] = start
+        while stack:
+            p = stack.pop()
+            for q in np.flatnonzero(near[p] & core):
+                if root[q] < 0:
+                    root[q] = start
+                    stack.append(q)
+    for p in np.flatnonzero(~core):
+        roots = root[near[p] & core]
+        root[p] = roots.min() if len(roots) else -1
+    labels = np.full(n, -1)
+    clustered = root >= 0
+    labels[clustered] = np.unique(root[clustered], return_inverse=True)[1]
+    return labels
+
+
+def _crashes(seed, n_blobs=12, per_blob=30, noise=300):
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform(0, 3000, (n_blobs, 2))
+    blobs = [c + rng.normal(0, rng.uniform(10, 60), (per_blob, 2)) for c in centres]
+    return np.concatenate(blobs + [rng.uniform(0, 3000, (noise, 2))]) + [440000, 4630000]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_neighbour_pairs_match_distance_matrix(seed):
+    xy = _crashes(seed)
+    i, j = neighbour_pairs(xy)
+    near = np.hypot(*(xy[:, None, :] - xy[None, :, :]).transpose(2, 0, 1)) <= EPS
+    expected = set(zip(*np.nonzero(near)))
+    assert len(i) == len(expected)
+    assert set(zip(i.tolist(), j.tolist())) == expected
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_dbscan_matches_brute_force(seed):
+    xy = _crashes(seed)
+    labels = dbscan(xy)
+    np.testing.assert_array_equal(labels, brute_force_dbscan(xy))
+    assert labels.max() >= 1 and (labels == -1).any()
+
+
+@pytest.mark.parametrize('eps, min_samples', [(25.0, 3), (80.0, 8)])
+def test_dbscan_parameters(eps, min_samples):
+    xy = _crashes(7)
+    np.testing.assert_array_equal(dbscan(xy, eps, min_samples), brute_force_dbscan(xy, eps, min_samples))
+
+
+def test_exact_eps_chain():
+    # points exactly eps apart are neighbours; a chain of core points is one cluster
+    xy = np.column_stack([np.arange(8) * EPS, np.zeros(8)])
+    assert dbscan(xy, EPS, 3).tolist() == [0] * 8
+    assert dbscan(xy, EPS - 1e-6, 2).tolist() == [-1] * 8
+
+
+def test_empty():
+    assert len(dbscan(np.zeros((0, 2)))) == 0
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from network_common import METRES_PER_MILE
+from road_coverage import COVER_DISTANCE, compute_coverage, summarize
+
+# === Road coverage on a synthetic grid ===
+# One 1 km east-west protected lane along y = 0 (UTM metres) and roads around it:
+#   North  a parallel road 500 m away (covered) and one 700 m away (not covered)
+#   South  a parallel road 300 m away, digitized east to west (covered)
+#   Cross  a perpendicular road 50 m from the lane (not covered)
+
+LANES = pd.DataFrame({
+    'geometry': ['LINESTRING (0 0, 1000 0)'],
+    'CArea': ['North'],
+    'DISPLAYROU_CLEAN': ['PROTECTED'],
+    'length_miles': [1000 / METRES_PER_MILE],
+})
+ROADS = pd.DataFrame({
+    'geometry': [
+        'LINESTRING (0 500, 500 500, 1000 500)',
+        'LINESTRING (0 700, 1000 700)',
+        'LINESTRING (1000 -300, 0 -300)',
+        'LINESTRING (500 -550, 500 -50)',
+    ],
+    'CArea': ['North', 'North', 'South', 'Cross'],
+})
+
+
+@pytest.fixture(scope='module')
+def road_pieces():
+    return compute_coverage(ROADS, LANES, workers=1)
+
+
+def test_covered_pieces(road_pieces):
+    assert COVER_DISTANCE == 600.0
+    covered = road_pieces.groupby(['CArea', 'y0'])['covered'].agg(['all', 'any'])
+    assert covered.loc[('North', 500.0)].all()        # parallel, within 600 m
+    assert not covered.loc[('North', 700.0)].any()    # parallel, beyond 600 m
+    assert covered.loc[('South', -300.0)].all()       # parallel, opposite direction
+    assert not covered.loc[('Cross', -550.0)].any()   # within 600 m, perpendicular
+
+
+def test_piece_miles(road_pieces):
+    assert len(road_pieces) == 5
+    miles = road_pieces.groupby('CArea')['miles'].sum()
+    assert miles['North'] == pytest.approx(2000 / METRES_PER_MILE)
+    assert miles['South'] == pytest.approx(1000 / METRES_PER_MILE)
+    assert miles['Cross'] == pytest.approx(500 / METRES_PER_MILE)
+
+
+def test_summary(road_pieces):
+    network_score, road_length, stats = summarize(road_pieces, LANES, {'crashes_total': 7})
+
+    assert network_score == pytest.approx({'North': 0.5, 'South': 1.0, 'Cross': 0.0})
+    assert road_length == pytest.approx({'North': 2000 / METRES_PER_MILE, 'South': 1000 / METRES_PER_MILE,
+                                         'Cross': 500 / METRES_PER_MILE})
+    assert stats['roads_total'] == pytest.approx(3500 / METRES_PER_MILE)
+    assert stats['covered'] == pytest.approx(2000 / METRES_PER_MILE)
+    assert stats['uncovered'] == pytest.approx(1500 / METRES_PER_MILE)
+    assert stats['coverage_pct'] == pytest.approx(100 * 2000 / 3500)
+    assert stats['PROTECTED_MI'] == pytest.approx(1000 / METRES_PER_MILE)
+    assert stats['SHARED_MI'] == 0.0
+    assert stats['crashes_total'] == 7  # keys the engine doesn't own are kept
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from geometry_store import SegmentGeometry
+from segment_risk import SNAP_DISTANCE, point_segment_distance, risk_levels, segment_counts, snap
+
+# === Snapping crashes to segments ===
+# Two lanes (UTM metres): segment 0 runs east along y = 0 from x = 0 to 1000; segment 1
+# is an L from (0, 100) north to (0, 500) and then east to (400, 500).
+
+LANES = SegmentGeometry.from_wkt(['LINESTRING (0 0, 1000 0)', 'LINESTRING (0 100, 0 500, 400 500)'], 'utm')
+
+
+def test_point_segment_distance():
+    p0 = np.array([[0.0, 0.0]] * 3)
+    p1 = np.array([[10.0, 0.0]] * 3)
+    xy = np.array([[5.0, 3.0], [-4.0, 3.0], [13.0, -4.0]])  # beside, before the start, past the end
+    np.testing.assert_allclose(point_segment_distance(xy, p0, p1), [3.0, 5.0, 5.0])
+
+
+@pytest.mark.parametrize('xy, expected', [
+    ((500, 10), 0),                 # within tolerance of segment 0
+    ((500, SNAP_DISTANCE), 0),      # exactly at the tolerance
+    ((500, -29.9), 0),
+    ((500, 30.1), -1),              # just beyond it
+    ((500, 250), -1),               # far from both
+    ((1020, 0), 0),                 # past the end of segment 0, within tolerance
+    ((1031, 0), -1),                # past the end, beyond tolerance
+    ((0, 60), -1),                  # between the lanes: 60 m from segment 0, 40 m from segment 1
+    ((0, 80), 1),                   # 20 m below the start of segment 1
+    ((-20, 300), 1),                # beside the first piece of segment 1
+    ((200, 520), 1),                # beside its second piece
+    ((15, 480), 1),                 # inside the corner, near both pieces
+])
+def test_snap_tolerance(xy, expected):
+    assert snap(np.array([xy], dtype=float), LANES).tolist() == [expected]
+
+
+def test_snap_nearest_of_two():
+    # both lanes within a 60 m tolerance: the nearer one wins
+    assert snap(np.array([[10.0, 50.0]]), LANES, tolerance=60).tolist() == [0]   # 50 m vs 51 m
+    assert snap(np.array([[10.0, 55.0]]), LANES, tolerance=60).tolist() == [1]   # 55 m vs 46 m
+
+
+def test_snap_matches_brute_force():
+    import shapely
+
+    rng = np.random.default_rng(0)
+    xy = rng.uniform([-100, -100], [1100, 600], (5000, 2))
+    lines = shapely.from_wkt(['LINESTRING (0 0, 1000 0)', 'LINESTRING (0 100, 0 500, 400 500)'])
+    dist = np.column_stack([shapely.distance(shapely.points(xy), line) for line in lines])
+    expected = np.where(dist.min(axis=1) <= SNAP_DISTANCE, dist.argmin(axis=1), -1)
+
+    np.testing.assert_array_equal(snap(xy, LANES), expected)
+
+
+def test_snap_in_chunks(monkeypatch):
+    import segment_risk
+
+    xy = np.array([[500.0, 10.0], [500.0, 100.0], [-20.0, 300.0]] * 3)
+    monkeypatch.setattr(segment_risk, 'CRASH_CHUNK', 2)
+    assert snap(xy, LANES).tolist() == [0, -1, 1] * 3
+
+
+def test_segment_counts():
+    nearest = np.array([0, 0, 1, -1, 0, 2])
+    severe = np.array([True, False, True, True, False, False])
+    counts = segment_counts(nearest, severe, np.array([2.0, 0.5, 0.0, 1.0]))
+    assert counts['crashes'] == [3, 1, 1, 0]
+    assert counts['severe'] == [1, 1, 0, 0]
+    assert counts['crashes_per_mile'] == [1.5, 2.0, 0.0, 0.0]   # no rate for a zero-length segment
+    assert counts['risk'] == [1, 3, 0, 0]
+
+
+def test_risk_levels():
+    levels = risk_levels([0, 1, 2, 3, 4, 5, 6, 0])
+    assert levels.tolist() == [0, 1, 1, 2, 2, 3, 3, 0]